@@ -1,87 +1,81 @@
-import base64
+import asyncio
 import logging
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import List, Optional
 
-from fastapi import FastAPI, Form, HTTPException
+from fastapi import Body, FastAPI, Form, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from .core import metrics
 from .core.config import Config
-from .core.http import download_bytes_from_url
+from .core.dedup import IdempotencyConflictError, IdempotencyStore
+from .core.http import close_http_client
+from .core.resilience import breaker_states
+from .core.tracing import current_request_id, new_request_id, trace_exporter
 from .core.middleware import log_requests, global_exception_handler
 from .core.validation import validate_inputs
-from .services.supabase_service import (
-    create_signed_url_for_storage_object,
-    get_figurine_url_from_memory,
-    get_client,
-    update_memory_status,
-    update_memory_with_stl,
-    upload_to_supabase,
-)
-from .services.tencent_ai3d import generate_stl_from_image_base64, generate_stl_from_image_base64_async
+from .services.admission import AdmissionRejectedError, admission_controller
+from .services.batches import batch_manager
+from .services.events import generation_events
+from .services.generation import generation_flights, generation_key, run_generation_deduplicated
+from .services.image_preprocessing import shutdown_executor as shutdown_preprocess_pool
+from .services.job_poller import job_poller
+from .services.job_recovery import job_recovery
+from .services.jobs import JobQueueFullError, job_manager
+from .services.stl_cache import stl_cache
+from .services.readiness import readiness_monitor
+from .services.region_router import region_router
+from .services.supabase_service import close_client, init_client
+from .services.warmup import prewarm
 
 logger = logging.getLogger(__name__)
 
+idempotency_store = IdempotencyStore(
+    ttl_seconds=Config.IDEMPOTENCY_TTL_SECONDS, max_entries=Config.IDEMPOTENCY_MAX_ENTRIES
+)
 
-def generate_stl_bytes(image_base64: str, enable_pbr: bool, request_id: str) -> bytes:
-    """Generate STL bytes from image, using example.stl in development mode.
-    
-    Args:
-        image_base64: Base64 encoded image data
-        enable_pbr: Whether to enable PBR rendering
-        request_id: Request identifier for logging
-        
-    Returns:
-        STL file bytes
-    """
-    def _generate_with_ai3d() -> bytes:
-        """Generate STL using Tencent AI3D service."""
-        stl_bytes = generate_stl_from_image_base64(
-            image_base64,
-            enable_pbr=enable_pbr,
-            poll_interval_seconds=5,
-            timeout_seconds=300
-        )
-        return stl_bytes
-
-    if Config.ENVIRONMENT == "development":
-        try:
-            with open("example.stl", "rb") as f:
-                stl_bytes = f.read()
-            return stl_bytes
-        except FileNotFoundError:
-            logger.error(f"[{request_id}] example.stl file not found, falling back to generation")
-            return _generate_with_ai3d()
-    else:
-        return _generate_with_ai3d()
-
-
-async def generate_stl_bytes_async(image_base64: str, enable_pbr: bool, request_id: str) -> bytes:
-    """Async wrapper to generate STL bytes using Tencent service.
-    In development mode, still returns local example file to keep parity.
-    """
-    async def _generate_with_ai3d_async() -> bytes:
-        stl_bytes = await generate_stl_from_image_base64_async(
-            image_base64,
-            enable_pbr=enable_pbr,
-            poll_interval_seconds=5,
-            timeout_seconds=300
-        )
-        return stl_bytes
-
-    if Config.ENVIRONMENT == "development":
-        try:
-            with open("example.stl", "rb") as f:
-                stl_bytes = f.read()
-            return stl_bytes
-        except FileNotFoundError:
-            logger.error(f"[{request_id}] example.stl file not found, falling back to generation")
-            return await _generate_with_ai3d_async()
-    else:
-        return await _generate_with_ai3d_async()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await init_client()
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase client: {e}")
+    await job_poller.start()
+    await admission_controller.start()
+    await job_manager.start()
+    await batch_manager.start()
+    await trace_exporter.start()
+    await readiness_monitor.start()
+    if Config.TENCENT_JOB_RECOVERY_ENABLED:
+        await job_recovery.start()
+    # Serve immediately; connections and heavy imports warm up meanwhile
+    prewarm_task = asyncio.create_task(prewarm(), name="startup-prewarm") if Config.STARTUP_PREWARM_ENABLED else None
+    try:
+        yield
+    finally:
+        if prewarm_task is not None:
+            prewarm_task.cancel()
+            await asyncio.gather(prewarm_task, return_exceptions=True)
+        await readiness_monitor.stop()
+        await job_recovery.stop()
+        await generation_events.stop()
+        await batch_manager.stop()
+        await job_manager.stop()
+        await admission_controller.stop()
+        await job_poller.stop()
+        await close_client()
+        # Last trace flush may POST to the collector over the shared client
+        await trace_exporter.stop()
+        await close_http_client()
+        shutdown_preprocess_pool()
+        stl_cache.close()
 
 # Initialize FastAPI
-app = FastAPI(title="3D Generation API")
+app = FastAPI(title="3D Generation API", lifespan=lifespan)
 
 # CORS setup
 ALLOWED_ORIGINS = Config.allowed_origins()
@@ -107,7 +101,10 @@ async def _global_exception_handler(request, exc):
 async def generate_3d(
     user_id: str = Form(None),
     memory_id: str = Form(None),
-    enable_pbr: bool = Form(False)
+    enable_pbr: bool = Form(False),
+    mode: Optional[str] = Form(None),
+    preprocess_image: Optional[bool] = Form(None),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """Generate a 3D STL from the memory's figurine image.
 
@@ -115,9 +112,20 @@ async def generate_3d(
     - Fetches the figurine image from Supabase (signed URL)
     - Calls Tencent AI3D to generate an STL
     - Uploads the STL back to Supabase and updates the memory
+
+    With ``mode=async`` (or ``GENERATION_MODE=async``) the work is queued and
+    a 202 with a job id is returned immediately; poll ``GET /jobs/{job_id}``.
+    ``preprocess_image`` overrides ``IMAGE_PREPROCESS_ENABLED`` for this request.
+
+    Concurrent requests for the same memory and options share one pipeline
+    run. A successful response sent with an ``Idempotency-Key`` header is
+    replayed for repeats of that key within ``IDEMPOTENCY_TTL_SECONDS``.
+
+    Once Tencent's job limit and the admission queue are full, new
+    generations are rejected with 429 and a ``Retry-After`` estimate.
     """
     request_start_time = time.time()
-    request_id = f"3d-gen-{int(time.time() * 1000)}"
+    request_id = current_request_id() or new_request_id()
     
 
     try:
@@ -128,71 +136,76 @@ async def generate_3d(
             logger.error(f"[{request_id}] Validation failed: memory_id is required")
             raise HTTPException(status_code=400, detail="memory_id is required")
 
-        # Update memory status to processing_3d
-        try:
-            update_memory_status(memory_id, "processing_3d")
-        except Exception as e:
-            logger.warning(f"[{request_id}] Failed to update memory status: {e}")
-
-        # Fetch and prepare image
-        figurine_url = get_figurine_url_from_memory(memory_id)
-        signed_url = create_signed_url_for_storage_object(figurine_url, expires_in_seconds=3600)
-        image_bytes = download_bytes_from_url(signed_url)
-        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-
-        # Generate STL (async non-blocking)
-        stl_bytes = await generate_stl_bytes_async(image_base64, enable_pbr, request_id)
-
-        # Generate filename and upload STL
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        stl_filename = f"{memory_id + '_' if memory_id else ''}{timestamp}.stl"
-        upload_info = upload_to_supabase(stl_bytes, stl_filename, content_type="model/stl", user_id=user_id)
-        stl_storage_path = upload_info.get("storage_path") if isinstance(upload_info, dict) else None
-        stl_signed_url = upload_info.get("signed_url") if isinstance(upload_info, dict) else None
-
-        # Update memory record
-        updated_memory = None
-        if memory_id and stl_storage_path:
-            try:
-                updated_memory = update_memory_with_stl(memory_id, stl_storage_path)
-            except Exception as e:
-                logger.error(f"[{request_id}] Failed to update memory record: {e}")
+        generation_mode = (mode or Config.GENERATION_MODE).lower()
+        if generation_mode not in ("sync", "async"):
+            raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
 
-        # Update memory status to completed
-        if memory_id:
+        preprocess = Config.IMAGE_PREPROCESS_ENABLED if preprocess_image is None else preprocess_image
+        dedup_key = generation_key(user_id, memory_id, enable_pbr, preprocess)
+        fingerprint = f"{dedup_key}:{generation_mode}"
+        if idempotency_key:
+            try:
+                replay = idempotency_store.get(idempotency_key, fingerprint)
+            except IdempotencyConflictError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            if replay is not None:
+                status_code, body = replay
+                return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+        # Admit before any Supabase work; attaching to a running generation is free
+        admission = None
+        if not generation_flights.in_flight(dedup_key) and job_manager.find_active(dedup_key) is None:
             try:
-                update_memory_status(memory_id, "completed")
-            except Exception as e:
-                logger.warning(f"[{request_id}] Failed to update memory status: {e}")
+                admission = admission_controller.admit()
+            except AdmissionRejectedError as e:
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-        total_time = time.time() - request_start_time
+        if generation_mode == "async":
+            try:
+                job = job_manager.submit(
+                    memory_id, user_id, enable_pbr,
+                    dedup_key=dedup_key,
+                    preprocess=preprocess,
+                    admission=admission
+                )
+            except JobQueueFullError as e:
+                if admission is not None:
+                    admission.release()
+                raise HTTPException(status_code=503, detail=str(e))
+            if admission is not None and job.admission is not admission:
+                admission.release()
+            body = {
+                "status": "accepted",
+                "message": "3D generation job queued",
+                "job_id": job.job_id,
+                "job_url": f"/jobs/{job.job_id}",
+                "stage": job.stage,
+                "progress": job.progress,
+            }
+            if idempotency_key:
+                idempotency_store.put(idempotency_key, fingerprint, 202, body)
+            return JSONResponse(status_code=202, headers={"Location": f"/jobs/{job.job_id}"}, content=body)
 
-        return {
-            "status": "success",
-            "message": "3D STL generated successfully",
-            "stl_url": stl_signed_url,
-            "stl_storage_path": stl_storage_path,
-            "filename": stl_filename,
-            "updated_memory": updated_memory
-        }
+        try:
+            result, shared = await run_generation_deduplicated(
+                user_id, memory_id, enable_pbr, request_id, preprocess=preprocess
+            )
+        finally:
+            if admission is not None:
+                admission.release()
+        if shared:
+            logger.info(f"[{request_id}] Served from a concurrent generation of memory {memory_id}")
+        if idempotency_key:
+            idempotency_store.put(idempotency_key, fingerprint, 200, result)
+        return result
 
     except HTTPException as e:
         total_time = time.time() - request_start_time
         logger.error(f"[{request_id}] Request failed ({e.status_code}): {e.detail} - Duration: {total_time:.1f}s")
-        if memory_id:
-            try:
-                update_memory_status(memory_id, "failed")
-            except Exception as status_e:
-                logger.error(f"[{request_id}] Failed to update memory status: {status_e}")
         raise
     except Exception as e:
         total_time = time.time() - request_start_time
         logger.error(f"[{request_id}] Request failed: {str(e)} ({type(e).__name__}) - Duration: {total_time:.1f}s", exc_info=True)
-        if memory_id:
-            try:
-                update_memory_status(memory_id, "failed")
-            except Exception as status_e:
-                logger.error(f"[{request_id}] Failed to update memory status: {status_e}")
         
         return {
             "status": "error",
@@ -204,36 +217,132 @@ async def generate_3d(
         }
 
 
+@app.post("/generate-3d/batch")
+async def generate_3d_batch(
+    memory_ids: List[str] = Body(...),
+    user_id: Optional[str] = Body(None),
+    enable_pbr: bool = Body(False),
+    preprocess_image: Optional[bool] = Body(None),
+):
+    """Queue STL generation for many memories at once (JSON body).
+
+    Memories are fetched and marked processing_3d in bulk and generated at
+    most ``BATCH_CONCURRENCY`` at a time. Returns 202 with a batch id; poll
+    ``GET /generate-3d/batch/{batch_id}`` for per-item progress. When
+    ``user_id`` is given, memories of other users are rejected. Runnable
+    memories are admitted together: if they exceed the remaining admission
+    capacity, the batch is rejected with 429 and a ``Retry-After`` estimate.
+    """
+    Config.validate()
+    if not memory_ids:
+        raise HTTPException(status_code=400, detail="memory_ids must not be empty")
+    if len(memory_ids) > Config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {Config.BATCH_MAX_ITEMS} memory_ids per batch")
+    validate_inputs(user_id)
+    for memory_id in memory_ids:
+        validate_inputs(memory_id=memory_id)
+
+    preprocess = Config.IMAGE_PREPROCESS_ENABLED if preprocess_image is None else preprocess_image
+    try:
+        batch = await batch_manager.submit(memory_ids, user_id, enable_pbr, preprocess=preprocess)
+    except AdmissionRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    body = {
+        "status": "accepted",
+        "message": "3D generation batch queued",
+        "batch_url": f"/generate-3d/batch/{batch.batch_id}",
+        **batch.to_dict(),
+    }
+    return JSONResponse(status_code=202, headers={"Location": body["batch_url"]}, content=body)
+
+
+@app.get("/generate-3d/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """Return overall and per-item progress of a generation batch."""
+    batch = batch_manager.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    return batch.to_dict()
+
+
+@app.get("/generate-3d/{memory_id}/events")
+async def generation_event_stream(memory_id: str):
+    """Stream a memory's generation progress as Server-Sent Events.
+
+    Each ``progress`` event carries the stage (processing_3d, fetching_image,
+    generating, tencent_wait/run/done, uploading, completed or failed) and
+    a percentage; the stream starts with the latest stage and ends after
+    completed or failed. ``completed`` carries the STL's storage path, never
+    a signed URL: anyone who knows the memory id can read the stream.
+    """
+    validate_inputs(memory_id=memory_id)
+    return StreamingResponse(
+        generation_events.stream(memory_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return stage, progress and result of a queued generation job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Return STL cache hit/miss counters and index size."""
+    return await asyncio.to_thread(stl_cache.stats)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Return pipeline stage latencies, queue gauges and error counters for Prometheus."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process serves requests. No dependency I/O."""
+    return {"status": "alive", "service": "3d-generation-api"}
+
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe from the cached background dependency checks.
+
+    Answers 503 while a required dependency is failing or was not checked recently.
+    """
+    snapshot = readiness_monitor.snapshot()
+    snapshot["timestamp"] = datetime.now().isoformat()
+    status_code = 200 if readiness_monitor.is_ready() else 503
+    return JSONResponse(status_code=status_code, content=snapshot)
+
+
 @app.get("/health")
 async def health_check():
-    """Basic health and dependency checks for the API."""
-    health_start_time = time.time()
-    
-    try:
-        # Check configuration and Supabase connection
-        Config.validate()
-        supabase = get_client()
-        supabase.table('memories').select('id').limit(1).execute()
-        
-        health_duration = time.time() - health_start_time
-        
-        return {
-            "status": "healthy",
-            "service": "3d-generation-api",
-            "timestamp": datetime.now().isoformat(),
-            "response_time_ms": round(health_duration * 1000, 2)
-        }
-    except Exception as e:
-        health_duration = time.time() - health_start_time
-        logger.error(f"Health check failed: {str(e)} - Duration: {health_duration:.1f}s")
-        
-        return {
-            "status": "unhealthy",
-            "service": "3d-generation-api",
-            "timestamp": datetime.now().isoformat(),
-            "error": str(e),
-            "response_time_ms": round(health_duration * 1000, 2)
-        }
+    """Health summary from the cached dependency checks, plus admission, breaker and region state."""
+    readiness = readiness_monitor.snapshot()
+    response = {
+        "status": "healthy" if readiness_monitor.is_ready() else "unhealthy",
+        "service": "3d-generation-api",
+        "timestamp": datetime.now().isoformat(),
+        "dependencies": readiness["dependencies"],
+        "admission": admission_controller.stats(),
+        "circuit_breakers": breaker_states(),
+        "tencent_regions": region_router.snapshot(),
+    }
+    failing = [
+        f"{name}: {dependency['error'] or dependency['status']}"
+        for name, dependency in readiness["dependencies"].items()
+        if dependency["required"] and dependency["status"] != "ok"
+    ]
+    if failing:
+        response["error"] = "; ".join(failing)
+    return response
 
 
 @app.get("/")
@@ -245,7 +354,14 @@ async def root():
         "version": "1.0",
         "endpoints": {
             "generate_3d": "/generate-3d",
-            "health": "/health"
+            "generate_3d_batch": "/generate-3d/batch",
+            "generation_events": "/generate-3d/{memory_id}/events",
+            "jobs": "/jobs/{job_id}",
+            "cache_stats": "/cache/stats",
+            "metrics": "/metrics",
+            "health": "/health",
+            "liveness": "/livez",
+            "readiness": "/readyz"
         },
         "timestamp": datetime.now().isoformat(),
         "description": "API for generating 3D STL files from images using Tencent AI3D service"
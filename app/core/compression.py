@@ -0,0 +1,24 @@
+import gzip
+from typing import Optional
+
+
+# Content-Encoding values accepted by ``compress``
+CONTENT_ENCODINGS = ("gzip", "zstd")
+CONTENT_ENCODING_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+CONTENT_ENCODING_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """Compress ``data`` for storage with the given ``Content-Encoding``.
+
+    zstd needs the optional ``zstandard`` package.
+    """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    if encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
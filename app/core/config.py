@@ -1,6 +1,6 @@
 import os
 from dataclasses import dataclass
-from typing import List
+from typing import List, Tuple
 
 from dotenv import load_dotenv
 
@@ -21,8 +21,152 @@ class Config:
     SUPABASE_BUCKET: str = os.getenv("SUPABASE_BUCKET", "memory-photos")
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
 
+    TENCENT_SECRET_ID: str = os.getenv("TENCENT_SECRET_ID", "")
+    TENCENT_SECRET_KEY: str = os.getenv("TENCENT_SECRET_KEY", "")
+    TENCENT_AI3D_ENDPOINT: str = os.getenv("TENCENT_AI3D_ENDPOINT", "https://ai3d.tencentcloudapi.com")
+    TENCENT_REGION: str = os.getenv("TENCENT_REGION", "ap-guangzhou")
+    # Multi-region routing: new jobs go to the best healthy region of this list
+    # by recent submit latency, job duration and error rate, failing over to
+    # the next on submit errors (default: TENCENT_REGION only)
+    TENCENT_REGIONS: Tuple[str, ...] = tuple(
+        region.strip() for region in os.getenv("TENCENT_REGIONS", "").split(",") if region.strip()
+    ) or (TENCENT_REGION,)
+    # Region stats keep the last samples within this count and age
+    TENCENT_REGION_STATS_WINDOW: int = int(os.getenv("TENCENT_REGION_STATS_WINDOW", "50"))
+    TENCENT_REGION_STATS_MAX_AGE_SECONDS: float = float(os.getenv("TENCENT_REGION_STATS_MAX_AGE_SECONDS", "900"))
+    # A region at this error rate is skipped until its last failure is this old
+    TENCENT_REGION_MAX_ERROR_RATE: float = float(os.getenv("TENCENT_REGION_MAX_ERROR_RATE", "0.5"))
+    TENCENT_REGION_COOLDOWN_SECONDS: float = float(os.getenv("TENCENT_REGION_COOLDOWN_SECONDS", "60"))
+    TENCENT_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("TENCENT_REQUEST_TIMEOUT_SECONDS", "30"))
+    # "base64" sends image bytes inline, "url" passes the signed storage URL to Tencent
+    TENCENT_IMAGE_INPUT_MODE: str = os.getenv("TENCENT_IMAGE_INPUT_MODE", "base64").lower()
+    # Shared job poller: intervals adapt to the observed job duration within these bounds
+    TENCENT_POLL_MIN_INTERVAL_SECONDS: float = float(os.getenv("TENCENT_POLL_MIN_INTERVAL_SECONDS", "2"))
+    TENCENT_POLL_MAX_INTERVAL_SECONDS: float = float(os.getenv("TENCENT_POLL_MAX_INTERVAL_SECONDS", "15"))
+    TENCENT_POLL_MAX_CONCURRENCY: int = int(os.getenv("TENCENT_POLL_MAX_CONCURRENCY", "20"))
+    TENCENT_EXPECTED_JOB_SECONDS: float = float(os.getenv("TENCENT_EXPECTED_JOB_SECONDS", "90"))
+    # Admission control: Tencent jobs in flight (0 = unlimited), submit rate
+    # and burst (rate 0 = unlimited), and requests queued beyond the
+    # in-flight limit before 429
+    TENCENT_MAX_IN_FLIGHT_JOBS: int = int(os.getenv("TENCENT_MAX_IN_FLIGHT_JOBS", "10"))
+    TENCENT_SUBMIT_RATE_PER_SECOND: float = float(os.getenv("TENCENT_SUBMIT_RATE_PER_SECOND", "2"))
+    TENCENT_SUBMIT_BURST: int = int(os.getenv("TENCENT_SUBMIT_BURST", "5"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+    # Durable job tracking: the Tencent job id, region, submit time and options
+    # are saved in the memories.model_3d_job (jsonb) column right after submit,
+    # and a sweeper resumes the jobs of memories left in processing_3d by an
+    # instance that stopped. Needs that column, hence off by default
+    TENCENT_JOB_RECOVERY_ENABLED: bool = os.getenv("TENCENT_JOB_RECOVERY_ENABLED", "false").lower() == "true"
+    TENCENT_JOB_RECOVERY_INTERVAL_SECONDS: float = float(os.getenv("TENCENT_JOB_RECOVERY_INTERVAL_SECONDS", "60"))
+    # Jobs are only taken over once their claim is untouched this long. Live
+    # generations renew the claim every TENCENT_JOB_HEARTBEAT_SECONDS, so the
+    # grace only has to cover a few missed renewals, not a whole generation
+    TENCENT_JOB_RECOVERY_GRACE_SECONDS: float = float(os.getenv("TENCENT_JOB_RECOVERY_GRACE_SECONDS", "360"))
+    TENCENT_JOB_HEARTBEAT_SECONDS: float = float(os.getenv("TENCENT_JOB_HEARTBEAT_SECONDS", "60"))
+    # Older jobs are given up and their memories marked failed (Tencent results expire)
+    TENCENT_JOB_RECOVERY_MAX_AGE_SECONDS: float = float(os.getenv("TENCENT_JOB_RECOVERY_MAX_AGE_SECONDS", "86400"))
+    TENCENT_JOB_RECOVERY_CONCURRENCY: int = int(os.getenv("TENCENT_JOB_RECOVERY_CONCURRENCY", "4"))
+
+    # Retries (jittered exponential backoff) and per-dependency circuit breakers
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY_SECONDS: float = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+    RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "8"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS: float = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+    # Shrink figurine images before submission (per request: form field preprocess_image)
+    IMAGE_PREPROCESS_ENABLED: bool = os.getenv("IMAGE_PREPROCESS_ENABLED", "false").lower() == "true"
+    IMAGE_PREPROCESS_MAX_EDGE: int = int(os.getenv("IMAGE_PREPROCESS_MAX_EDGE", "2048"))
+    # "webp" keeps transparency, "jpeg" flattens it onto white
+    IMAGE_PREPROCESS_FORMAT: str = os.getenv("IMAGE_PREPROCESS_FORMAT", "webp").lower()
+    IMAGE_PREPROCESS_QUALITY: int = int(os.getenv("IMAGE_PREPROCESS_QUALITY", "85"))
+    IMAGE_PREPROCESS_WORKERS: int = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+
+    # Shared outbound HTTP transport (app/core/http.py)
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+    HTTP_READ_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "60"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    # Optional CA bundle path; certificates are always verified
+    HTTP_CA_BUNDLE: str = os.getenv("HTTP_CA_BUNDLE", "")
+    # Download size limits, enforced while streaming
+    MAX_IMAGE_DOWNLOAD_BYTES: int = int(os.getenv("MAX_IMAGE_DOWNLOAD_BYTES", str(10 * 1024 * 1024)))
+    MAX_STL_DOWNLOAD_BYTES: int = int(os.getenv("MAX_STL_DOWNLOAD_BYTES", str(512 * 1024 * 1024)))
+
+    # Request tracing: per-request Server-Timing header, and optional OTLP/JSON
+    # export of finished traces to a file (one export request per line) and/or
+    # a collector endpoint such as http://collector:4318/v1/traces
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_EXPORT_ENDPOINT: str = os.getenv("TRACE_EXPORT_ENDPOINT", "")
+    # Only traces at least this slow are exported
+    TRACE_EXPORT_MIN_DURATION_MS: float = float(os.getenv("TRACE_EXPORT_MIN_DURATION_MS", "0"))
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "5"))
+    TRACE_EXPORT_MAX_QUEUE: int = int(os.getenv("TRACE_EXPORT_MAX_QUEUE", "1000"))
+
+    # Build API clients, open their connections and load lazily imported
+    # modules in the background at startup instead of on the first request
+    STARTUP_PREWARM_ENABLED: bool = os.getenv("STARTUP_PREWARM_ENABLED", "true").lower() == "true"
+
+    # Progress event streams (SSE): keepalive comment interval, how long a
+    # finished generation's last event is kept for late subscribers, how
+    # often a memory generated on another instance is polled in Supabase
+    # (0 = never) and the longest stream before the client reconnects
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_RETENTION_SECONDS: float = float(os.getenv("EVENTS_RETENTION_SECONDS", "300"))
+    EVENTS_REMOTE_POLL_SECONDS: float = float(os.getenv("EVENTS_REMOTE_POLL_SECONDS", "5"))
+    EVENTS_MAX_STREAM_SECONDS: float = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "900"))
+
+    # /readyz and /health answer from dependency checks run in the background
+    # this often; results older than READINESS_STALE_SECONDS count as failing
+    READINESS_CHECK_INTERVAL_SECONDS: float = float(os.getenv("READINESS_CHECK_INTERVAL_SECONDS", "15"))
+    READINESS_CHECK_TIMEOUT_SECONDS: float = float(os.getenv("READINESS_CHECK_TIMEOUT_SECONDS", "5"))
+    READINESS_STALE_SECONDS: float = float(os.getenv("READINESS_STALE_SECONDS", "60"))
+
     CORS_ALLOWED_ORIGINS_ENV: str = os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000")
 
+    # "sync" keeps POST /generate-3d open until the STL is ready, "async" enqueues a job
+    GENERATION_MODE: str = os.getenv("GENERATION_MODE", "sync")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    # Batch generation: items per batch, pipeline runs in flight across all
+    # batches, and figurine URLs signed per bulk request as items start
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_SIGN_CHUNK_SIZE: int = int(os.getenv("BATCH_SIGN_CHUNK_SIZE", "50"))
+    # How long a response sent with an Idempotency-Key is replayed
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    # Stored responses kept per instance; the oldest are evicted beyond this
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+    # Content-addressed STL cache (image hash + options -> stored STL). Off by
+    # default: the SQLite index lives on local disk, which on Cloud Run is a
+    # per-instance, memory-backed /tmp that counts against the instance's
+    # memory and is lost on scale-in. Point STL_CACHE_PATH at a mounted volume
+    # to keep it
+    STL_CACHE_ENABLED: bool = os.getenv("STL_CACHE_ENABLED", "false").lower() == "true"
+    STL_CACHE_PATH: str = os.getenv("STL_CACHE_PATH", "/tmp/stl_cache.sqlite3")
+    STL_CACHE_MAX_ENTRIES: int = int(os.getenv("STL_CACHE_MAX_ENTRIES", "10000"))
+    STL_CACHE_TTL_SECONDS: int = int(os.getenv("STL_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+    # STL post-processing; any enabled step buffers the result instead of streaming it
+    STL_NORMALIZE_ENABLED: bool = os.getenv("STL_NORMALIZE_ENABLED", "false").lower() == "true"
+    # "" (off), "gzip" or "zstd" (needs the zstandard package): store a compressed copy next to the STL
+    STL_COMPRESSION: str = os.getenv("STL_COMPRESSION", "").lower()
+    # Compute bounding box, area, volume and watertightness of each generated mesh
+    STL_METADATA_ENABLED: bool = os.getenv("STL_METADATA_ENABLED", "false").lower() == "true"
+    # Grid resolutions of decimated preview meshes, e.g. "48,128" (empty: none)
+    STL_LOD_RESOLUTIONS: Tuple[int, ...] = tuple(
+        int(value) for value in os.getenv("STL_LOD_RESOLUTIONS", "").split(",") if value.strip()
+    )
+
+    # Stream Tencent results into storage instead of holding the whole STL in memory
+    STL_STREAMING_ENABLED: bool = os.getenv("STL_STREAMING_ENABLED", "true").lower() == "true"
+    STL_STREAM_BUFFER_BYTES: int = int(os.getenv("STL_STREAM_BUFFER_BYTES", str(1024 * 1024)))
+    # Spool directory for results without a Content-Length (on Cloud Run /tmp counts against memory)
+    STL_SPOOL_DIR: str = os.getenv("STL_SPOOL_DIR", "")
+
     @staticmethod
     def allowed_origins(extra_origins: List[str] | None = None) -> List[str]:
         env_origins = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000").split(",") if o.strip()]
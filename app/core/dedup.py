@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller starts the work as a task; later callers with the same
+    key await that task and receive the same result or exception. The task is
+    shielded so one caller disconnecting does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run ``fn`` once per key; returns ``(result, shared)``.
+
+        ``shared`` is True when the caller attached to an existing execution.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+
+class IdempotencyConflictError(ValueError):
+    """An Idempotency-Key was reused with different request parameters."""
+
+
+@dataclass
+class _StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: Any
+    expires_at: float
+
+
+class IdempotencyStore:
+    """In-process store of completed responses keyed by Idempotency-Key.
+
+    Entries are kept in insertion order, which with a fixed TTL is also
+    expiry order: expired entries are pruned from the head, and beyond
+    ``max_entries`` the oldest ones are evicted.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._responses: "OrderedDict[str, _StoredResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: str, fingerprint: str) -> Optional[Tuple[int, Any]]:
+        stored = self._responses.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at < time.monotonic():
+            del self._responses[key]
+            return None
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyConflictError("Idempotency-Key was already used with different parameters")
+        return stored.status_code, stored.body
+
+    def put(self, key: str, fingerprint: str, status_code: int, body: Any) -> None:
+        if self._ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        self._prune(now)
+        self._responses.pop(key, None)
+        while len(self._responses) >= self._max_entries:
+            self._responses.popitem(last=False)
+        self._responses[key] = _StoredResponse(
+            fingerprint=fingerprint,
+            status_code=status_code,
+            body=body,
+            expires_at=now + self._ttl_seconds,
+        )
+
+    def _prune(self, now: float) -> None:
+        while self._responses:
+            key, stored = next(iter(self._responses.items()))
+            if stored.expires_at >= now:
+                break
+            del self._responses[key]
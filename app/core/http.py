@@ -1,25 +1,115 @@
 import logging
-import ssl
-from urllib.request import urlopen
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
+import httpx
 from fastapi import HTTPException
 
+from . import tracing
+from .config import Config
+
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 64 * 1024
 
-def download_bytes_from_url(url: str, timeout_seconds: int = 60) -> bytes:
-    try:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
+# Process-wide client for outbound HTTP. httpx keeps a keep-alive pool per
+# origin, so Supabase Storage, Tencent API and COS each reuse their own
+# connections (HTTP/2 where the server offers it).
+_client: Optional[httpx.AsyncClient] = None
+
+
+class ResponseTooLargeError(RuntimeError):
+    """A download exceeded its size limit; raised while streaming, before it is buffered."""
+
+    def __init__(self, url: str, max_bytes: int):
+        super().__init__(f"Response from {_redact(url)} exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def _client_options() -> dict:
+    return {
+        "http2": True,
+        "timeout": httpx.Timeout(
+            Config.HTTP_READ_TIMEOUT_SECONDS,
+            connect=Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+        ),
+        "limits": httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        "verify": Config.HTTP_CA_BUNDLE or True,
+        "follow_redirects": True,
+    }
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared async client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(**_client_options())
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (FastAPI shutdown hook)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
 
-        with urlopen(url, timeout=timeout_seconds, context=ssl_context) as resp:
-            image_bytes = resp.read()
 
-        return image_bytes
+@asynccontextmanager
+async def stream_url(url: str, *, timeout_seconds: Optional[float] = None) -> AsyncIterator[httpx.Response]:
+    """GET ``url`` over the shared client and yield the unread response.
+
+    Raises httpx.HTTPStatusError on an error status. The body is read by the
+    caller, e.g. with ``iter_limited``.
+    """
+    timeout = timeout_seconds if timeout_seconds is not None else httpx.USE_CLIENT_DEFAULT
+    with tracing.span("http.get", tracing.SPAN_KIND_CLIENT, **{"server.address": httpx.URL(url).host}):
+        async with get_http_client().stream("GET", url, timeout=timeout) as resp:
+            tracing.set_attributes(**{"http.status_code": resp.status_code})
+            resp.raise_for_status()
+            yield resp
+
+
+def check_content_length(resp: httpx.Response, max_bytes: Optional[int]) -> None:
+    """Fail early when the announced body size is already over the limit."""
+    content_length = resp.headers.get("content-length")
+    if max_bytes is not None and content_length and int(content_length) > max_bytes:
+        raise ResponseTooLargeError(str(resp.url), max_bytes)
+
+
+async def iter_limited(
+    resp: httpx.Response,
+    max_bytes: Optional[int],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Yield the response body in chunks, failing once ``max_bytes`` is passed."""
+    check_content_length(resp, max_bytes)
+    received = 0
+    async for chunk in resp.aiter_bytes(chunk_size):
+        received += len(chunk)
+        if max_bytes is not None and received > max_bytes:
+            raise ResponseTooLargeError(str(resp.url), max_bytes)
+        yield chunk
+
+
+async def fetch_bytes(url: str, *, max_bytes: Optional[int], timeout_seconds: Optional[float] = None) -> bytes:
+    """Download ``url`` into memory, enforcing ``max_bytes`` while streaming."""
+    async with stream_url(url, timeout_seconds=timeout_seconds) as resp:
+        return b"".join([chunk async for chunk in iter_limited(resp, max_bytes)])
+
+
+async def download_bytes_from_url(url: str, timeout_seconds: int = 60) -> bytes:
+    try:
+        return await fetch_bytes(url, max_bytes=Config.MAX_IMAGE_DOWNLOAD_BYTES, timeout_seconds=timeout_seconds)
     except Exception as e:
-        logger.error(f"Failed to download image from URL {url}: {str(e)}")
+        logger.error(f"Failed to download image from URL {_redact(url)}: {str(e)}")
         raise HTTPException(status_code=400, detail="Failed to download image from URL")
 
 
+def _redact(url: str) -> str:
+    """Drop the query string, which carries signed URL tokens."""
+    return url.split("?", 1)[0]
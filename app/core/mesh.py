@@ -0,0 +1,103 @@
+import numpy as np
+
+
+def simplify_vertex_clustering(triangles: np.ndarray, resolution: int) -> np.ndarray:
+    """Decimate a triangle soup by snapping vertices to a uniform grid.
+
+    The bounding box is split into cubic cells, ``resolution`` along its
+    longest axis. Vertices in the same cell merge into their mean, triangles
+    that collapse are dropped and duplicates removed. Everything is done
+    with array operations, so it scales to millions of triangles. Returns a
+    new ``(m, 3, 3)`` float32 array.
+    """
+    if len(triangles) == 0:
+        return triangles.astype(np.float32, copy=True)
+    vertices = triangles.reshape(-1, 3).astype(np.float64)
+    lower = vertices.min(axis=0)
+    extent = vertices.max(axis=0) - lower
+    cell = max(float(extent.max()), np.finfo(np.float32).tiny) / max(1, resolution)
+
+    cells = np.floor((vertices - lower) / cell).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, cluster, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    representatives = np.empty((len(counts), 3))
+    for axis in range(3):
+        representatives[:, axis] = np.bincount(cluster, weights=vertices[:, axis]) / counts
+
+    faces = cluster.reshape(-1, 3)
+    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[keep]
+    # Faces over the same three clusters are duplicates, whatever their order
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    faces = faces[np.sort(first)]
+    return representatives[faces].astype(np.float32)
+
+
+def weld_vertices(triangles: np.ndarray) -> tuple:
+    """Merge bit-identical vertices of a triangle soup.
+
+    Returns ``(vertices, faces)`` where ``faces`` indexes ``vertices``.
+    """
+    corners = np.ascontiguousarray(triangles, dtype=np.float32).reshape(-1, 3)
+    # One 12-byte key per vertex, so the sort compares rows in a single pass
+    keys = corners.view(np.dtype((np.void, corners.dtype.itemsize * 3))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return corners[first], inverse.reshape(-1, 3)
+
+
+def analyze_mesh(triangles: np.ndarray) -> dict:
+    """Bounding box, triangle count, surface area, volume and watertightness.
+
+    The mesh is watertight when, after welding identical vertices, every
+    edge is shared by exactly two faces that traverse it in opposite
+    directions; only then is the enclosed volume meaningful.
+    """
+    count = len(triangles)
+    if count == 0:
+        return {
+            "triangles": 0,
+            "vertices": 0,
+            "bounding_box": None,
+            "surface_area": 0.0,
+            "volume": None,
+            "watertight": False,
+        }
+
+    corners = triangles.astype(np.float64)
+    v0, v1, v2 = corners[:, 0], corners[:, 1], corners[:, 2]
+    cross = np.cross(v1 - v0, v2 - v0)
+    area = 0.5 * float(np.linalg.norm(cross, axis=1).sum())
+    # Sum of signed tetrahedra against the origin
+    volume = float(np.einsum("ij,ij->", v0, cross)) / 6.0
+
+    vertices, faces = weld_vertices(triangles)
+    n = len(vertices)
+    start = faces.ravel().astype(np.int64)
+    end = np.roll(faces, -1, axis=1).ravel().astype(np.int64)
+    # Key each edge by its endpoints, low bit set when it runs low -> high.
+    # Sorted, a closed and consistently oriented mesh has exactly the pairs
+    # (2k, 2k + 1): every edge used once in each direction
+    edges = (np.minimum(start, end) * n + np.maximum(start, end)) * 2 + (start < end)
+    edges.sort()
+    watertight = bool(
+        len(edges) % 2 == 0
+        and np.all(edges[0::2] % 2 == 0)
+        and np.all(edges[1::2] == edges[0::2] + 1)
+    )
+
+    lower = vertices.min(axis=0).astype(np.float64)
+    upper = vertices.max(axis=0).astype(np.float64)
+    return {
+        "triangles": count,
+        "vertices": n,
+        "bounding_box": {
+            "min": lower.tolist(),
+            "max": upper.tolist(),
+            "size": (upper - lower).tolist(),
+        },
+        "surface_area": area,
+        "volume": abs(volume) if watertight else None,
+        "watertight": watertight,
+    }
@@ -0,0 +1,188 @@
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import tracing
+
+
+# Latency buckets (seconds): sub-millisecond lookups up to multi-minute Tencent jobs
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Payload buckets (bytes): 16 KiB .. 1 GiB in powers of four
+SIZE_BUCKETS = tuple(16 * 1024 * 4 ** power for power in range(9))
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self._render_samples()
+
+    def _render_samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter. Updates are plain increments on the event loop thread."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _render_samples(self) -> Iterable[str]:
+        for values, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self._labels(values))} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; ``observe`` is a bisect and two increments."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (last is +Inf), sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = ([0] * (len(self._buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self._buckets, value)] += 1
+        total[0] += value
+
+    def _render_samples(self) -> Iterable[str]:
+        for values, (counts, total) in sorted(self._series.items()):
+            labels = self._labels(values)
+            cumulative = 0
+            for bound, count in zip(self._buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter read from existing state when scraped."""
+
+    def __init__(self, name: str, documentation: str, type: str, collect: Callable[[], Iterable[Sample]]):
+        super().__init__(name, documentation)
+        self.type = type
+        self._collect = collect
+
+    def _render_samples(self) -> Iterable[str]:
+        for labels, value in self._collect():
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.register(CallbackMetric(name, documentation, "gauge", collect))
+
+    def counter_callback(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        self.register(CallbackMetric(name, documentation, "counter", collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Pipeline instrumentation shared by the services
+STAGE_SECONDS = REGISTRY.histogram(
+    "generation_stage_seconds", "Duration of each generation pipeline stage.", ("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "generation_errors_total", "Pipeline failures by stage and exception type.", ("stage", "type")
+)
+TENCENT_POLLS = REGISTRY.histogram(
+    "tencent_polls_per_job", "Status queries needed per finished Tencent job.", buckets=POLL_BUCKETS
+)
+PAYLOAD_BYTES = REGISTRY.histogram(
+    "payload_bytes", "Size of figurine images and STL results.", ("kind",), buckets=SIZE_BUCKETS
+)
+GENERATION_SECONDS = REGISTRY.histogram(
+    "generation_seconds", "End-to-end pipeline duration by outcome.", ("outcome",)
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage and count its failures by exception type.
+
+    The stage is also recorded as a span of the current trace.
+    """
+    started = time.perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    except Exception as e:
+        STAGE_ERRORS.inc(name, type(e).__name__)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, name)
+
+
+def observe_payload(kind: str, size: Optional[int]) -> None:
+    if size is not None:
+        PAYLOAD_BYTES.observe(size, kind)
@@ -5,6 +5,7 @@ from typing import Callable
 from fastapi import Request
 from fastapi.responses import JSONResponse
 
+from . import metrics, tracing
 from .config import Config
 
 
@@ -27,28 +28,56 @@ async def add_cors_headers(request: Request, call_next: Callable):
 
 
 async def log_requests(request: Request, call_next: Callable):
-    start_time = time.time()
-    request_id = f"{int(time.time() * 1000)}-{id(request)}"
+    """Log slow or failed requests and trace each request.
 
-    try:
-        response = await call_next(request)
+    The request id (the caller's ``X-Request-ID`` or a new one) is shared
+    through the tracing context with the handlers and the exception
+    handler, and returned in ``X-Request-ID``; a ``Server-Timing`` header
+    breaks the response time down by span.
+    """
+    start_time = time.time()
+    request_id = tracing.request_id_from_header(request.headers.get("x-request-id"))
+    request.state.request_id = request_id
+
+    with tracing.start_trace(
+        request.method,
+        request_id,
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "url.path": request.url.path},
+    ) as trace:
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            process_time = time.time() - start_time
+            metrics.HTTP_REQUEST_SECONDS.observe(process_time, request.method, _route_path(request), "500")
+            logger.error(f"[{request_id}] {request.method} {request.url.path} - ERROR: {str(e)} - {process_time:.2f}s")
+            raise
         process_time = time.time() - start_time
+        route = _route_path(request)
+        metrics.HTTP_REQUEST_SECONDS.observe(process_time, request.method, route, str(response.status_code))
+        trace.root.name = f"{request.method} {route}"
+        trace.root.attributes["http.status_code"] = response.status_code
         # Only log slow requests (>1s) or errors
         if process_time > 1.0 or response.status_code >= 400:
             logger.info(f"[{request_id}] {request.method} {request.url.path} - {response.status_code} - {process_time:.2f}s")
+        response.headers["X-Request-ID"] = request_id
+        if Config.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = trace.server_timing()
         return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        logger.error(f"[{request_id}] {request.method} {request.url.path} - ERROR: {str(e)} - {process_time:.2f}s")
-        raise
+
+
+def _route_path(request: Request) -> str:
+    """Route template (``/jobs/{job_id}``) so metric labels stay bounded."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
 
 
 async def global_exception_handler(request: Request, exc: Exception):
-    request_id = f"{int(time.time() * 1000)}-{id(request)}"
+    request_id = getattr(request.state, "request_id", None) or tracing.new_request_id()
     logger.error(f"[{request_id}] Unhandled exception in {request.method} {request.url.path}: {str(exc)}", exc_info=True)
 
     origin = request.headers.get("origin")
-    response = JSONResponse(status_code=500, content={"detail": "Internal server error"})
+    response = JSONResponse(status_code=500, content={"detail": "Internal server error"}, headers={"X-Request-ID": request_id})
     if origin and origin in cors_allowed_origins():
         response.headers["Access-Control-Allow-Origin"] = origin
         response.headers["Access-Control-Allow-Credentials"] = "true"
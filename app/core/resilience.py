@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from . import metrics
+from .config import Config
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: the dependency is overloaded or briefly down
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """The dependency's circuit breaker is open; the call was not attempted."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _causes(exc: BaseException):
+    """``exc`` and the errors it was raised from or while handling.
+
+    Client libraries fail on e.g. an HTML 503 page while handling the
+    HTTP error, hiding the status in the exception context.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def http_status(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an httpx, storage3 or similar client error."""
+    for error in _causes(exc):
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code
+        status = getattr(error, "status", None) or getattr(error, "status_code", None)
+        try:
+            if status is not None:
+                return int(status)
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def is_unsent_error(exc: BaseException) -> bool:
+    """The request never reached the server, so even non-idempotent calls may be retried."""
+    return any(
+        isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+        for error in _causes(exc)
+    )
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Network failures and overload/unavailable HTTP statuses."""
+    if any(isinstance(error, httpx.TransportError) for error in _causes(exc)):
+        return True
+    return http_status(exc) in TRANSIENT_STATUSES
+
+
+class CircuitBreaker:
+    """Per-dependency breaker: fail fast after repeated transient failures.
+
+    Opens after ``failure_threshold`` consecutive failures; after
+    ``reset_seconds`` one probe call is let through (half-open) and its
+    outcome closes or re-opens the circuit. ``is_failure`` picks the errors
+    that mean the dependency is unhealthy; any other outcome, including a
+    rejected request, shows it is up.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        is_failure: Callable[[BaseException], bool] = is_transient_error,
+    ):
+        self.name = name
+        self.is_failure = is_failure
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened_count = 0
+        self.rejected_count = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._reset_seconds:
+            return self.HALF_OPEN
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        if self._state == self.CLOSED:
+            return
+        remaining = self._reset_seconds - (time.monotonic() - self._opened_at)
+        if self._state == self.OPEN and remaining <= 0:
+            self._state = self.HALF_OPEN
+        if self._state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        self.rejected_count += 1
+        raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self._failure_threshold:
+            if self._state != self.OPEN:
+                self.opened_count += 1
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another call probe when this one ended without an outcome (cancelled)."""
+        self._probing = False
+
+    def record(self, exc: BaseException) -> None:
+        if self.is_failure(exc):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected_count,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, is_failure: Callable[[BaseException], bool] = is_transient_error) -> CircuitBreaker:
+    """Shared breaker for dependency ``name``, created on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers.setdefault(name, CircuitBreaker(
+            name,
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=Config.CIRCUIT_RESET_SECONDS,
+            is_failure=is_failure,
+        ))
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in sorted(_breakers.items())}
+
+
+def _breaker_state_samples():
+    for name, breaker in sorted(_breakers.items()):
+        current = breaker.state
+        for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+            yield {"dependency": name, "state": state}, int(state == current)
+
+
+metrics.REGISTRY.gauge_callback(
+    "circuit_breaker_state", "Current circuit breaker state (1 for the active state).", _breaker_state_samples
+)
+metrics.REGISTRY.counter_callback(
+    "circuit_breaker_rejected_total",
+    "Calls failed fast by an open circuit.",
+    lambda: [({"dependency": name}, breaker.rejected_count) for name, breaker in sorted(_breakers.items())],
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry schedule for one operation.
+
+    ``retry_on`` decides which errors are retried: for non-idempotent calls
+    only errors where the request provably was not processed. Delays use
+    full jitter: uniform in [0, min(max_delay, base_delay * 2 ** attempt)].
+    """
+
+    retry_on: Callable[[BaseException], bool]
+    attempts: int = Config.RETRY_MAX_ATTEMPTS
+    base_delay: float = Config.RETRY_BASE_DELAY_SECONDS
+    max_delay: float = Config.RETRY_MAX_DELAY_SECONDS
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def _next_delay(policy: RetryPolicy, attempt: int, exc: BaseException, deadline: Optional[float]) -> Optional[float]:
+    """Backoff before the next attempt, or None to give up."""
+    if attempt + 1 >= policy.attempts or not policy.retry_on(exc):
+        return None
+    delay = policy.delay(attempt)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+async def call_with_retry(
+    operation: str,
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    deadline: Optional[float] = None,
+) -> T:
+    """Await ``fn()`` under ``policy`` and ``breaker``.
+
+    Transient failures count against the breaker; no retry sleeps past
+    ``deadline`` (monotonic). The last error is re-raised.
+    """
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release_probe()
+            raise
+        except Exception as e:
+            if breaker is not None:
+                breaker.record(e)
+            delay = _next_delay(policy, attempt, e, deadline)
+            if delay is None:
+                raise
+            logger.warning(f"{operation} failed (attempt {attempt + 1}/{policy.attempts}), retrying in {delay:.2f}s: {e}")
+            attempt += 1
+            await asyncio.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
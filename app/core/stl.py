@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+
+
+BINARY_HEADER_SIZE = 80
+BINARY_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+# Written header; must not start with "solid" or readers may take it for ASCII
+DEFAULT_HEADER = b"Binary STL"
+
+# Letters that never appear in a number; "e"/"E" may be exponent markers
+_KEYWORD_LETTERS = bytes(c for c in range(256) if chr(c).isascii() and chr(c).isalpha() and c not in b"eE")
+_BLANK_KEYWORD_LETTERS = bytes.maketrans(_KEYWORD_LETTERS, b" " * len(_KEYWORD_LETTERS))
+# Every line that is not a vertex line (solid, facet normal, outer loop, ...)
+_NON_VERTEX_LINE = re.compile(rb"^(?![ \t]*vertex\b)[^\n]*", re.MULTILINE)
+
+
+class StlFormatError(ValueError):
+    """The bytes are not a readable STL file."""
+
+
+def is_binary_stl(data: bytes) -> bool:
+    """Binary STL iff the size matches the triangle count in the header.
+
+    Checked by size rather than the "solid" prefix, which some binary
+    exporters also write.
+    """
+    if len(data) < BINARY_HEADER_SIZE + 4:
+        return False
+    count = int(np.frombuffer(data, dtype="<u4", count=1, offset=BINARY_HEADER_SIZE)[0])
+    return len(data) == BINARY_HEADER_SIZE + 4 + count * BINARY_DTYPE.itemsize
+
+
+def parse_stl(data: bytes) -> np.ndarray:
+    """Parse ASCII or binary STL into an ``(n, 3, 3)`` float32 array.
+
+    Both formats are decoded by NumPy without per-triangle Python loops.
+    """
+    if is_binary_stl(data):
+        return _parse_binary(data)
+    if data[:1024].lstrip()[:5].lower() == b"solid":
+        return _parse_ascii(data)
+    raise StlFormatError("Data is neither binary nor ASCII STL")
+
+
+def _parse_binary(data: bytes) -> np.ndarray:
+    count = int(np.frombuffer(data, dtype="<u4", count=1, offset=BINARY_HEADER_SIZE)[0])
+    records = np.frombuffer(data, dtype=BINARY_DTYPE, count=count, offset=BINARY_HEADER_SIZE + 4)
+    return np.ascontiguousarray(records["vertices"], dtype=np.float32)
+
+
+def _parse_ascii(data: bytes) -> np.ndarray:
+    # Drop the "solid <name>" line and everything from "endsolid"; names may contain digits
+    start = data.find(b"\n") + 1
+    end = data.rfind(b"endsolid")
+    body = data[start:end if end >= start else len(data)]
+    vertex_count = body.count(b"vertex")
+    if not vertex_count:
+        # Some exporters write the keywords in upper case
+        body = body.lower()
+        vertex_count = body.count(b"vertex")
+    if vertex_count % 3:
+        raise StlFormatError("ASCII STL has a vertex count that is not a multiple of three")
+
+    # Fast path: turn keyword letters into spaces in one C pass, then blank
+    # the "e"s left over from keywords (those follow whitespace, an exponent
+    # "e" never does), leaving 3 normal + 9 vertex numbers per facet for
+    # NumPy's C number parser
+    chars = np.frombuffer(bytearray(b" " + body.translate(_BLANK_KEYWORD_LETTERS)), dtype=np.uint8)
+    for marker in (b"e", b"E") if b"E" in body else (b"e",):
+        stray = chars[1:] == ord(marker)
+        stray &= chars[:-1] <= ord(" ")
+        chars[1:][stray] = ord(" ")
+    try:
+        values = np.fromstring(chars.tobytes(), dtype=np.float32, sep=" ")
+    except ValueError:
+        # A token that is neither a keyword nor a number (comments, tool tags)
+        values = None
+    if values is not None and values.size == vertex_count * 4:
+        return np.ascontiguousarray(values.reshape(-1, 12)[:, 3:].reshape(-1, 3, 3))
+
+    # Non-standard layout (several solids, missing normals, stray tokens, ...):
+    # keep only the vertex lines and parse their coordinates
+    coordinates = _NON_VERTEX_LINE.sub(b"", body).replace(b"vertex", b" ")
+    try:
+        values = np.fromstring(coordinates, dtype=np.float32, sep=" ")
+    except ValueError as e:
+        raise StlFormatError(f"ASCII STL has malformed vertex lines: {e}") from e
+    if values.size != vertex_count * 3:
+        raise StlFormatError("ASCII STL has malformed vertex lines")
+    return values.reshape(-1, 3, 3)
+
+
+def face_normals(triangles: np.ndarray) -> np.ndarray:
+    """Unit normals by the right-hand rule; zero for degenerate triangles."""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def write_binary_stl(triangles: np.ndarray, header: bytes = DEFAULT_HEADER) -> bytes:
+    """Serialize triangles as binary STL with recomputed facet normals."""
+    records = np.zeros(len(triangles), dtype=BINARY_DTYPE)
+    records["vertices"] = triangles
+    records["normal"] = face_normals(triangles.astype(np.float32, copy=False))
+    return (
+        header[:BINARY_HEADER_SIZE].ljust(BINARY_HEADER_SIZE, b"\0")
+        + np.uint32(len(records)).tobytes()
+        + records.tobytes()
+    )
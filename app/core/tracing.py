@@ -0,0 +1,317 @@
+import asyncio
+import functools
+import json
+import logging
+import re
+import secrets
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+
+from . import http
+from .config import Config
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SERVICE_NAME = "3d-generation-api"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# Server-Timing entries per response (browsers show them in the network panel)
+_SERVER_TIMING_MAX_ENTRIES = 20
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_TRACEPARENT_PATTERN = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_SERVER_TIMING_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    kind: int
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self, trace_id: str) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns if self.end_ns is not None else self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """Spans of one request (or background job), recorded in start order."""
+
+    def __init__(self, request_id: str, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None):
+        self.request_id = request_id
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.parent_span_id = parent_span_id
+        self.spans: List[Span] = []
+
+    @property
+    def root(self) -> Optional[Span]:
+        return self.spans[0] if self.spans else None
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` header value: total time, then time per span name."""
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans[1:]:
+            if span.end_ns is None:
+                continue
+            entry = totals.setdefault(_SERVER_TIMING_NAME.sub("_", span.name), [0.0, 0])
+            entry[0] += span.duration_ms
+            entry[1] += 1
+        entries = [f"total;dur={self.root.duration_ms:.1f}"] if self.root else []
+        for name, (duration_ms, count) in list(totals.items())[:_SERVER_TIMING_MAX_ENTRIES]:
+            description = f';desc="{count} calls"' if count > 1 else ""
+            entries.append(f"{name};dur={duration_ms:.1f}{description}")
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def new_request_id() -> str:
+    return f"3d-{int(time.time() * 1000)}-{secrets.token_hex(3)}"
+
+
+def request_id_from_header(value: Optional[str]) -> str:
+    """The caller's ``X-Request-ID`` when it is a sane token, else a new id."""
+    if value and _REQUEST_ID_PATTERN.match(value):
+        return value
+    return new_request_id()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def current_traceparent() -> Optional[str]:
+    """W3C ``traceparent`` of the current span, to link work started from it."""
+    trace = _current_trace.get()
+    span = _current_span.get()
+    if trace is None or span is None:
+        return None
+    return f"00-{trace.trace_id}-{span.span_id}-01"
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Attach attributes to the current span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def start_trace(
+    name: str,
+    request_id: str,
+    *,
+    traceparent: Optional[str] = None,
+    kind: int = SPAN_KIND_SERVER,
+    **attributes: Any,
+) -> Iterator[Trace]:
+    """Record a trace rooted at span ``name`` for the work in this context.
+
+    ``traceparent`` (W3C header) joins the caller's trace. The finished
+    trace is handed to the exporter.
+    """
+    trace_id = parent_span_id = None
+    match = _TRACEPARENT_PATTERN.match(traceparent or "")
+    if match:
+        trace_id, parent_span_id = match.groups()
+    trace = Trace(request_id, trace_id, parent_span_id)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        with span(name, kind, **{"request.id": request_id, **attributes}):
+            yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace_exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span.
+
+    A no-op outside a trace, so library code can be instrumented freely.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent is not None else trace.parent_span_id,
+        kind=kind,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def traced(name: str, kind: int = SPAN_KIND_CLIENT) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorator: run a coroutine function inside span ``name``."""
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(name, kind):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp_document(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP/JSON ``ExportTraceServiceRequest`` for ``traces``."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [span.to_otlp(trace.trace_id) for trace in traces for span in trace.spans],
+            }],
+        }],
+    }
+
+
+class TraceExporter:
+    """Ships finished traces as OTLP/JSON in the background.
+
+    Traces are queued in memory (oldest dropped when full) and flushed
+    every ``interval_seconds`` to a file, one export request per line,
+    and/or POSTed to an OTLP/HTTP collector. Traces faster than
+    ``min_duration_ms`` are not exported.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        endpoint: str,
+        min_duration_ms: float,
+        interval_seconds: float,
+        max_queue: int,
+    ):
+        self._path = path
+        self._endpoint = endpoint
+        self._min_duration_ms = min_duration_ms
+        self._interval_seconds = max(0.1, interval_seconds)
+        self._pending: Deque[Trace] = deque(maxlen=max(1, max_queue))
+        self._task: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._path or self._endpoint)
+
+    def export(self, trace: Trace) -> None:
+        if not self.enabled or trace.root is None or trace.root.duration_ms < self._min_duration_ms:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(trace)
+
+    async def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="trace-exporter")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval_seconds)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        traces = list(self._pending)
+        self._pending.clear()
+        document = otlp_document(traces)
+        try:
+            if self._path:
+                await asyncio.to_thread(self._append, json.dumps(document, separators=(",", ":")))
+            if self._endpoint:
+                resp = await http.get_http_client().post(self._endpoint, json=document, timeout=10)
+                resp.raise_for_status()
+            self.exported += len(traces)
+        except Exception as e:
+            self.dropped += len(traces)
+            logger.warning(f"Failed to export {len(traces)} traces: {e}")
+
+    def _append(self, line: str) -> None:
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+trace_exporter = TraceExporter(
+    path=Config.TRACE_EXPORT_PATH,
+    endpoint=Config.TRACE_EXPORT_ENDPOINT,
+    min_duration_ms=Config.TRACE_EXPORT_MIN_DURATION_MS,
+    interval_seconds=Config.TRACE_EXPORT_INTERVAL_SECONDS,
+    max_queue=Config.TRACE_EXPORT_MAX_QUEUE,
+)
@@ -0,0 +1,230 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ..core import metrics
+from ..core.config import Config
+from .job_poller import job_poller
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Tencent capacity and the admission queue are both used up."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation capacity exhausted, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Submit-rate limiter; ``rate`` tokens per second, up to ``burst`` saved.
+
+    Tokens are reserved in arrival order, so the balance may go negative;
+    a reservation returns how long to wait for its token.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self._rate > 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        if not self.enabled:
+            return 0.0
+        self._refill(time.monotonic())
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self._rate)
+
+    def delay_for(self, count: int) -> float:
+        """Seconds until ``count`` more tokens could be reserved without waiting."""
+        if not self.enabled:
+            return 0.0
+        self._refill(time.monotonic())
+        return max(0.0, (count - self._tokens) / self._rate)
+
+    def tokens(self) -> float:
+        self._refill(time.monotonic())
+        return self._tokens
+
+
+class AdmissionTicket:
+    """Admission of one request; release it when the request is done."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._admitted -= 1
+
+
+class AdmissionController:
+    """Admission control in front of Tencent AI3D.
+
+    At most ``max_in_flight`` jobs run at Tencent at once and submissions
+    are paced by a token bucket. Up to ``max_queue`` further requests are
+    admitted and wait for a slot; beyond that ``admit`` fails fast with a
+    Retry-After estimate, before the request does any Supabase work.
+    A batch admits all its items at once with ``admit_many``. Recovered
+    jobs already run at Tencent and are admitted with ``force``, counted
+    against the bound without being rejected.
+    ``max_in_flight=0`` disables the concurrency limit (and the bound).
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        submit_rate: float,
+        submit_burst: int,
+        max_queue: int,
+        expected_duration: Callable[[], float],
+    ):
+        self._max_in_flight = max(0, max_in_flight)
+        self._max_queue = max(0, max_queue)
+        self._bucket = TokenBucket(submit_rate, submit_burst)
+        self._expected_duration = expected_duration
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._admitted = 0
+        self._waiting = 0
+        # Start times (monotonic) of jobs holding a Tencent slot
+        self._running: Dict[int, float] = {}
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> Optional[int]:
+        if not self._max_in_flight:
+            return None
+        return self._max_in_flight + self._max_queue
+
+    async def start(self) -> None:
+        if self._semaphore is None and self._max_in_flight:
+            self._semaphore = asyncio.Semaphore(self._max_in_flight)
+
+    async def stop(self) -> None:
+        self._semaphore = None
+
+    def admit(self, force: bool = False) -> AdmissionTicket:
+        """Admit a request or raise AdmissionRejectedError (never with ``force``)."""
+        capacity = self.capacity
+        if not force and capacity is not None and self._admitted >= capacity:
+            self.rejected += 1
+            raise AdmissionRejectedError(self.retry_after())
+        self._admitted += 1
+        return AdmissionTicket(self)
+
+    def admit_many(self, count: int) -> List[AdmissionTicket]:
+        """Admit ``count`` requests together or raise AdmissionRejectedError for all."""
+        capacity = self.capacity
+        if capacity is not None and self._admitted + count > capacity:
+            self.rejected += 1
+            raise AdmissionRejectedError(self.retry_after())
+        self._admitted += count
+        return [AdmissionTicket(self) for _ in range(count)]
+
+    def retry_after(self) -> int:
+        """Seconds until the requests queued now should have been served.
+
+        The first slot frees when the oldest running job reaches the
+        observed median duration; every further ``max_in_flight`` queued
+        requests take one more median duration. The submit rate adds its
+        own bound.
+        """
+        waiting = max(0, self._admitted - len(self._running))
+        estimate = self._bucket.delay_for(waiting + 1)
+        if self._max_in_flight:
+            duration = self._expected_duration()
+            now = time.monotonic()
+            first_free = min(
+                (max(0.0, duration - (now - started)) for started in self._running.values()),
+                default=0.0,
+            )
+            estimate = max(estimate, first_free + (waiting // self._max_in_flight) * duration)
+        return max(1, math.ceil(estimate))
+
+    @asynccontextmanager
+    async def tencent_slot(self, paced: bool = True) -> AsyncIterator[None]:
+        """Hold one in-flight Tencent job slot, paced by the submit rate.
+
+        The wait is recorded as the ``tencent_queue`` stage. Resumed jobs
+        submit nothing and pass ``paced=False`` to skip the rate limit.
+        """
+        if self._max_in_flight and self._semaphore is None:
+            await self.start()
+        semaphore = self._semaphore
+        with metrics.stage("tencent_queue"):
+            if semaphore is not None:
+                self._waiting += 1
+                try:
+                    await semaphore.acquire()
+                finally:
+                    self._waiting -= 1
+            try:
+                delay = self._bucket.reserve() if paced else 0.0
+                if delay:
+                    await asyncio.sleep(delay)
+            except BaseException:
+                if semaphore is not None:
+                    semaphore.release()
+                raise
+        token = object()
+        try:
+            self._running[id(token)] = time.monotonic()
+            yield
+        finally:
+            self._running.pop(id(token), None)
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._running),
+            "waiting_for_slot": self._waiting,
+            "admitted": self._admitted,
+            "max_in_flight": self._max_in_flight,
+            "capacity": self.capacity,
+            "submit_tokens": round(self._bucket.tokens(), 2) if self._bucket.enabled else None,
+            "rejected": self.rejected,
+            "retry_after_seconds": self.retry_after(),
+        }
+
+
+admission_controller = AdmissionController(
+    max_in_flight=Config.TENCENT_MAX_IN_FLIGHT_JOBS,
+    submit_rate=Config.TENCENT_SUBMIT_RATE_PER_SECOND,
+    submit_burst=Config.TENCENT_SUBMIT_BURST,
+    max_queue=Config.ADMISSION_QUEUE_SIZE,
+    expected_duration=job_poller.expected_duration,
+)
+
+metrics.REGISTRY.gauge_callback(
+    "tencent_jobs_in_flight",
+    "Generations holding a Tencent job slot.",
+    lambda: [({}, len(admission_controller._running))],
+)
+metrics.REGISTRY.gauge_callback(
+    "tencent_slot_waiting",
+    "Generations waiting for a Tencent job slot.",
+    lambda: [({}, admission_controller._waiting)],
+)
+metrics.REGISTRY.gauge_callback(
+    "admission_admitted",
+    "Requests admitted and not yet finished.",
+    lambda: [({}, admission_controller._admitted)],
+)
+metrics.REGISTRY.counter_callback(
+    "admission_rejected_total",
+    "Requests rejected with 429 because capacity was exhausted.",
+    lambda: [({}, admission_controller.rejected)],
+)
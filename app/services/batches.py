@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..core import tracing
+from ..core.config import Config
+from .admission import AdmissionTicket, admission_controller
+from .generation import (
+    STAGE_COMPLETED,
+    STAGE_FAILED,
+    STAGE_PROGRESS,
+    STAGE_QUEUED,
+    clear_job_fields,
+    describe_error,
+    run_generation_deduplicated,
+)
+from .supabase_service import create_signed_urls_for_storage_objects, get_memories, update_memories_status
+
+
+logger = logging.getLogger(__name__)
+
+SIGNED_URL_EXPIRES_SECONDS = 3600
+# Signed URLs are only handed to a pipeline run while this much lifetime remains
+_SIGNED_URL_MIN_REMAINING_SECONDS = 900
+
+
+@dataclass
+class BatchItem:
+    """One memory of a batch and the progress of its generation."""
+
+    memory_id: str
+    user_id: Optional[str] = None
+    figurine_url: Optional[str] = None
+    signed_url: Optional[str] = None
+    signed_at: float = 0.0
+    stage: str = STAGE_QUEUED
+    progress: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    admission: Optional[AdmissionTicket] = field(default=None, repr=False)
+
+    def update_progress(self, stage: str, progress: int) -> None:
+        self.stage = stage
+        self.progress = progress
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self.update_progress(STAGE_FAILED, STAGE_PROGRESS[STAGE_FAILED])
+        self.finished_at = time.time()
+
+    def release(self) -> None:
+        if self.admission is not None:
+            self.admission.release()
+
+    def has_fresh_signed_url(self) -> bool:
+        age = time.monotonic() - self.signed_at
+        return bool(self.signed_url) and age < SIGNED_URL_EXPIRES_SECONDS - _SIGNED_URL_MIN_REMAINING_SECONDS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "memory_id": self.memory_id,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+@dataclass
+class Batch:
+    """Generations for many memories, run under the shared concurrency cap."""
+
+    batch_id: str
+    enable_pbr: bool
+    preprocess: bool
+    request_id: str
+    items: List[BatchItem]
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    sign_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    # Links the item traces to the request that submitted the batch
+    traceparent: Optional[str] = field(default=None, repr=False)
+
+    def to_dict(self, include_items: bool = True) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item.stage] = counts.get(item.stage, 0) + 1
+        body: Dict[str, Any] = {
+            "batch_id": self.batch_id,
+            "status": "completed" if self.finished_at is not None else "running",
+            "total": len(self.items),
+            "completed": counts.get(STAGE_COMPLETED, 0),
+            "failed": counts.get(STAGE_FAILED, 0),
+            "stages": counts,
+            "progress": round(sum(item.progress for item in self.items) / len(self.items)) if self.items else 100,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_items:
+            body["items"] = [item.to_dict() for item in self.items]
+        return body
+
+
+class BatchManager:
+    """Runs batch generations in process memory.
+
+    Memories are read and marked processing_3d in bulk when the batch is
+    submitted; figurine URLs are signed in bulk chunks just before their
+    items start. At most ``concurrency`` pipeline runs are in flight across
+    all batches. Finished batches are kept for ``retention_seconds``.
+    """
+
+    def __init__(self, concurrency: int, sign_chunk_size: int, retention_seconds: int):
+        self._concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._sign_chunk_size = max(1, sign_chunk_size)
+        self._retention_seconds = retention_seconds
+        self._batches: Dict[str, Batch] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(
+        self,
+        memory_ids: List[str],
+        user_id: Optional[str],
+        enable_pbr: bool,
+        preprocess: bool = False,
+    ) -> Batch:
+        """Create a batch for ``memory_ids`` and start it in the background.
+
+        Unknown memories, memories without a figurine and, when ``user_id``
+        is given, memories of other users fail immediately. Every runnable
+        item is admitted up front; if they do not all fit,
+        AdmissionRejectedError is raised before any memory is marked.
+        """
+        if self._semaphore is None:
+            raise RuntimeError("Batch manager is not running")
+        self._prune()
+        batch_id = uuid.uuid4().hex
+        request_id = f"3d-batch-{batch_id[:12]}"
+        memory_ids = list(dict.fromkeys(memory_ids))
+        records = await get_memories(memory_ids)
+
+        items = []
+        without_figurine = []
+        for memory_id in memory_ids:
+            record = records.get(memory_id)
+            item = BatchItem(memory_id=memory_id)
+            items.append(item)
+            if record is None:
+                item.fail(f"Memory not found: {memory_id}")
+            elif user_id and record.get('user_id') != user_id:
+                item.fail(f"Memory {memory_id} does not belong to user {user_id}")
+            elif not record.get('figurine_url'):
+                item.fail(f"figurine_url missing for memory: {memory_id}")
+                without_figurine.append(memory_id)
+            else:
+                item.user_id = user_id or record.get('user_id')
+                item.figurine_url = record['figurine_url']
+
+        runnable = [item for item in items if item.error is None]
+        for item, ticket in zip(runnable, admission_controller.admit_many(len(runnable))):
+            item.admission = ticket
+        try:
+            await asyncio.gather(
+                self._mark(without_figurine, "failed", request_id),
+                self._mark([item.memory_id for item in runnable], "processing_3d", request_id, clear_job_fields()),
+            )
+        except BaseException:
+            for item in runnable:
+                item.release()
+            raise
+
+        batch = Batch(
+            batch_id=batch_id,
+            enable_pbr=enable_pbr,
+            preprocess=preprocess,
+            request_id=request_id,
+            items=items,
+            traceparent=tracing.current_traceparent(),
+        )
+        self._batches[batch_id] = batch
+        self._tasks[batch_id] = asyncio.create_task(self._run(batch, runnable), name=f"generation-batch-{batch_id[:12]}")
+        logger.info(f"[{request_id}] Batch accepted: {len(runnable)} of {len(items)} memories runnable")
+        return batch
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self._batches.get(batch_id)
+
+    async def start(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._semaphore = None
+
+    async def _mark(
+        self, memory_ids: List[str], status: str, request_id: str, fields: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if not memory_ids:
+            return
+        try:
+            await update_memories_status(memory_ids, status, fields)
+        except Exception as e:
+            logger.warning(f"[{request_id}] Failed to mark {len(memory_ids)} memories {status}: {e}")
+
+    async def _run(self, batch: Batch, items: List[BatchItem]) -> None:
+        try:
+            await asyncio.gather(*(self._run_item(batch, items, index) for index in range(len(items))))
+        finally:
+            # Items cancelled before they started still hold their admission
+            for item in items:
+                item.release()
+            batch.finished_at = time.time()
+            self._tasks.pop(batch.batch_id, None)
+            logger.info(f"[{batch.request_id}] Batch finished: {batch.to_dict(include_items=False)}")
+
+    async def _run_item(self, batch: Batch, items: List[BatchItem], index: int) -> None:
+        item = items[index]
+        assert self._semaphore is not None
+        async with self._semaphore:
+            await self._sign(batch, items, index)
+            item.started_at = time.time()
+            request_id = f"{batch.request_id}-{index}"
+            try:
+                with tracing.start_trace(
+                    "generation.batch_item",
+                    request_id,
+                    traceparent=batch.traceparent,
+                    kind=tracing.SPAN_KIND_INTERNAL,
+                    **{"memory.id": item.memory_id},
+                ):
+                    result, _ = await run_generation_deduplicated(
+                        item.user_id,
+                        item.memory_id,
+                        batch.enable_pbr,
+                        request_id,
+                        on_progress=item.update_progress,
+                        preprocess=batch.preprocess,
+                        figurine_url=item.figurine_url,
+                        signed_url=item.signed_url if item.has_fresh_signed_url() else None,
+                    )
+                item.result = {
+                    "stl_url": result.get("stl_url"),
+                    "stl_storage_path": result.get("stl_storage_path"),
+                    "cache_hit": result.get("cache_hit"),
+                }
+            except asyncio.CancelledError:
+                item.error = "Batch cancelled during shutdown"
+                item.update_progress(STAGE_FAILED, STAGE_PROGRESS[STAGE_FAILED])
+                raise
+            except Exception as e:
+                item.error = describe_error(e)
+                logger.error(f"[{request_id}] Batch item {item.memory_id} failed: {item.error}")
+            finally:
+                item.release()
+                item.finished_at = time.time()
+
+    async def _sign(self, batch: Batch, items: List[BatchItem], index: int) -> None:
+        """Sign the figurine URLs of the next chunk of items in one request.
+
+        Items left unsigned (a failed request) sign their own URL in the
+        pipeline instead.
+        """
+        if items[index].has_fresh_signed_url():
+            return
+        async with batch.sign_lock:
+            if items[index].has_fresh_signed_url():
+                return
+            chunk = [
+                item for item in items[index:]
+                if item.started_at is None and not item.has_fresh_signed_url()
+            ][:self._sign_chunk_size]
+            try:
+                signed = await create_signed_urls_for_storage_objects(
+                    list({item.figurine_url for item in chunk}),
+                    expires_in_seconds=SIGNED_URL_EXPIRES_SECONDS,
+                )
+            except Exception as e:
+                logger.warning(f"[{batch.request_id}] Bulk URL signing failed, items sign individually: {e}")
+                return
+            signed_at = time.monotonic()
+            for item in chunk:
+                item.signed_url = signed.get(item.figurine_url)
+                item.signed_at = signed_at
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._retention_seconds
+        expired = [
+            batch_id for batch_id, batch in self._batches.items()
+            if batch.finished_at is not None and batch.finished_at < cutoff
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
+
+
+batch_manager = BatchManager(
+    concurrency=Config.BATCH_CONCURRENCY,
+    sign_chunk_size=Config.BATCH_SIGN_CHUNK_SIZE,
+    retention_seconds=Config.JOB_RETENTION_SECONDS,
+)
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from ..core import metrics
+from ..core.config import Config
+from .supabase_service import get_memory_status
+
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STAGES = {"completed", "failed"}
+# Events buffered per subscriber; a slow client skips to the newest ones
+SUBSCRIBER_QUEUE_SIZE = 32
+
+# Ends a subscriber's stream (shutdown)
+_CLOSE: Dict[str, Any] = {}
+
+
+@dataclass
+class _Channel:
+    """Progress of one memory: the latest event and the queues it fans out to."""
+
+    last_event: Optional[Dict[str, Any]] = None
+    next_id: int = 1
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+    finished_at: Optional[float] = None
+    watcher: Optional[asyncio.Task] = None
+
+
+class GenerationEvents:
+    """Fans generation progress of each memory out to its SSE subscribers.
+
+    The pipeline publishes every stage once; each subscriber gets its own
+    small queue, and late subscribers start from the latest event.
+    Finished channels are kept ``retention_seconds`` for clients that
+    connect after the end. When a memory's generation runs on another
+    instance, one watcher per memory polls its status in Supabase every
+    ``remote_poll_seconds`` while anyone is subscribed (0 disables it).
+    """
+
+    def __init__(self, heartbeat_seconds: float, retention_seconds: float, remote_poll_seconds: float, max_stream_seconds: float):
+        self._heartbeat_seconds = max(1.0, heartbeat_seconds)
+        self._retention_seconds = retention_seconds
+        self._remote_poll_seconds = remote_poll_seconds
+        self._max_stream_seconds = max_stream_seconds
+        self._channels: Dict[str, _Channel] = {}
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(channel.subscribers) for channel in self._channels.values())
+
+    def publish(self, memory_id: str, stage: str, progress: int, local: bool = True, **details: Any) -> None:
+        """Record ``stage`` of a memory's generation and hand it to every subscriber.
+
+        ``local`` events come from a pipeline in this process and stop any
+        Supabase watcher for the memory.
+        """
+        if not memory_id:
+            return
+        self._expire()
+        channel = self._channels.get(memory_id)
+        if channel is None:
+            channel = self._channels[memory_id] = _Channel()
+        elif channel.finished_at is not None and stage not in TERMINAL_STAGES:
+            # A new generation of the same memory
+            channel.finished_at = None
+        if local and channel.watcher is not None:
+            channel.watcher.cancel()
+            channel.watcher = None
+        event = {
+            "id": channel.next_id,
+            "memory_id": memory_id,
+            "stage": stage,
+            "progress": progress,
+            "timestamp": datetime.now().isoformat(),
+            **{key: value for key, value in details.items() if value is not None},
+        }
+        channel.next_id += 1
+        channel.last_event = event
+        if stage in TERMINAL_STAGES:
+            channel.finished_at = time.monotonic()
+        for queue in channel.subscribers:
+            _offer(queue, event)
+
+    async def stream(self, memory_id: str) -> AsyncIterator[str]:
+        """SSE messages for ``memory_id`` until the generation finishes.
+
+        Comment lines keep idle connections open; the stream also ends
+        after ``max_stream_seconds``, and EventSource clients reconnect.
+        """
+        self._expire()
+        channel = self._channels.get(memory_id)
+        if channel is None:
+            channel = self._channels[memory_id] = _Channel()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        channel.subscribers.add(queue)
+        if channel.last_event is not None:
+            _offer(queue, channel.last_event)
+        elif channel.watcher is None and self._remote_poll_seconds > 0:
+            channel.watcher = asyncio.create_task(self._watch(memory_id, channel), name=f"generation-events-{memory_id}")
+        deadline = time.monotonic() + self._max_stream_seconds
+        try:
+            yield f"retry: {int(self._heartbeat_seconds * 1000)}\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(self._heartbeat_seconds, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is _CLOSE:
+                    return
+                yield f"id: {event['id']}\nevent: progress\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+        finally:
+            channel.subscribers.discard(queue)
+            if not channel.subscribers and channel.watcher is not None:
+                channel.watcher.cancel()
+                channel.watcher = None
+
+    async def _watch(self, memory_id: str, channel: _Channel) -> None:
+        """Publish status changes of a memory generated elsewhere, read from Supabase."""
+        status = None
+        while True:
+            try:
+                memory = await get_memory_status(memory_id)
+            except Exception as e:
+                logger.warning(f"Failed to read status of memory {memory_id} for its event stream: {e}")
+                memory = {}
+            if memory is None:
+                self.publish(memory_id, "failed", 100, local=False, error=f"Memory not found: {memory_id}")
+                break
+            if memory.get("status") and memory["status"] != status:
+                status = memory["status"]
+                stage = status if status in TERMINAL_STAGES or status == "processing_3d" else None
+                if stage is not None:
+                    progress = 100 if stage in TERMINAL_STAGES else 5
+                    self.publish(memory_id, stage, progress, local=False, stl_storage_path=memory.get("model_3d_url"))
+                if stage in TERMINAL_STAGES:
+                    break
+            await asyncio.sleep(self._remote_poll_seconds)
+        channel.watcher = None
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for memory_id, channel in list(self._channels.items()):
+            idle = not channel.subscribers and channel.watcher is None
+            finished = channel.finished_at is not None and now - channel.finished_at > self._retention_seconds
+            if idle and (finished or channel.last_event is None):
+                del self._channels[memory_id]
+
+    async def stop(self) -> None:
+        watchers = [channel.watcher for channel in self._channels.values() if channel.watcher is not None]
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+        for channel in self._channels.values():
+            channel.watcher = None
+            for queue in channel.subscribers:
+                _offer(queue, _CLOSE)
+
+
+def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+    """Queue ``event``, dropping the oldest queued one when full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+generation_events = GenerationEvents(
+    heartbeat_seconds=Config.EVENTS_HEARTBEAT_SECONDS,
+    retention_seconds=Config.EVENTS_RETENTION_SECONDS,
+    remote_poll_seconds=Config.EVENTS_REMOTE_POLL_SECONDS,
+    max_stream_seconds=Config.EVENTS_MAX_STREAM_SECONDS,
+)
+
+metrics.REGISTRY.gauge_callback(
+    "generation_event_subscribers",
+    "Open progress event streams.",
+    lambda: [({}, generation_events.subscribers)],
+)
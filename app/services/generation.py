@@ -0,0 +1,709 @@
+import asyncio
+import base64
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from ..core import metrics
+from ..core.config import Config
+from ..core.dedup import SingleFlight
+from ..core.http import download_bytes_from_url
+from ..core.compression import CONTENT_ENCODINGS
+from .image_preprocessing import PreprocessOptions, PreprocessResult, preprocess_image
+from .mesh_processing import ModelVariant, is_lod_variant, postprocessing_enabled, process_stl, variant_filename
+from .events import generation_events
+from .stl_cache import cache_key, object_cache_key, stl_cache
+from .stl_transfer import transfer_url_to_storage
+from .supabase_service import (
+    copy_storage_object,
+    create_signed_url_for_storage_object,
+    get_figurine_url_from_memory,
+    get_storage_object_etag,
+    record_tencent_job,
+    renew_tencent_job_claim,
+    update_memory_status,
+    update_memory_with_stl,
+    upload_to_supabase,
+)
+from .tencent_ai3d import (
+    RESULT_FORMAT,
+    OnStatus,
+    OnSubmitted,
+    generate_stl_from_image_async,
+    generate_stl_result_url_async,
+    is_image_input_error,
+    resume_stl_from_job_async,
+    resume_stl_result_url_async,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages reported to progress callbacks, with their progress percentage
+STAGE_QUEUED = "queued"
+STAGE_PROCESSING = "processing_3d"
+STAGE_FETCHING_IMAGE = "fetching_image"
+STAGE_GENERATING = "generating"
+STAGE_TENCENT_WAIT = "tencent_wait"
+STAGE_TENCENT_RUN = "tencent_run"
+STAGE_TENCENT_DONE = "tencent_done"
+STAGE_UPLOADING = "uploading"
+STAGE_COMPLETED = "completed"
+STAGE_FAILED = "failed"
+
+STAGE_PROGRESS = {
+    STAGE_QUEUED: 0,
+    STAGE_PROCESSING: 5,
+    STAGE_FETCHING_IMAGE: 10,
+    STAGE_GENERATING: 30,
+    STAGE_TENCENT_WAIT: 35,
+    STAGE_TENCENT_RUN: 50,
+    STAGE_TENCENT_DONE: 75,
+    STAGE_UPLOADING: 80,
+    STAGE_COMPLETED: 100,
+    STAGE_FAILED: 100,
+}
+
+# Tencent job statuses reported as stages (FAIL ends the run as failed)
+TENCENT_STATUS_STAGES = {
+    "WAIT": STAGE_TENCENT_WAIT,
+    "RUN": STAGE_TENCENT_RUN,
+    "DONE": STAGE_TENCENT_DONE,
+}
+
+ProgressCallback = Callable[[str, int], None]
+
+# How long a Tencent job may take before the generation fails
+TENCENT_JOB_TIMEOUT_SECONDS = 300
+
+# Concurrent generations for the same memory/options share one pipeline run
+generation_flights = SingleFlight()
+
+metrics.REGISTRY.gauge_callback(
+    "generations_in_flight",
+    "Pipeline runs in progress (shared by deduplicated callers).",
+    lambda: [({}, len(generation_flights))],
+)
+
+
+def generation_key(user_id: Optional[str], memory_id: str, enable_pbr: bool, preprocess: bool = False) -> str:
+    key = f"{user_id or ''}:{memory_id}:pbr={int(enable_pbr)}"
+    return f"{key}:preprocess" if preprocess else key
+
+
+async def generate_stl_bytes_async(
+    image_base64: Optional[str],
+    enable_pbr: bool,
+    request_id: str,
+    image_url: Optional[str] = None,
+    on_submitted: Optional[OnSubmitted] = None,
+    on_status: Optional[OnStatus] = None,
+) -> bytes:
+    """Async wrapper to generate STL bytes using Tencent service.
+    The image is sent inline, or by URL when ``image_url`` is given.
+    In development mode, still returns local example file to keep parity.
+    """
+    async def _generate_with_ai3d_async() -> bytes:
+        stl_bytes = await generate_stl_from_image_async(
+            image_base64=image_base64,
+            image_url=image_url,
+            enable_pbr=enable_pbr,
+            timeout_seconds=TENCENT_JOB_TIMEOUT_SECONDS,
+            on_submitted=on_submitted,
+            on_status=on_status,
+        )
+        return stl_bytes
+
+    if Config.ENVIRONMENT == "development":
+        try:
+            with open("example.stl", "rb") as f:
+                stl_bytes = f.read()
+            return stl_bytes
+        except FileNotFoundError:
+            logger.error(f"[{request_id}] example.stl file not found, falling back to generation")
+            return await _generate_with_ai3d_async()
+    else:
+        return await _generate_with_ai3d_async()
+
+
+async def generate_stl_url_async(
+    image_base64: Optional[str],
+    enable_pbr: bool,
+    request_id: str,
+    image_url: Optional[str] = None,
+    on_submitted: Optional[OnSubmitted] = None,
+    on_status: Optional[OnStatus] = None,
+) -> str:
+    """Generate an STL with Tencent and return its result URL without downloading it.
+
+    Used by the streaming path, which copies the result straight into storage.
+    """
+    logger.info(f"[{request_id}] Generating STL for streamed transfer")
+    return await generate_stl_result_url_async(
+        image_base64=image_base64,
+        image_url=image_url,
+        enable_pbr=enable_pbr,
+        timeout_seconds=TENCENT_JOB_TIMEOUT_SECONDS,
+        on_submitted=on_submitted,
+        on_status=on_status,
+    )
+
+
+async def resume_stl_async(
+    job: Dict[str, Any], request_id: str, download: bool, on_status: Optional[OnStatus] = None
+) -> Union[str, bytes]:
+    """Wait for the recorded Tencent ``job`` and return its STL URL, or bytes if ``download``."""
+    logger.info(f"[{request_id}] Resuming Tencent job {job['job_id']} submitted at {job.get('submitted_at')}")
+    resume = resume_stl_from_job_async if download else resume_stl_result_url_async
+    return await resume(
+        job["job_id"],
+        region=job.get("region"),
+        submitted_at=datetime.fromisoformat(job["submitted_at"]) if job.get("submitted_at") else None,
+        timeout_seconds=TENCENT_JOB_TIMEOUT_SECONDS,
+        on_status=on_status,
+    )
+
+
+async def run_generation(
+    user_id: Optional[str],
+    memory_id: str,
+    enable_pbr: bool,
+    request_id: str,
+    on_progress: Optional[ProgressCallback] = None,
+    preprocess: bool = False,
+    figurine_url: Optional[str] = None,
+    signed_url: Optional[str] = None,
+    resume_job: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run the full figurine -> STL pipeline for a memory.
+
+    - Marks the memory as processing_3d
+    - Fetches the figurine image from Supabase (signed URL)
+    - Optionally shrinks the image (``preprocess``) before submission
+    - Calls Tencent AI3D to generate an STL
+    - Uploads the STL back to Supabase and updates the memory
+
+    Batches pass ``figurine_url`` (and ``signed_url`` when already signed)
+    after marking their memories processing_3d in bulk, which skips those
+    per-memory calls.
+
+    With ``TENCENT_JOB_RECOVERY_ENABLED`` the submitted Tencent job is
+    recorded on the memory and its claim renewed while the run lasts;
+    ``resume_job`` (such a record) skips the image
+    and submission and waits for that job instead.
+
+    Stages go to ``on_progress`` and to the memory's event stream.
+
+    The memory is marked as failed and the exception re-raised on any error.
+    Returns the success payload shared by the HTTP and job APIs.
+    """
+    def _report(stage: str, **details: Any) -> None:
+        if on_progress is not None:
+            on_progress(stage, STAGE_PROGRESS[stage])
+        generation_events.publish(memory_id, stage, STAGE_PROGRESS[stage], **details)
+
+    def _report_tencent_status(status: str) -> None:
+        stage = TENCENT_STATUS_STAGES.get(status)
+        if stage is not None:
+            _report(stage)
+
+    started = time.perf_counter()
+    outcome = "failure"
+    claim: Optional[_JobClaim] = None
+    try:
+        _report(STAGE_PROCESSING)
+        # In URL mode Tencent fetches the image itself, so it is only
+        # downloaded here if we have to fall back to inline base64.
+        # Preprocessing needs the bytes, so it always submits base64.
+        preprocess_options = PreprocessOptions.from_config() if preprocess else None
+        use_image_url = _use_image_url() and preprocess_options is None
+        image_bytes = None
+        preprocessing = None
+        if resume_job is not None:
+            # The image went to Tencent before the restart; only its cache key is needed
+            key = resume_job.get("cache_key")
+        else:
+            with metrics.stage("supabase_lookup"):
+                # Update memory status to processing_3d; the UPDATE returns the row,
+                # which saves a separate figurine lookup on the common path
+                if not figurine_url:
+                    memory_rows = None
+                    try:
+                        memory_rows = await update_memory_status(memory_id, "processing_3d", fields=clear_job_fields())
+                    except Exception as e:
+                        logger.warning(f"[{request_id}] Failed to update memory status: {e}")
+                    figurine_url = memory_rows[0].get('figurine_url') if memory_rows else None
+
+                # Fetch and prepare image
+                _report(STAGE_FETCHING_IMAGE)
+                if not figurine_url:
+                    figurine_url = await get_figurine_url_from_memory(memory_id)
+                if not signed_url:
+                    signed_url = await create_signed_url_for_storage_object(figurine_url, expires_in_seconds=3600)
+
+            if use_image_url:
+                with metrics.stage("image_etag"):
+                    etag = await get_storage_object_etag(figurine_url)
+                key = object_cache_key(etag, enable_pbr=enable_pbr, result_format=RESULT_FORMAT) if etag else None
+            else:
+                image_bytes = await _download_image(signed_url)
+                # Keyed by the original image, tagged only if the image
+                # submitted is the preprocessed one
+                original_bytes = image_bytes
+                if preprocess_options is not None:
+                    with metrics.stage("image_preprocess"):
+                        preprocessing = await _preprocess(image_bytes, preprocess_options, request_id)
+                    if preprocessing is not None:
+                        image_bytes = preprocessing.image_bytes
+                key = cache_key(
+                    original_bytes,
+                    enable_pbr=enable_pbr,
+                    result_format=RESULT_FORMAT,
+                    preprocess=preprocess_options.tag() if preprocessing is not None else None,
+                )
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stl_filename = f"{memory_id + '_' if memory_id else ''}{timestamp}.stl"
+
+        # Reuse a stored STL generated from the same image and options
+        cache_hit = False
+        upload_info = None
+        mesh_processing = None
+        mesh_metadata = None
+        variants: Dict[str, Dict[str, Any]] = {}
+        if Config.STL_CACHE_ENABLED and key:
+            with metrics.stage("cache_lookup"):
+                upload_info = await _copy_cached_stl(key, stl_filename, user_id, request_id)
+            cache_hit = upload_info is not None
+            if cache_hit:
+                variants = upload_info.get("variants") or {}
+                mesh_metadata = upload_info.get("metadata")
+
+        if not cache_hit:
+            # Generate STL (async non-blocking). When streaming, the result
+            # stays at Tencent until it is piped into storage below
+            _report(STAGE_GENERATING)
+            stream_result = _stream_stl_result()
+            generate = generate_stl_url_async if stream_result else generate_stl_bytes_async
+            claim = _job_claim(memory_id, key, enable_pbr, preprocess, request_id, resume_job)
+            on_submitted = claim.record if claim is not None else None
+            stl_result = None
+            if resume_job is not None:
+                stl_result = await resume_stl_async(
+                    resume_job, request_id, download=not stream_result, on_status=_report_tencent_status
+                )
+            elif use_image_url:
+                try:
+                    stl_result = await generate(
+                        None,
+                        enable_pbr,
+                        request_id,
+                        image_url=signed_url,
+                        on_submitted=on_submitted,
+                        on_status=_report_tencent_status,
+                    )
+                except Exception as e:
+                    if not is_image_input_error(e):
+                        raise
+                    logger.warning(f"[{request_id}] Tencent could not use the image URL, retrying with base64: {e}")
+            if stl_result is None:
+                # Only URL mode (never combined with preprocessing) gets here without the bytes
+                if image_bytes is None:
+                    image_bytes = await _download_image(signed_url)
+                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                stl_result = await generate(
+                    image_base64, enable_pbr, request_id, on_submitted=on_submitted, on_status=_report_tencent_status
+                )
+
+            # Upload STL, unless another instance took over the job meanwhile
+            if claim is not None:
+                claim.check()
+            _report(STAGE_UPLOADING)
+            if stream_result:
+                with metrics.stage("stl_transfer"):
+                    upload_info = await transfer_url_to_storage(
+                        stl_result, stl_filename, content_type="model/stl", user_id=user_id
+                    )
+            elif postprocessing_enabled():
+                metrics.observe_payload("stl", len(stl_result))
+                with metrics.stage("stl_postprocess"):
+                    processed = await asyncio.to_thread(process_stl, stl_result)
+                mesh_processing = processed.info
+                mesh_metadata = processed.metadata
+                logger.info(
+                    f"[{request_id}] Processed {processed.info['source_format']} STL "
+                    f"{processed.info['original_bytes']} -> {processed.info['output_bytes']} bytes "
+                    f"in {processed.info['duration_ms']:.0f} ms"
+                )
+                with metrics.stage("upload"):
+                    upload_info = await upload_to_supabase(
+                        processed.stl_bytes, stl_filename, content_type="model/stl", user_id=user_id
+                    )
+                    variants = await _upload_variants(processed.variants, stl_filename, user_id, request_id)
+            else:
+                metrics.observe_payload("stl", len(stl_result))
+                with metrics.stage("upload"):
+                    upload_info = await upload_to_supabase(
+                        stl_result, stl_filename, content_type="model/stl", user_id=user_id
+                    )
+
+        stl_storage_path = upload_info.get("storage_path") if isinstance(upload_info, dict) else None
+        if Config.STL_CACHE_ENABLED and key and not cache_hit and stl_storage_path:
+            try:
+                await stl_cache.put_async(
+                    key,
+                    stl_storage_path,
+                    {name: variant["storage_path"] for name, variant in variants.items()},
+                    mesh_metadata,
+                )
+            except Exception as e:
+                logger.warning(f"[{request_id}] Failed to record STL cache entry: {e}")
+        stl_signed_url = upload_info.get("signed_url") if isinstance(upload_info, dict) else None
+
+        # Preview meshes, smallest first, for viewers to load before the full STL
+        lods = {name: variant["storage_path"] for name, variant in variants.items() if is_lod_variant(name)}
+
+        if claim is not None:
+            claim.check()
+
+        # Record the STL and mark the memory completed in one update
+        updated_memory = None
+        if memory_id and stl_storage_path:
+            try:
+                with metrics.stage("memory_update"):
+                    updated_memory = await update_memory_with_stl(
+                        memory_id, stl_storage_path, status="completed", lods=lods or None, metadata=mesh_metadata
+                    )
+            except Exception as e:
+                logger.error(f"[{request_id}] Failed to update memory record: {e}")
+                if lods or mesh_metadata:
+                    # The full STL matters more than its previews and metadata
+                    try:
+                        updated_memory = await update_memory_with_stl(memory_id, stl_storage_path, status="completed")
+                    except Exception as retry_e:
+                        logger.error(f"[{request_id}] Failed to update memory record with the STL only: {retry_e}")
+
+        # Still mark the memory completed if the combined write did not happen
+        if memory_id and updated_memory is None:
+            try:
+                await update_memory_status(memory_id, "completed")
+            except Exception as e:
+                logger.warning(f"[{request_id}] Failed to update memory status: {e}")
+
+        # The event stream is not scoped to the user, so it never carries the signed URL
+        _report(STAGE_COMPLETED, stl_storage_path=stl_storage_path, cache_hit=cache_hit)
+        outcome = "cache_hit" if cache_hit else "success"
+        return {
+            "status": "success",
+            "message": "3D STL generated successfully",
+            "stl_url": stl_signed_url,
+            "stl_storage_path": stl_storage_path,
+            "filename": stl_filename,
+            "updated_memory": updated_memory,
+            "cache_hit": cache_hit,
+            "image_preprocessing": preprocessing.to_dict() if preprocessing else None,
+            "stl_variants": variants,
+            "stl_lods": lods,
+            "mesh_metadata": mesh_metadata,
+            "mesh_processing": mesh_processing
+        }
+    except JobTakenOverError as e:
+        # The instance that took over completes (or fails) the memory
+        logger.warning(f"[{request_id}] Stopping generation of memory {memory_id}: {e}")
+        raise
+    except Exception as e:
+        _report(STAGE_FAILED, error=describe_error(e))
+        if memory_id:
+            try:
+                await update_memory_status(memory_id, "failed")
+            except Exception as status_e:
+                logger.error(f"[{request_id}] Failed to update memory status: {status_e}")
+        raise
+    finally:
+        if claim is not None:
+            await claim.stop()
+        metrics.GENERATION_SECONDS.observe(time.perf_counter() - started, outcome)
+
+
+async def run_generation_deduplicated(
+    user_id: Optional[str],
+    memory_id: str,
+    enable_pbr: bool,
+    request_id: str,
+    on_progress: Optional[ProgressCallback] = None,
+    preprocess: bool = False,
+    figurine_url: Optional[str] = None,
+    signed_url: Optional[str] = None,
+    resume_job: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """Run ``run_generation`` unless an identical one is already in flight.
+
+    Returns ``(result, shared)``; callers that attach to an existing run get
+    its result, and their ``on_progress`` only sees the final stage.
+    """
+    key = generation_key(user_id, memory_id, enable_pbr, preprocess)
+    if generation_flights.in_flight(key):
+        logger.info(f"[{request_id}] Attaching to in-flight generation for memory {memory_id}")
+    try:
+        result, shared = await generation_flights.do(
+            key,
+            lambda: run_generation(
+                user_id,
+                memory_id,
+                enable_pbr,
+                request_id,
+                on_progress=on_progress,
+                preprocess=preprocess,
+                figurine_url=figurine_url,
+                signed_url=signed_url,
+                resume_job=resume_job,
+            ),
+        )
+    except Exception:
+        if on_progress is not None:
+            on_progress(STAGE_FAILED, STAGE_PROGRESS[STAGE_FAILED])
+        raise
+    if shared and on_progress is not None:
+        on_progress(STAGE_COMPLETED, STAGE_PROGRESS[STAGE_COMPLETED])
+    return result, shared
+
+
+def _stream_stl_result() -> bool:
+    """Whether to pipe the Tencent result into storage instead of buffering it.
+
+    Development mode serves example.stl from disk, and post-processing needs
+    the mesh in memory, so both use bytes.
+    """
+    return (
+        Config.STL_STREAMING_ENABLED
+        and Config.ENVIRONMENT != "development"
+        and not postprocessing_enabled()
+    )
+
+
+def clear_job_fields() -> Optional[Dict[str, Any]]:
+    """Fields dropping a previous run's job record when a memory starts processing again.
+
+    Otherwise the recovery sweeper could resume that old job.
+    """
+    return {"model_3d_job": None} if Config.TENCENT_JOB_RECOVERY_ENABLED else None
+
+
+class JobTakenOverError(RuntimeError):
+    """Another instance claimed this generation's Tencent job and finishes the memory."""
+
+
+class _JobClaim:
+    """The recorded Tencent job of a live generation, kept claimed while it runs.
+
+    ``record`` (an ``OnSubmitted`` callback) saves the job on the memory;
+    from then on ``claimed_at`` is renewed every
+    ``TENCENT_JOB_HEARTBEAT_SECONDS``, so a slow generation is never taken
+    for an orphan. A renewal that no longer matches means another instance
+    took the job over, and ``check`` stops this run before it uploads. A
+    job resubmitted in the same run (URL mode falling back to base64) is
+    recorded in place of the first; one heartbeat renews whichever is current.
+    """
+
+    def __init__(
+        self,
+        memory_id: str,
+        key: Optional[str],
+        enable_pbr: bool,
+        preprocess: bool,
+        request_id: str,
+        job: Optional[Dict[str, Any]] = None,
+    ):
+        self._memory_id = memory_id
+        self._key = key
+        self._enable_pbr = enable_pbr
+        self._preprocess = preprocess
+        self._request_id = request_id
+        self._task: Optional[asyncio.Task] = None
+        self.job = job
+        self.lost = False
+        if job is not None:
+            self._start()
+
+    async def record(self, job_id: str, region: str) -> None:
+        """Save the submitted job on the memory.
+
+        A failed write is only logged: the generation goes on, it just
+        cannot be resumed by another instance.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "job_id": job_id,
+            "region": region,
+            "submitted_at": now,
+            "claimed_at": now,
+            "enable_pbr": self._enable_pbr,
+            "preprocess": self._preprocess,
+            "cache_key": self._key,
+            "request_id": self._request_id,
+        }
+        try:
+            with metrics.stage("job_record"):
+                await record_tencent_job(self._memory_id, job)
+        except Exception as e:
+            logger.warning(f"[{self._request_id}] Failed to record Tencent job {job_id}: {e}")
+            return
+        self.job = job
+        self._start()
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._heartbeat(), name=f"tencent-job-claim-{self._memory_id}")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(Config.TENCENT_JOB_HEARTBEAT_SECONDS)
+            current = self.job
+            assert current is not None
+            job = {**current, "claimed_at": datetime.now(timezone.utc).isoformat()}
+            try:
+                renewed = await renew_tencent_job_claim(self._memory_id, job, current["claimed_at"])
+            except Exception as e:
+                logger.warning(f"[{self._request_id}] Failed to renew claim on Tencent job {job['job_id']}: {e}")
+                continue
+            if self.job is not current:
+                # record() saved a resubmitted job meanwhile; renew that one next time
+                continue
+            if not renewed:
+                self.lost = True
+                logger.warning(f"[{self._request_id}] Tencent job {job['job_id']} was taken over by another instance")
+                return
+            self.job = job
+
+    def check(self) -> None:
+        if self.lost:
+            raise JobTakenOverError(f"Tencent job of memory {self._memory_id} was taken over by another instance")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def _job_claim(
+    memory_id: str,
+    key: Optional[str],
+    enable_pbr: bool,
+    preprocess: bool,
+    request_id: str,
+    resume_job: Optional[Dict[str, Any]] = None,
+) -> Optional[_JobClaim]:
+    """Claim tracking for this run's Tencent job, if job recovery is on."""
+    if not Config.TENCENT_JOB_RECOVERY_ENABLED or not memory_id:
+        return None
+    return _JobClaim(memory_id, key, enable_pbr, preprocess, request_id, job=resume_job)
+
+
+def _use_image_url() -> bool:
+    """Whether to hand Tencent the signed image URL instead of base64 data."""
+    return Config.TENCENT_IMAGE_INPUT_MODE == "url"
+
+
+async def _copy_cached_stl(key: str, filename: str, user_id: Optional[str], request_id: str) -> Optional[Dict[str, Any]]:
+    """Copy the cached STL for ``key`` to the user's folder, or return None on a miss.
+
+    Cached variants are copied too; the result lists them under ``variants``
+    and the cached mesh metadata under ``metadata``.
+    """
+    try:
+        entry = await stl_cache.get_async(key)
+    except Exception as e:
+        logger.warning(f"[{request_id}] STL cache lookup failed: {e}")
+        return None
+    if entry is None:
+        return None
+
+    try:
+        upload_info = await copy_storage_object(entry.storage_path, filename, user_id=user_id)
+    except Exception as e:
+        # The cached object is gone or unreadable; regenerate and replace the entry
+        logger.warning(f"[{request_id}] Cached STL {entry.storage_path} could not be reused: {e}")
+        stl_cache.record_miss()
+        await stl_cache.invalidate_async(key)
+        return None
+    stl_cache.record_hit()
+
+    names = list(entry.variants)
+    copies = await asyncio.gather(
+        *(copy_storage_object(entry.variants[name], variant_filename(filename, name), user_id=user_id) for name in names),
+        return_exceptions=True,
+    )
+    upload_info["variants"] = {}
+    for name, copy in zip(names, copies):
+        if isinstance(copy, BaseException):
+            logger.warning(f"[{request_id}] Cached {name} variant could not be reused: {copy}")
+        else:
+            if name in CONTENT_ENCODINGS:
+                copy["content_encoding"] = name
+            upload_info["variants"][name] = copy
+    upload_info["metadata"] = entry.metadata
+    return upload_info
+
+
+async def _download_image(signed_url: str) -> bytes:
+    with metrics.stage("image_download"):
+        image_bytes = await download_bytes_from_url(signed_url)
+    metrics.observe_payload("image", len(image_bytes))
+    return image_bytes
+
+
+async def _upload_variants(
+    variants: List[ModelVariant], filename: str, user_id: Optional[str], request_id: str
+) -> Dict[str, Dict[str, Any]]:
+    """Upload variants next to the STL; a failed variant is logged and left out."""
+    results = await asyncio.gather(
+        *(
+            upload_to_supabase(
+                variant.data,
+                variant_filename(filename, variant.name),
+                content_type=variant.content_type,
+                user_id=user_id,
+                metadata={"contentEncoding": variant.content_encoding} if variant.content_encoding else None,
+            )
+            for variant in variants
+        ),
+        return_exceptions=True,
+    )
+    uploaded: Dict[str, Dict[str, Any]] = {}
+    for variant, result in zip(variants, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"[{request_id}] Failed to upload {variant.name} variant: {result}")
+            continue
+        if variant.content_encoding:
+            result["content_encoding"] = variant.content_encoding
+        if variant.triangles is not None:
+            result["triangles"] = variant.triangles
+        uploaded[variant.name] = result
+    return uploaded
+
+
+async def _preprocess(
+    image_bytes: bytes, options: PreprocessOptions, request_id: str
+) -> Optional[PreprocessResult]:
+    """Shrink the image for submission; on failure the original is sent."""
+    try:
+        result = await preprocess_image(image_bytes, options)
+    except Exception as e:
+        logger.warning(f"[{request_id}] Image preprocessing failed, sending original image: {e}")
+        return None
+    logger.info(
+        f"[{request_id}] Preprocessed image {result.original_bytes} -> {result.output_bytes} bytes "
+        f"({result.bytes_saved} saved, {result.width}x{result.height}) in {result.duration_seconds * 1000:.0f} ms"
+    )
+    return result
+
+
+def describe_error(exc: Exception) -> str:
+    """Return the user-facing message for a pipeline failure."""
+    if isinstance(exc, HTTPException):
+        return str(exc.detail)
+    return str(exc)
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ..core.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+# Output formats Tencent AI3D accepts for ImageBase64
+SUPPORTED_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "jpg": "JPEG"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    max_edge: int
+    output_format: str
+    quality: int
+
+    @classmethod
+    def from_config(cls) -> "PreprocessOptions":
+        output_format = SUPPORTED_FORMATS.get(Config.IMAGE_PREPROCESS_FORMAT)
+        if output_format is None:
+            raise ValueError(f"Unsupported IMAGE_PREPROCESS_FORMAT: {Config.IMAGE_PREPROCESS_FORMAT}")
+        return cls(
+            max_edge=Config.IMAGE_PREPROCESS_MAX_EDGE,
+            output_format=output_format,
+            quality=Config.IMAGE_PREPROCESS_QUALITY,
+        )
+
+    def tag(self) -> str:
+        """Stable description of the options, part of the STL cache key."""
+        return f"{self.output_format.lower()}:{self.max_edge}:q{self.quality}"
+
+
+@dataclass
+class PreprocessResult:
+    image_bytes: bytes
+    original_bytes: int
+    output_bytes: int
+    width: int
+    height: int
+    duration_seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.output_bytes
+
+    def to_dict(self) -> dict:
+        return {
+            "original_bytes": self.original_bytes,
+            "output_bytes": self.output_bytes,
+            "bytes_saved": self.bytes_saved,
+            "width": self.width,
+            "height": self.height,
+            "duration_ms": round(self.duration_seconds * 1000, 1),
+        }
+
+
+def _shrink_image(image_bytes: bytes, max_edge: int, output_format: str, quality: int) -> Tuple[bytes, int, int]:
+    """Decode, auto-orient, downscale and re-encode without metadata.
+
+    Runs in a worker process. The original bytes are returned unchanged when
+    re-encoding would neither shrink, rotate nor resize the image.
+    """
+    # Imported here: only the worker processes need Pillow
+    from PIL import ExifTags, Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source_format = source.format
+        transposed = source.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        image = ImageOps.exif_transpose(source)
+        resized = max(image.size) > max_edge
+        if resized:
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        if output_format == "JPEG" and image.mode != "RGB":
+            # JPEG has no alpha: flatten transparent figurine cut-outs on white
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        out = io.BytesIO()
+        if output_format == "WEBP":
+            image.save(out, format="WEBP", quality=quality, method=4)
+        else:
+            image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        data = out.getvalue()
+
+        if len(data) >= len(image_bytes) and not (resized or transposed) and source_format in ("JPEG", "PNG", "WEBP"):
+            return image_bytes, image.width, image.height
+        return data, image.width, image.height
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # forkserver: worker processes do not inherit the event loop or its threads
+        _executor = ProcessPoolExecutor(
+            max_workers=Config.IMAGE_PREPROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the worker processes (FastAPI shutdown hook)."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def preprocess_image(image_bytes: bytes, options: PreprocessOptions) -> PreprocessResult:
+    """Shrink an image for submission in the process pool, off the event loop."""
+    global _executor
+    started = time.perf_counter()
+    executor = _get_executor()
+    try:
+        data, width, height = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            _shrink_image,
+            image_bytes,
+            options.max_edge,
+            options.output_format,
+            options.quality,
+        )
+    except BrokenProcessPool:
+        # A worker died; the pool stays broken, so the next call builds a new one
+        logger.warning("Image preprocessing pool broke, replacing it")
+        if _executor is executor:
+            _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    return PreprocessResult(
+        image_bytes=data,
+        original_bytes=len(image_bytes),
+        output_bytes=len(data),
+        width=width,
+        height=height,
+        duration_seconds=time.perf_counter() - started,
+    )
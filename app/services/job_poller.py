@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from ..core import metrics
+from ..core.config import Config
+from ..core.resilience import CircuitOpenError
+from .tencent_ai3d_async import AsyncAi3dClient
+
+
+logger = logging.getLogger(__name__)
+
+# Give up on a job after this many consecutive failed status queries
+MAX_CONSECUTIVE_QUERY_ERRORS = 5
+# Schedule the next query when this share of still-running jobs is expected to be done
+POLL_COMPLETION_FRACTION = 0.05
+# Durations needed before the empirical schedule replaces the configured estimate
+MIN_HISTORY_SAMPLES = 10
+
+
+class JobFailedError(RuntimeError):
+    """The Tencent job finished with status FAIL."""
+
+    def __init__(self, code: Optional[str], message: Optional[str]):
+        super().__init__(f"Tencent AI3D job failed ({code}): {message}")
+        self.code = code
+        self.message = message
+
+
+@dataclass
+class _TrackedJob:
+    job_id: str
+    client: AsyncAi3dClient
+    future: asyncio.Future
+    submitted_at: float
+    deadline: float
+    next_poll_at: float
+    polls: int = 0
+    query_errors: int = 0
+    last_status: Optional[str] = None
+    # Resumed after a restart: its duration includes the downtime
+    resumed: bool = False
+    # Called with each new status (WAIT, RUN, DONE, FAIL)
+    listeners: List[Callable[[str], None]] = field(default_factory=list)
+    # Status query in flight, if any
+    poll_task: Optional[asyncio.Task] = None
+
+
+@dataclass
+class PollResult:
+    """Final query response of a job plus polling bookkeeping."""
+
+    response: Dict[str, Any]
+    polls: int
+    duration_seconds: float
+
+
+@dataclass
+class _DurationHistory:
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+
+    def expected(self) -> float:
+        if not self.samples:
+            return Config.TENCENT_EXPECTED_JOB_SECONDS
+        return statistics.median(self.samples)
+
+    def time_to_fraction(self, elapsed: float, fraction: float) -> Optional[float]:
+        """Seconds until ``fraction`` of jobs still running at ``elapsed`` finish.
+
+        Based on observed durations longer than ``elapsed``; None when the job
+        has outlived every sample.
+        """
+        survivors = sorted(d for d in self.samples if d > elapsed)
+        if not survivors:
+            return None
+        index = min(len(survivors) - 1, int(len(survivors) * fraction))
+        return survivors[index] - elapsed
+
+
+class JobPoller:
+    """Single background poller for every outstanding Tencent AI3D job.
+
+    Each job is polled on its own adaptive schedule derived from recently
+    observed job durations: sparsely while completion is unlikely, densely
+    around the typical completion time, and with a gently growing interval
+    once the job has outlived the history. Each due job is queried in its
+    own task (at most ``max_concurrency`` at once), so a slow or retrying
+    query holds up neither other jobs nor deadlines, and awaiting callers
+    are woken as soon as their job reaches DONE or FAIL.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, max_concurrency: int):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._max_concurrency = max(1, max_concurrency)
+        self._jobs: Dict[str, _TrackedJob] = {}
+        self._history = _DurationHistory()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.total_polls = 0
+
+    @property
+    def tracked(self) -> int:
+        return len(self._jobs)
+
+    def expected_duration(self) -> float:
+        return self._history.expected()
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="tencent-job-poller")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        polls = [job.poll_task for job in self._jobs.values() if job.poll_task is not None]
+        for poll in polls:
+            poll.cancel()
+        await asyncio.gather(*polls, return_exceptions=True)
+        for job in self._jobs.values():
+            if not job.future.done():
+                job.future.cancel()
+        self._jobs.clear()
+
+    async def wait(
+        self,
+        client: AsyncAi3dClient,
+        job_id: str,
+        timeout_seconds: float,
+        submitted_at: Optional[float] = None,
+        on_status: Optional[Callable[[str], None]] = None,
+    ) -> PollResult:
+        """Track ``job_id`` and return once it is DONE.
+
+        Raises JobFailedError on FAIL and TimeoutError past ``timeout_seconds``.
+        ``submitted_at`` (monotonic) lets a resumed job keep its real age; it
+        is queried right away, as it may have finished meanwhile.
+        ``on_status`` is called whenever a query returns a new job status.
+        """
+        await self.start()
+        now = time.monotonic()
+        resumed = submitted_at is not None
+        submitted_at = submitted_at if submitted_at is not None else now
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = _TrackedJob(
+                job_id=job_id,
+                client=client,
+                future=asyncio.get_running_loop().create_future(),
+                submitted_at=submitted_at,
+                deadline=now + timeout_seconds,
+                next_poll_at=now if resumed else now + self._next_interval(now - submitted_at),
+                resumed=resumed,
+            )
+            self._jobs[job_id] = job
+            assert self._wakeup is not None
+            self._wakeup.set()
+        if on_status is None:
+            return await asyncio.shield(job.future)
+        job.listeners.append(on_status)
+        try:
+            return await asyncio.shield(job.future)
+        finally:
+            job.listeners.remove(on_status)
+
+    def _next_interval(self, elapsed: float) -> float:
+        expected = self._history.expected()
+        if len(self._history.samples) >= MIN_HISTORY_SAMPLES:
+            # Poll when the next slice of still-running jobs is expected to finish
+            interval = self._history.time_to_fraction(elapsed, POLL_COMPLETION_FRACTION)
+        else:
+            # Little history yet: halve the distance to the expected completion time
+            remaining = expected - elapsed
+            interval = remaining / 2 if remaining > 0 else None
+        if interval is None:
+            # Overdue: back off gradually from the minimum interval
+            overdue = max(0.0, elapsed - expected)
+            interval = self._min_interval * (2 ** (overdue / max(expected, 1.0)))
+        return min(self._max_interval, max(self._min_interval, interval))
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            now = time.monotonic()
+            for job in list(self._jobs.values()):
+                if now >= job.deadline:
+                    # Time out on the deadline itself, not at the next poll; a
+                    # query outlasting it must not hold up the caller either
+                    if job.poll_task is not None:
+                        job.poll_task.cancel()
+                    self._finish(job, error=TimeoutError(f"Timed out waiting for job {job.job_id} to finish"))
+                elif job.poll_task is None and job.next_poll_at <= now:
+                    job.poll_task = asyncio.create_task(self._run_poll(job), name=f"tencent-poll-{job.job_id}")
+
+            self._wakeup.clear()
+            next_due = min(
+                (
+                    job.deadline if job.poll_task is not None else min(job.next_poll_at, job.deadline)
+                    for job in self._jobs.values()
+                ),
+                default=None,
+            )
+            timeout = None if next_due is None else max(0.0, next_due - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_poll(self, job: _TrackedJob) -> None:
+        try:
+            await self._poll(job)
+        finally:
+            job.poll_task = None
+            assert self._wakeup is not None
+            self._wakeup.set()
+
+    async def _poll(self, job: _TrackedJob) -> None:
+        now = time.monotonic()
+        if job.future.done():
+            self._jobs.pop(job.job_id, None)
+            return
+        if now > job.deadline:
+            self._finish(job, error=TimeoutError(f"Timed out waiting for job {job.job_id} to finish"))
+            return
+
+        assert self._semaphore is not None
+        try:
+            async with self._semaphore:
+                job.polls += 1
+                self.total_polls += 1
+                response = await job.client.query_job(job.job_id, deadline=job.deadline)
+        except CircuitOpenError as e:
+            # Tencent is known to be down; the job may still finish, so wait
+            # for the breaker instead of counting this against the job
+            job.next_poll_at = time.monotonic() + min(e.retry_after, self._max_interval)
+            return
+        except Exception as e:
+            job.query_errors += 1
+            logger.warning(f"Query for Tencent job {job.job_id} failed ({job.query_errors}): {e}")
+            if job.query_errors >= MAX_CONSECUTIVE_QUERY_ERRORS:
+                self._finish(job, error=e)
+            else:
+                job.next_poll_at = time.monotonic() + self._min_interval
+            return
+
+        job.query_errors = 0
+        status = response.get("Status")
+        if status != job.last_status:
+            job.last_status = status
+            for listener in list(job.listeners):
+                try:
+                    listener(status)
+                except Exception as e:
+                    logger.warning(f"Status listener of Tencent job {job.job_id} failed: {e}")
+        if job.last_status == "FAIL":
+            self._finish(job, error=JobFailedError(response.get("ErrorCode"), response.get("ErrorMessage")))
+        elif job.last_status == "DONE":
+            if not job.resumed:
+                self._history.samples.append(time.monotonic() - job.submitted_at)
+            self._finish(job, response=response)
+        else:
+            now = time.monotonic()
+            job.next_poll_at = now + self._next_interval(now - job.submitted_at)
+
+    def _finish(
+        self,
+        job: _TrackedJob,
+        response: Optional[Dict[str, Any]] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        self._jobs.pop(job.job_id, None)
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(PollResult(
+                response=response or {},
+                polls=job.polls,
+                duration_seconds=time.monotonic() - job.submitted_at,
+            ))
+
+
+job_poller = JobPoller(
+    min_interval=Config.TENCENT_POLL_MIN_INTERVAL_SECONDS,
+    max_interval=Config.TENCENT_POLL_MAX_INTERVAL_SECONDS,
+    max_concurrency=Config.TENCENT_POLL_MAX_CONCURRENCY,
+)
+
+metrics.REGISTRY.gauge_callback(
+    "tencent_jobs_tracked", "Tencent jobs being polled.", lambda: [({}, job_poller.tracked)]
+)
+metrics.REGISTRY.counter_callback(
+    "tencent_polls_total", "Tencent status queries sent.", lambda: [({}, job_poller.total_polls)]
+)
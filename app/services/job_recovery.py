@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from ..core import metrics, tracing
+from ..core.config import Config
+from .admission import admission_controller
+from .generation import describe_error, run_generation_deduplicated
+from .supabase_service import claim_tencent_job, get_orphaned_generations, update_memory
+
+
+logger = logging.getLogger(__name__)
+
+# Orphaned memories read per sweep
+SWEEP_BATCH_SIZE = 100
+
+
+class JobRecovery:
+    """Resumes Tencent jobs whose generation stopped with its instance.
+
+    Right after startup and then every ``interval_seconds``, memories still
+    in processing_3d with a recorded job are looked up. A job untouched for
+    ``grace_seconds`` is claimed (a conditional UPDATE, so only one
+    instance wins) and the generation resumes from polling that job, with
+    no new submission. Jobs older than ``max_age_seconds`` are given up and
+    their memories marked failed.
+    """
+
+    def __init__(self, interval_seconds: float, grace_seconds: float, max_age_seconds: float, concurrency: int):
+        self._interval_seconds = max(1.0, interval_seconds)
+        self._grace_seconds = grace_seconds
+        self._max_age_seconds = max_age_seconds
+        self._concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resuming: Dict[str, asyncio.Task] = {}
+        self.recovered = 0
+        self.failed = 0
+        self.abandoned = 0
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+            self._task = asyncio.create_task(self._run(), name="tencent-job-recovery")
+
+    async def stop(self) -> None:
+        # Cancelled resumes keep their memory in processing_3d with the job
+        # recorded, so the next instance picks them up again
+        tasks = [task for task in (self._task, *self._resuming.values()) if task is not None]
+        self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._resuming.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Tencent job recovery sweep failed: {e}")
+            await asyncio.sleep(self._interval_seconds)
+
+    async def sweep(self) -> int:
+        """Claim and resume the orphaned jobs found now; returns how many were claimed."""
+        claimed = 0
+        now = datetime.now(timezone.utc)
+        for memory in await get_orphaned_generations(SWEEP_BATCH_SIZE):
+            memory_id = memory["id"]
+            job = memory.get("model_3d_job") or {}
+            if memory_id in self._resuming or not job.get("job_id") or not job.get("claimed_at"):
+                continue
+            submitted_at = _parse_time(job.get("submitted_at")) or now
+            claimed_at = _parse_time(job["claimed_at"]) or now
+            if (now - submitted_at).total_seconds() > self._max_age_seconds:
+                await self._abandon(memory_id, job)
+            elif (now - claimed_at).total_seconds() >= self._grace_seconds:
+                resumed = {**job, "claimed_at": now.isoformat()}
+                if await claim_tencent_job(memory_id, resumed, job["claimed_at"]):
+                    claimed += 1
+                    self._resuming[memory_id] = asyncio.create_task(
+                        self._resume(memory, resumed), name=f"tencent-job-recovery-{memory_id}"
+                    )
+        if claimed:
+            logger.info(f"Resuming {claimed} orphaned Tencent jobs")
+        return claimed
+
+    async def _abandon(self, memory_id: str, job: Dict[str, Any]) -> None:
+        logger.warning(f"Giving up Tencent job {job['job_id']} of memory {memory_id}, submitted at {job.get('submitted_at')}")
+        try:
+            await update_memory(memory_id, {"status": "failed", "model_3d_job": None})
+            self.abandoned += 1
+        except Exception as e:
+            logger.warning(f"Failed to mark memory {memory_id} failed: {e}")
+
+    async def _resume(self, memory: Dict[str, Any], job: Dict[str, Any]) -> None:
+        memory_id = memory["id"]
+        request_id = tracing.new_request_id()
+        assert self._semaphore is not None
+        admission = None
+        try:
+            async with self._semaphore:
+                # The job already runs at Tencent; count it without rejecting it
+                admission = admission_controller.admit(force=True)
+                with tracing.start_trace(
+                    "generation.recovery",
+                    request_id,
+                    kind=tracing.SPAN_KIND_INTERNAL,
+                    **{"memory.id": memory_id, "tencent.job_id": job["job_id"]},
+                ):
+                    logger.info(f"[{request_id}] Recovering generation of memory {memory_id} (job by {job.get('request_id')})")
+                    await run_generation_deduplicated(
+                        memory.get("user_id"),
+                        memory_id,
+                        bool(job.get("enable_pbr")),
+                        request_id,
+                        preprocess=bool(job.get("preprocess")),
+                        figurine_url=memory.get("figurine_url"),
+                        resume_job=job,
+                    )
+            self.recovered += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"[{request_id}] Recovered generation of memory {memory_id} failed: {describe_error(e)}")
+        finally:
+            if admission is not None:
+                admission.release()
+            self._resuming.pop(memory_id, None)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+job_recovery = JobRecovery(
+    interval_seconds=Config.TENCENT_JOB_RECOVERY_INTERVAL_SECONDS,
+    grace_seconds=Config.TENCENT_JOB_RECOVERY_GRACE_SECONDS,
+    max_age_seconds=Config.TENCENT_JOB_RECOVERY_MAX_AGE_SECONDS,
+    concurrency=Config.TENCENT_JOB_RECOVERY_CONCURRENCY,
+)
+
+metrics.REGISTRY.counter_callback(
+    "tencent_jobs_recovered_total",
+    "Orphaned Tencent jobs taken over by this instance, by outcome.",
+    lambda: [
+        ({"outcome": "completed"}, job_recovery.recovered),
+        ({"outcome": "failed"}, job_recovery.failed),
+        ({"outcome": "abandoned"}, job_recovery.abandoned),
+    ],
+)
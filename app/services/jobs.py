@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..core import metrics, tracing
+from ..core.config import Config
+from .admission import AdmissionTicket
+from .generation import (
+    STAGE_FAILED,
+    STAGE_QUEUED,
+    describe_error,
+    run_generation_deduplicated,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the job queue cannot accept more work."""
+
+
+@dataclass
+class Job:
+    """A queued or running 3D generation, tracked in process memory."""
+
+    job_id: str
+    memory_id: str
+    user_id: Optional[str]
+    enable_pbr: bool
+    request_id: str
+    dedup_key: str = ""
+    preprocess: bool = False
+    # Released when the job finishes
+    admission: Optional[AdmissionTicket] = field(default=None, repr=False)
+    # Links the job's trace to the request that queued it
+    traceparent: Optional[str] = field(default=None, repr=False)
+    stage: str = STAGE_QUEUED
+    progress: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def update_progress(self, stage: str, progress: int) -> None:
+        self.stage = stage
+        self.progress = progress
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = self.result or {}
+        return {
+            "job_id": self.job_id,
+            "memory_id": self.memory_id,
+            "stage": self.stage,
+            "progress": self.progress,
+            "stl_url": result.get("stl_url"),
+            "stl_storage_path": result.get("stl_storage_path"),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Bounded in-process worker pool that runs the generation pipeline.
+
+    Jobs are kept in memory for ``retention_seconds`` after they finish so
+    clients can fetch the result; they do not survive a process restart.
+    """
+
+    def __init__(self, worker_count: int, max_queue_size: int, retention_seconds: int):
+        self._worker_count = max(1, worker_count)
+        self._max_queue_size = max_queue_size
+        self._retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"generation-worker-{index}")
+            for index in range(self._worker_count)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def find_active(self, dedup_key: str) -> Optional[Job]:
+        """Return the queued or running job for ``dedup_key``, if any."""
+        job_id = self._active.get(dedup_key)
+        return self._jobs.get(job_id) if job_id else None
+
+    def submit(
+        self,
+        memory_id: str,
+        user_id: Optional[str],
+        enable_pbr: bool,
+        dedup_key: str,
+        preprocess: bool = False,
+        admission: Optional[AdmissionTicket] = None,
+    ) -> Job:
+        """Queue a generation, or return the in-flight job with the same key.
+
+        The job takes over ``admission`` and releases it when it finishes.
+        """
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running")
+        active = self.find_active(dedup_key)
+        if active is not None:
+            return active
+        self._prune()
+
+        job_id = uuid.uuid4().hex
+        job = Job(
+            job_id=job_id,
+            memory_id=memory_id,
+            user_id=user_id,
+            enable_pbr=enable_pbr,
+            request_id=f"3d-job-{job_id[:12]}",
+            dedup_key=dedup_key,
+            preprocess=preprocess,
+            admission=admission,
+            traceparent=tracing.current_traceparent(),
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("Generation queue is full, try again later")
+        self._jobs[job_id] = job
+        self._active[dedup_key] = job_id
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.started_at = time.time()
+        try:
+            with tracing.start_trace(
+                "generation.job",
+                job.request_id,
+                traceparent=job.traceparent,
+                kind=tracing.SPAN_KIND_INTERNAL,
+                **{"memory.id": job.memory_id},
+            ):
+                job.result, _ = await run_generation_deduplicated(
+                    job.user_id,
+                    job.memory_id,
+                    job.enable_pbr,
+                    job.request_id,
+                    on_progress=job.update_progress,
+                    preprocess=job.preprocess,
+                )
+        except asyncio.CancelledError:
+            job.update_progress(STAGE_FAILED, 100)
+            job.error = "Job cancelled during shutdown"
+            raise
+        except Exception as e:
+            job.error = describe_error(e)
+            logger.error(f"[{job.request_id}] Job failed: {job.error} ({type(e).__name__})", exc_info=True)
+        finally:
+            job.finished_at = time.time()
+            if job.admission is not None:
+                job.admission.release()
+            if self._active.get(job.dedup_key) == job.job_id:
+                del self._active[job.dedup_key]
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self._retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager(
+    worker_count=Config.JOB_WORKERS,
+    max_queue_size=Config.JOB_QUEUE_SIZE,
+    retention_seconds=Config.JOB_RETENTION_SECONDS,
+)
+
+metrics.REGISTRY.gauge_callback(
+    "generation_queue_depth", "Background generations waiting for a worker.", lambda: [({}, job_manager.queue_depth())]
+)
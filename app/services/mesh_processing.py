@@ -0,0 +1,140 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..core.compression import CONTENT_ENCODING_SUFFIXES, CONTENT_ENCODING_TYPES, compress
+from ..core.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelVariant:
+    """An extra object stored next to the STL (compressed copy, preview mesh, ...)."""
+
+    name: str
+    data: bytes
+    content_type: str = "model/stl"
+    content_encoding: Optional[str] = None
+    triangles: Optional[int] = None
+
+
+@dataclass
+class ProcessedMesh:
+    stl_bytes: bytes
+    variants: List[ModelVariant] = field(default_factory=list)
+    info: Dict[str, Any] = field(default_factory=dict)
+    # Result of ``analyze_mesh``, when enabled and the STL could be parsed
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def postprocessing_enabled() -> bool:
+    """Whether any step needs the generated STL in memory."""
+    return (
+        Config.STL_NORMALIZE_ENABLED
+        or Config.STL_METADATA_ENABLED
+        or bool(Config.STL_COMPRESSION)
+        or bool(Config.STL_LOD_RESOLUTIONS)
+    )
+
+
+def lod_name(resolution: int) -> str:
+    return f"lod{resolution}"
+
+
+def is_lod_variant(name: str) -> bool:
+    return name.startswith("lod")
+
+
+def load_mesh_modules() -> None:
+    """Import the NumPy-based STL and mesh modules.
+
+    They are imported on first use so that startup does not pay for NumPy;
+    the startup prewarm calls this when post-processing is enabled.
+    """
+    from ..core import mesh, stl  # noqa: F401
+
+
+def variant_filename(filename: str, name: str) -> str:
+    """Storage filename of variant ``name`` of the model stored as ``filename``."""
+    suffix = CONTENT_ENCODING_SUFFIXES.get(name)
+    if suffix:
+        return f"{filename}{suffix}"
+    stem = filename[:-4] if filename.lower().endswith(".stl") else filename
+    return f"{stem}.{name}.stl"
+
+
+def process_stl(stl_bytes: bytes) -> ProcessedMesh:
+    """Normalize the generated STL and build its configured variants.
+
+    CPU-bound; call it from a worker thread. ASCII STL is rewritten as
+    binary (several times smaller); binary input is kept byte for byte.
+    Variants are the compressed copy and the decimated preview meshes.
+    The STL is parsed at most once for all steps.
+    """
+    from ..core.mesh import analyze_mesh
+    from ..core.stl import StlFormatError, is_binary_stl, parse_stl, write_binary_stl
+
+    started = time.perf_counter()
+    info: Dict[str, Any] = {"original_bytes": len(stl_bytes)}
+    binary = is_binary_stl(stl_bytes)
+    info["source_format"] = "binary" if binary else "ascii"
+    normalize = Config.STL_NORMALIZE_ENABLED and not binary
+
+    triangles = None
+    if normalize or Config.STL_METADATA_ENABLED or Config.STL_LOD_RESOLUTIONS:
+        try:
+            triangles = parse_stl(stl_bytes)
+            info["triangles"] = len(triangles)
+        except StlFormatError as e:
+            # Store what Tencent returned rather than failing the generation
+            logger.warning(f"Could not parse generated STL, storing it unchanged: {e}")
+
+    if normalize and triangles is not None:
+        stl_bytes = write_binary_stl(triangles)
+
+    metadata = None
+    if Config.STL_METADATA_ENABLED and triangles is not None:
+        metadata = analyze_mesh(triangles)
+
+    variants: List[ModelVariant] = []
+    if Config.STL_COMPRESSION:
+        try:
+            variants.append(ModelVariant(
+                name=Config.STL_COMPRESSION,
+                data=compress(stl_bytes, Config.STL_COMPRESSION),
+                content_type=CONTENT_ENCODING_TYPES[Config.STL_COMPRESSION],
+                content_encoding=Config.STL_COMPRESSION,
+            ))
+        except (RuntimeError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping compressed STL variant: {e}")
+
+    if triangles is not None:
+        variants.extend(_lod_variants(triangles))
+
+    info["output_bytes"] = len(stl_bytes)
+    info["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return ProcessedMesh(stl_bytes=stl_bytes, variants=variants, info=info, metadata=metadata)
+
+
+def _lod_variants(triangles) -> List[ModelVariant]:
+    """Preview meshes for each configured grid resolution, coarsest first.
+
+    Levels that would not reduce the triangle count are skipped.
+    """
+    from ..core.mesh import simplify_vertex_clustering
+    from ..core.stl import write_binary_stl
+
+    variants = []
+    for resolution in sorted(Config.STL_LOD_RESOLUTIONS):
+        simplified = simplify_vertex_clustering(triangles, resolution)
+        if len(simplified) == 0 or len(simplified) >= len(triangles):
+            continue
+        variants.append(ModelVariant(
+            name=lod_name(resolution),
+            data=write_binary_stl(simplified),
+            triangles=len(simplified),
+        ))
+    return variants
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..core import metrics
+from ..core.config import Config
+from . import tencent_ai3d
+from .supabase_service import ping as ping_supabase, ping_storage
+
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class DependencyStatus:
+    status: str = "unknown"  # "unknown" until checked, then "ok" or "failing"
+    required: bool = True
+    checked_at: Optional[float] = None  # wall clock, for display
+    checked_monotonic: Optional[float] = None
+    latency_ms: Optional[float] = None
+    error: Optional[str] = None
+
+    def is_ok(self, stale_seconds: float) -> bool:
+        return (
+            self.status == "ok"
+            and self.checked_monotonic is not None
+            and time.monotonic() - self.checked_monotonic <= stale_seconds
+        )
+
+    def to_dict(self, stale_seconds: float) -> Dict[str, Any]:
+        status = self.status
+        if status == "ok" and not self.is_ok(stale_seconds):
+            status = "stale"
+        return {
+            "status": status,
+            "required": self.required,
+            "last_checked": datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None,
+            "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+            "error": self.error,
+        }
+
+
+class ReadinessMonitor:
+    """Checks dependencies in the background so probes answer from memory.
+
+    Every ``interval_seconds`` all registered checks run concurrently, each
+    bounded by ``timeout_seconds``. The service is ready while every
+    required dependency passed its last check within ``stale_seconds``;
+    failing optional dependencies only mark it degraded.
+    """
+
+    def __init__(self, interval_seconds: float, timeout_seconds: float, stale_seconds: float):
+        self._interval_seconds = max(1.0, interval_seconds)
+        self._timeout_seconds = timeout_seconds
+        self._stale_seconds = stale_seconds
+        self._checks: Dict[str, Check] = {}
+        self._statuses: Dict[str, DependencyStatus] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: Check, required: bool = True) -> None:
+        self._checks[name] = check
+        self._statuses[name] = DependencyStatus(required=required)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="readiness-monitor")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._interval_seconds)
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*(self._check(name, check) for name, check in self._checks.items()))
+
+    async def _check(self, name: str, check: Check) -> None:
+        status = self._statuses[name]
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), timeout=self._timeout_seconds)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if status.status != "failing":
+                logger.warning(f"Readiness check {name} failing: {error}")
+            status.status, status.error = "failing", error
+        else:
+            if status.status == "failing":
+                logger.info(f"Readiness check {name} recovered")
+            status.status, status.error = "ok", None
+        status.latency_ms = (time.perf_counter() - started) * 1000
+        status.checked_at = time.time()
+        status.checked_monotonic = time.monotonic()
+
+    def is_ready(self) -> bool:
+        return all(s.is_ok(self._stale_seconds) for s in self._statuses.values() if s.required)
+
+    def snapshot(self) -> Dict[str, Any]:
+        if not self.is_ready():
+            status = "not_ready"
+        elif all(s.is_ok(self._stale_seconds) for s in self._statuses.values()):
+            status = "ready"
+        else:
+            status = "degraded"
+        return {
+            "status": status,
+            "dependencies": {
+                name: dependency.to_dict(self._stale_seconds) for name, dependency in self._statuses.items()
+            },
+        }
+
+
+async def _check_config() -> None:
+    Config.validate()
+
+
+readiness_monitor = ReadinessMonitor(
+    interval_seconds=Config.READINESS_CHECK_INTERVAL_SECONDS,
+    timeout_seconds=Config.READINESS_CHECK_TIMEOUT_SECONDS,
+    stale_seconds=Config.READINESS_STALE_SECONDS,
+)
+readiness_monitor.register("config", _check_config)
+readiness_monitor.register("supabase", ping_supabase)
+readiness_monitor.register("storage", ping_storage)
+if Config.ENVIRONMENT != "development":
+    # Generations fail without Tencent, but its circuit breaker already
+    # fails them fast; taking every instance out of rotation would not help
+    readiness_monitor.register("tencent", tencent_ai3d.ping, required=False)
+
+metrics.REGISTRY.gauge_callback(
+    "dependency_up",
+    "Whether the dependency passed its last background readiness check.",
+    lambda: [
+        ({"dependency": name}, int(status.is_ok(readiness_monitor._stale_seconds)))
+        for name, status in readiness_monitor._statuses.items()
+    ],
+)
@@ -0,0 +1,196 @@
+import logging
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from ..core import metrics
+from ..core.config import Config
+from ..core.resilience import CircuitBreaker
+from .tencent_ai3d_async import region_breaker
+
+
+logger = logging.getLogger(__name__)
+
+# Outcomes needed before a region's error rate can mark it unhealthy
+MIN_OUTCOME_SAMPLES = 4
+# Error rates are capped here when penalizing a region's expected time
+MAX_PENALIZED_ERROR_RATE = 0.9
+
+
+@dataclass
+class _RegionStats:
+    """Recent ``(monotonic time, value)`` samples of one region."""
+
+    window: int
+    submit_latencies: Deque[Tuple[float, float]] = field(init=False)
+    job_durations: Deque[Tuple[float, float]] = field(init=False)
+    # 1.0 for a failed submit or job, 0.0 for a successful one
+    outcomes: Deque[Tuple[float, float]] = field(init=False)
+    last_failure_at: Optional[float] = None
+    submitted: int = 0
+    failed: int = 0
+
+    def __post_init__(self):
+        self.submit_latencies = deque(maxlen=self.window)
+        self.job_durations = deque(maxlen=self.window)
+        self.outcomes = deque(maxlen=self.window)
+
+
+def _recent(samples: Deque[Tuple[float, float]], max_age: float) -> List[float]:
+    oldest = time.monotonic() - max_age
+    return [value for at, value in samples if at >= oldest]
+
+
+class RegionRouter:
+    """Picks the Tencent region for each new job from rolling per-region stats.
+
+    Regions are ranked by expected time to a result: median submit latency
+    plus median submit-to-done duration, divided by the success rate. A
+    region without recent samples is assumed to take
+    ``TENCENT_EXPECTED_JOB_SECONDS``, so traffic stays on the first
+    configured region until it gets slower than that. Regions whose breaker
+    is open, or whose error rate reached ``max_error_rate`` and failed
+    within ``cooldown_seconds``, are unhealthy and only tried after all
+    healthy ones. Samples expire after ``max_age_seconds``.
+    """
+
+    def __init__(
+        self,
+        regions: Sequence[str],
+        window: int,
+        max_age_seconds: float,
+        max_error_rate: float,
+        cooldown_seconds: float,
+    ):
+        self.regions = list(dict.fromkeys(regions))
+        self._window = max(1, window)
+        self._max_age_seconds = max_age_seconds
+        self._max_error_rate = max_error_rate
+        self._cooldown_seconds = cooldown_seconds
+        self._stats = {region: _RegionStats(self._window) for region in self.regions}
+        self.failovers = 0
+
+    def _region_stats(self, region: str) -> _RegionStats:
+        stats = self._stats.get(region)
+        if stats is None:
+            # A region passed explicitly, outside the configured list
+            stats = self._stats[region] = _RegionStats(self._window)
+        return stats
+
+    def record_submit(self, region: str, latency_seconds: Optional[float] = None, failed: bool = False) -> None:
+        stats = self._region_stats(region)
+        now = time.monotonic()
+        stats.submitted += 1
+        if failed:
+            self._record_failure(stats, now)
+        else:
+            stats.submit_latencies.append((now, latency_seconds or 0.0))
+
+    def record_job(self, region: str, duration_seconds: Optional[float] = None, failed: bool = False) -> None:
+        """Outcome of a submitted job; ``duration_seconds`` runs from submit to done."""
+        stats = self._region_stats(region)
+        now = time.monotonic()
+        if failed:
+            self._record_failure(stats, now)
+        else:
+            stats.outcomes.append((now, 0.0))
+            if duration_seconds is not None:
+                stats.job_durations.append((now, duration_seconds))
+
+    @staticmethod
+    def _record_failure(stats: _RegionStats, now: float) -> None:
+        stats.failed += 1
+        stats.outcomes.append((now, 1.0))
+        stats.last_failure_at = now
+
+    def record_failover(self, from_region: str, to_region: str, error: BaseException) -> None:
+        self.failovers += 1
+        logger.warning(f"Tencent submit in {from_region} failed, failing over to {to_region}: {error}")
+
+    def _error_rate(self, stats: _RegionStats, min_samples: int = 1) -> Optional[float]:
+        outcomes = _recent(stats.outcomes, self._max_age_seconds)
+        if not outcomes or len(outcomes) < min_samples:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def _expected_seconds(self, stats: _RegionStats, error_rate: Optional[float]) -> float:
+        latencies = _recent(stats.submit_latencies, self._max_age_seconds)
+        durations = _recent(stats.job_durations, self._max_age_seconds)
+        expected = (
+            (statistics.median(latencies) if latencies else 0.0)
+            + (statistics.median(durations) if durations else Config.TENCENT_EXPECTED_JOB_SECONDS)
+        )
+        return expected / (1.0 - min(error_rate or 0.0, MAX_PENALIZED_ERROR_RATE))
+
+    def _is_healthy(self, region: str, stats: _RegionStats) -> bool:
+        if region_breaker(region).state == CircuitBreaker.OPEN:
+            return False
+        error_rate = self._error_rate(stats, MIN_OUTCOME_SAMPLES)
+        if error_rate is None or error_rate < self._max_error_rate:
+            return True
+        return stats.last_failure_at is None or time.monotonic() - stats.last_failure_at >= self._cooldown_seconds
+
+    def candidates(self) -> List[str]:
+        """Configured regions to try for a new job, best first."""
+        ranked = []
+        for order, region in enumerate(self.regions):
+            stats = self._stats[region]
+            healthy = self._is_healthy(region, stats)
+            ranked.append((not healthy, self._expected_seconds(stats, self._error_rate(stats)), order, region))
+        return [region for *_, region in sorted(ranked)]
+
+    def snapshot(self) -> Dict[str, Any]:
+        regions = {}
+        for region, stats in self._stats.items():
+            latencies = _recent(stats.submit_latencies, self._max_age_seconds)
+            durations = _recent(stats.job_durations, self._max_age_seconds)
+            error_rate = self._error_rate(stats)
+            regions[region] = {
+                "healthy": self._is_healthy(region, stats),
+                "expected_seconds": round(self._expected_seconds(stats, error_rate), 2),
+                "submit_latency_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                "job_duration_seconds": round(statistics.median(durations), 2) if durations else None,
+                "error_rate": round(error_rate, 3) if error_rate is not None else None,
+                "submitted": stats.submitted,
+                "failed": stats.failed,
+            }
+        return {"order": self.candidates(), "failovers": self.failovers, "regions": regions}
+
+
+region_router = RegionRouter(
+    regions=Config.TENCENT_REGIONS,
+    window=Config.TENCENT_REGION_STATS_WINDOW,
+    max_age_seconds=Config.TENCENT_REGION_STATS_MAX_AGE_SECONDS,
+    max_error_rate=Config.TENCENT_REGION_MAX_ERROR_RATE,
+    cooldown_seconds=Config.TENCENT_REGION_COOLDOWN_SECONDS,
+)
+
+
+def _region_samples(key: str):
+    for region, stats in region_router.snapshot()["regions"].items():
+        if stats[key] is not None:
+            yield {"region": region}, float(stats[key])
+
+
+metrics.REGISTRY.gauge_callback(
+    "tencent_region_healthy",
+    "Whether the region is eligible for new Tencent jobs.",
+    lambda: _region_samples("healthy"),
+)
+metrics.REGISTRY.gauge_callback(
+    "tencent_region_expected_seconds",
+    "Expected time to a result in the region, used to rank regions.",
+    lambda: _region_samples("expected_seconds"),
+)
+metrics.REGISTRY.gauge_callback(
+    "tencent_region_error_rate",
+    "Recent share of failed submits and jobs in the region.",
+    lambda: _region_samples("error_rate"),
+)
+metrics.REGISTRY.counter_callback(
+    "tencent_region_failovers_total",
+    "Job submissions moved to another region after a submit failure.",
+    lambda: [({}, region_router.failovers)],
+)
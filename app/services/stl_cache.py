@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from ..core import metrics
+from ..core.config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(
+    image_bytes: bytes,
+    *,
+    enable_pbr: bool,
+    result_format: str,
+    preprocess: Optional[str] = None,
+) -> str:
+    """Content address of a generation: image bytes plus generation options.
+
+    ``preprocess`` tags the image transformation applied before submission.
+    """
+    digest = hashlib.sha256()
+    digest.update(image_bytes)
+    digest.update(f"|pbr={int(enable_pbr)}|format={result_format.upper()}".encode("utf-8"))
+    if preprocess:
+        digest.update(f"|preprocess={preprocess}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def object_cache_key(etag: str, *, enable_pbr: bool, result_format: str) -> str:
+    """Content address from a storage object's ETag, used when the image is not downloaded."""
+    digest = hashlib.sha256()
+    digest.update(f"etag={etag}".encode("utf-8"))
+    digest.update(f"|pbr={int(enable_pbr)}|format={result_format.upper()}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    storage_path: str
+    # Variant name -> storage path of objects stored alongside the STL
+    variants: Dict[str, str] = field(default_factory=dict)
+    # Mesh metadata computed when the STL was generated
+    metadata: Optional[Dict[str, Any]] = None
+
+
+class StlCache:
+    """SQLite index mapping content hashes to STL objects already in storage.
+
+    Entries expire after ``ttl_seconds`` and the least recently used ones are
+    evicted once more than ``max_entries`` are stored. The index only holds
+    storage paths (the STL and its variants) and the mesh metadata; the bytes stay in Supabase
+    Storage.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self._path = path
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self._path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stl_cache ("
+                " key TEXT PRIMARY KEY,"
+                " storage_path TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used_at REAL NOT NULL,"
+                " variants TEXT,"
+                " metadata TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(stl_cache)")}
+            for column in ("variants", "metadata"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE stl_cache ADD COLUMN {column} TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS stl_cache_last_used ON stl_cache (last_used_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT storage_path, created_at, variants, metadata FROM stl_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] < now - self._ttl_seconds:
+                conn.execute("DELETE FROM stl_cache WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE stl_cache SET last_used_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return CacheEntry(
+                storage_path=row[0],
+                variants=json.loads(row[2]) if row[2] else {},
+                metadata=json.loads(row[3]) if row[3] else None,
+            )
+
+    def put(
+        self,
+        key: str,
+        storage_path: str,
+        variants: Optional[Dict[str, str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO stl_cache (key, storage_path, created_at, last_used_at, variants, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    storage_path,
+                    now,
+                    now,
+                    json.dumps(variants) if variants else None,
+                    json.dumps(metadata) if metadata else None,
+                ),
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def record_hit(self) -> None:
+        """Count a lookup whose entry was reused; ``get`` itself only counts misses."""
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        """Count a lookup whose entry was found but could not be reused."""
+        with self._lock:
+            self.misses += 1
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM stl_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM stl_cache WHERE created_at < ?", (now - self._ttl_seconds,))
+        conn.execute(
+            "DELETE FROM stl_cache WHERE key IN ("
+            " SELECT key FROM stl_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM stl_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "enabled": Config.STL_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self._max_entries,
+            "ttl_seconds": self._ttl_seconds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Async wrappers keep SQLite file I/O off the event loop
+    async def get_async(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def put_async(
+        self,
+        key: str,
+        storage_path: str,
+        variants: Optional[Dict[str, str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        await asyncio.to_thread(self.put, key, storage_path, variants, metadata)
+
+    async def invalidate_async(self, key: str) -> None:
+        await asyncio.to_thread(self.invalidate, key)
+
+
+stl_cache = StlCache(
+    path=Config.STL_CACHE_PATH,
+    max_entries=Config.STL_CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.STL_CACHE_TTL_SECONDS,
+)
+
+metrics.REGISTRY.counter_callback(
+    "stl_cache_lookups_total",
+    "STL cache lookups by result.",
+    lambda: [({"result": "hit"}, stl_cache.hits), ({"result": "miss"}, stl_cache.misses)],
+)
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import tempfile
+from typing import IO, Any, AsyncIterator, Dict, Optional
+
+from ..core import metrics
+from ..core.config import Config
+from ..core.http import check_content_length, iter_limited, stream_url
+from .supabase_service import upload_stream_to_supabase
+
+
+logger = logging.getLogger(__name__)
+
+
+async def transfer_url_to_storage(
+    url: str,
+    filename: str,
+    *,
+    content_type: str,
+    user_id: Optional[str] = None,
+    buffer_bytes: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Copy a generated model from ``url`` into Supabase Storage in chunks.
+
+    When the source announces its size the download is piped straight into
+    the upload. Otherwise it is first spooled to a temporary file (kept in
+    memory up to ``buffer_bytes``) so the upload can send a Content-Length.
+    Either way peak memory stays around ``buffer_bytes`` per transfer.
+    Returns the same shape as ``upload_to_supabase``.
+    """
+    buffer_bytes = buffer_bytes or Config.STL_STREAM_BUFFER_BYTES
+    max_bytes = Config.MAX_STL_DOWNLOAD_BYTES
+    async with stream_url(url) as resp:
+        check_content_length(resp, max_bytes)
+        content_length = resp.headers.get("content-length")
+        # A compressed transfer's length does not match the decoded body
+        if content_length is not None and not resp.headers.get("content-encoding"):
+            metrics.observe_payload("stl", int(content_length))
+            return await upload_stream_to_supabase(
+                iter_limited(resp, max_bytes, buffer_bytes),
+                int(content_length),
+                filename,
+                content_type=content_type,
+                user_id=user_id,
+            )
+
+        logger.info(f"Result {filename} has no Content-Length, spooling before upload")
+        spool = tempfile.SpooledTemporaryFile(max_size=buffer_bytes, dir=Config.STL_SPOOL_DIR or None)
+        try:
+            async for chunk in iter_limited(resp, max_bytes, buffer_bytes):
+                await asyncio.to_thread(spool.write, chunk)
+        except BaseException:
+            spool.close()
+            raise
+
+    with spool:
+        size = spool.tell()
+        metrics.observe_payload("stl", size)
+        spool.seek(0)
+        return await upload_stream_to_supabase(
+            _read_chunks(spool, buffer_bytes),
+            size,
+            filename,
+            content_type=content_type,
+            user_id=user_id,
+        )
+
+
+async def _read_chunks(spool: IO[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await asyncio.to_thread(spool.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
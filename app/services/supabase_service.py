@@ -1,18 +1,75 @@
+import asyncio
 import logging
-from typing import Optional
+from typing import Any, AsyncIterable, Dict, List, Optional
 from urllib.parse import urlparse
 
 from fastapi import HTTPException
-from supabase import create_client, Client
+from supabase import AsyncClient, acreate_client
 
 from ..core.config import Config
+from ..core.resilience import RetryPolicy, call_with_retry, get_breaker, http_status, is_transient_error
+from ..core.tracing import traced
 
 
 logger = logging.getLogger(__name__)
 
+# Ids per ``in_`` filter, keeping PostgREST query strings well under URL limits
+_IN_FILTER_CHUNK_SIZE = 200
 
-def get_client() -> Client:
-    return create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+# Signing is idempotent. Uploads are retried too: objects are written with
+# upsert off, so a retry after a lost response finds the object in place
+STORAGE_RETRY = RetryPolicy(retry_on=is_transient_error)
+supabase_breaker = get_breaker("supabase")
+
+# Process-wide client. Its PostgREST and Storage sub-clients each hold a
+# pooled HTTP/2 httpx session, so connections are kept alive between calls.
+_client: Optional[AsyncClient] = None
+_client_lock = asyncio.Lock()
+
+
+async def init_client() -> AsyncClient:
+    """Create the shared Supabase client if it does not exist yet."""
+    global _client
+    if _client is not None:
+        return _client
+    async with _client_lock:
+        if _client is None:
+            _client = await acreate_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client's HTTP sessions (FastAPI shutdown hook)."""
+    global _client
+    client, _client = _client, None
+    if client is None:
+        return
+    # Reading a sub-client property builds it if it was never used, which
+    # opens no connection. Storage has no aclose, but its session is public
+    closers = (("PostgREST", client.postgrest.aclose), ("Storage", client.storage.session.aclose))
+    for name, aclose in closers:
+        try:
+            await aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close Supabase {name} HTTP session: {e}")
+
+
+async def ping() -> None:
+    """One cheap PostgREST round trip (also opens the pooled connection)."""
+    supabase = await get_client()
+    await supabase.table('memories').select('id').limit(1).execute()
+
+
+async def ping_storage() -> None:
+    """Look up the figurine bucket, proving Storage answers for our key."""
+    supabase = await get_client()
+    await supabase.storage.get_bucket(Config.SUPABASE_BUCKET)
+
+
+async def get_client() -> AsyncClient:
+    if _client is not None:
+        return _client
+    return await init_client()
 
 
 def _infer_storage_path_from_url(url_or_path: str, bucket: str) -> str:
@@ -32,14 +89,48 @@ def _infer_storage_path_from_url(url_or_path: str, bucket: str) -> str:
         return parsed.path.lstrip('/')
 
 
-def create_signed_url_for_storage_object(url_or_path: str, *, expires_in_seconds: int = 3600) -> str:
+@traced("supabase.create_signed_urls_for_storage_objects")
+async def create_signed_urls_for_storage_objects(
+    urls_or_paths: List[str], *, expires_in_seconds: int = 3600
+) -> Dict[str, str]:
+    """Sign several storage objects with one request.
+
+    Maps each input URL/path to its signed URL; objects Supabase could not
+    sign are left out.
+    """
+    if not urls_or_paths:
+        return {}
     try:
-        supabase = get_client()
-        object_path = _infer_storage_path_from_url(url_or_path, Config.SUPABASE_BUCKET)
-        signed_result = supabase.storage.from_(Config.SUPABASE_BUCKET).create_signed_url(
-            object_path,
+        supabase = await get_client()
+        paths = {
+            _infer_storage_path_from_url(url_or_path, Config.SUPABASE_BUCKET): url_or_path
+            for url_or_path in urls_or_paths
+        }
+        signed = await supabase.storage.from_(Config.SUPABASE_BUCKET).create_signed_urls(
+            list(paths),
             expires_in_seconds
         )
+        return {
+            paths[item['path']]: item['signedURL']
+            for item in signed
+            if not item.get('error') and item.get('path') in paths
+        }
+    except Exception as e:
+        logger.error(f"Failed to create signed URLs: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create signed URLs for images")
+
+
+@traced("supabase.create_signed_url_for_storage_object")
+async def create_signed_url_for_storage_object(url_or_path: str, *, expires_in_seconds: int = 3600) -> str:
+    try:
+        supabase = await get_client()
+        object_path = _infer_storage_path_from_url(url_or_path, Config.SUPABASE_BUCKET)
+        signed_result = await call_with_retry(
+            "Supabase create_signed_url",
+            lambda: supabase.storage.from_(Config.SUPABASE_BUCKET).create_signed_url(object_path, expires_in_seconds),
+            STORAGE_RETRY,
+            supabase_breaker,
+        )
 
         if isinstance(signed_result, dict):
             signed_url = (
@@ -61,24 +152,61 @@ def create_signed_url_for_storage_object(url_or_path: str, *, expires_in_seconds
         raise HTTPException(status_code=500, detail="Failed to create signed URL for image")
 
 
-def upload_to_supabase(file_bytes: bytes, filename: str, content_type: str, user_id: Optional[str] = None):
+@traced("supabase.get_storage_object_etag")
+async def get_storage_object_etag(url_or_path: str) -> Optional[str]:
+    """Return the storage object's ETag (a content hash), or None if unavailable."""
+    try:
+        supabase: AsyncClient = await get_client()
+        object_path = _infer_storage_path_from_url(url_or_path, Config.SUPABASE_BUCKET)
+        info = await supabase.storage.from_(Config.SUPABASE_BUCKET).info(object_path)
+        if not isinstance(info, dict):
+            return None
+        etag = info.get('etag') or (info.get('metadata') or {}).get('eTag')
+        return str(etag).strip('"') if etag else None
+    except Exception as e:
+        logger.warning(f"Failed to fetch storage object info: {e}")
+        return None
+
+
+@traced("supabase.upload_to_supabase")
+async def upload_to_supabase(
+    file_bytes: bytes,
+    filename: str,
+    content_type: str,
+    user_id: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+):
 
     try:
-        supabase: Client = get_client()
+        supabase: AsyncClient = await get_client()
 
-        if user_id:
-            file_path = f"{user_id}/3d-models/{filename}"
-        else:
-            file_path = f"generated/3d-models/{filename}"
+        file_path = _model_storage_path(filename, user_id)
 
-        upload_result = supabase.storage.from_(Config.SUPABASE_BUCKET).upload(
-            path=file_path,
-            file=file_bytes,
-            file_options={
+        attempts = 0
+
+        async def _upload():
+            nonlocal attempts
+            attempts += 1
+            # storage3 pops keys out of file_options, so every attempt gets its own
+            file_options: Dict[str, Any] = {
                 "content-type": content_type,
                 "cache-control": "3600"
             }
-        )
+            if metadata:
+                file_options["metadata"] = metadata
+            try:
+                return await supabase.storage.from_(Config.SUPABASE_BUCKET).upload(
+                    path=file_path,
+                    file=file_bytes,
+                    file_options=file_options
+                )
+            except Exception as e:
+                if attempts > 1 and _is_duplicate_object_error(e):
+                    # An earlier attempt stored the object but its response was lost
+                    return None
+                raise
+
+        upload_result = await call_with_retry("Supabase upload", _upload, STORAGE_RETRY, supabase_breaker)
 
         upload_error = None
         if isinstance(upload_result, dict):
@@ -92,17 +220,7 @@ def upload_to_supabase(file_bytes: bytes, filename: str, content_type: str, user
         if upload_error:
             raise RuntimeError(f"Supabase upload error: {upload_error}")
 
-        signed_res = supabase.storage.from_(Config.SUPABASE_BUCKET).create_signed_url(file_path, 3600)
-        if isinstance(signed_res, dict):
-            signed_url = (
-                signed_res.get('signedURL')
-                or signed_res.get('signed_url')
-                or signed_res.get('signedUrl')
-                or signed_res.get('url')
-            )
-        else:
-            signed_url = str(signed_res)
-
+        signed_url = await _model_signed_url(supabase, file_path)
 
         return {
             "storage_path": file_path,
@@ -113,52 +231,272 @@ def upload_to_supabase(file_bytes: bytes, filename: str, content_type: str, user
         raise HTTPException(status_code=500, detail=f"Failed to upload to Supabase: {e}")
 
 
-def update_memory_status(memory_id: str, status: str):
+@traced("supabase.upload_stream_to_supabase")
+async def upload_stream_to_supabase(
+    chunks: AsyncIterable[bytes],
+    content_length: int,
+    filename: str,
+    content_type: str,
+    user_id: Optional[str] = None,
+):
+    """Upload a model from an async stream of chunks of known total length.
+
+    The body is sent as-is (no multipart) over the Storage client's pooled
+    session, so only the chunk in flight is held in memory. Returns the same
+    shape as ``upload_to_supabase``.
+    """
+    try:
+        supabase: AsyncClient = await get_client()
+        file_path = _model_storage_path(filename, user_id)
+
+        resp = await supabase.storage.session.post(
+            f"/object/{Config.SUPABASE_BUCKET}/{file_path}",
+            content=chunks,
+            headers={
+                "content-type": content_type,
+                "content-length": str(content_length),
+                "cache-control": "max-age=3600",
+                "x-upsert": "false",
+            },
+        )
+        if resp.status_code >= 400:
+            raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}")
+
+        signed_url = await _model_signed_url(supabase, file_path)
 
+        return {
+            "storage_path": file_path,
+            "signed_url": signed_url,
+        }
+    except Exception as e:
+        logger.error(f"Failed to stream upload to Supabase: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to upload to Supabase: {e}")
+
+
+@traced("supabase.copy_storage_object")
+async def copy_storage_object(source_path: str, filename: str, user_id: Optional[str] = None):
+    """Copy an existing model object to the user's 3d-models folder.
+
+    Returns the same shape as ``upload_to_supabase``.
+    """
     try:
-        supabase: Client = get_client()
+        supabase: AsyncClient = await get_client()
+        file_path = _model_storage_path(filename, user_id)
+
+        await supabase.storage.from_(Config.SUPABASE_BUCKET).copy(source_path, file_path)
+        signed_url = await _model_signed_url(supabase, file_path)
+
+        return {
+            "storage_path": file_path,
+            "signed_url": signed_url,
+        }
+    except Exception as e:
+        logger.error(f"Failed to copy storage object {source_path}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to copy storage object: {e}")
+
+
+def _is_duplicate_object_error(exc: BaseException) -> bool:
+    return http_status(exc) == 409 or getattr(exc, 'code', None) == 'Duplicate'
+
 
-        check_result = supabase.table('memories').select('id, user_id').eq('id', memory_id).execute()
-        if not check_result.data:
-            raise RuntimeError(f"No memory found with ID {memory_id}")
+def _model_storage_path(filename: str, user_id: Optional[str]) -> str:
+    if user_id:
+        return f"{user_id}/3d-models/{filename}"
+    return f"generated/3d-models/{filename}"
 
-        result = supabase.table('memories').update({
-            'status': status
-        }).eq('id', memory_id).execute()
 
+async def _model_signed_url(supabase: AsyncClient, file_path: str) -> Optional[str]:
+    signed_res = await call_with_retry(
+        "Supabase create_signed_url",
+        lambda: supabase.storage.from_(Config.SUPABASE_BUCKET).create_signed_url(file_path, 3600),
+        STORAGE_RETRY,
+        supabase_breaker,
+    )
+    if isinstance(signed_res, dict):
+        return (
+            signed_res.get('signedURL')
+            or signed_res.get('signed_url')
+            or signed_res.get('signedUrl')
+            or signed_res.get('url')
+        )
+    return str(signed_res)
+
+
+@traced("supabase.update_memory")
+async def update_memory(memory_id: str, fields: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Apply ``fields`` to a memory in a single conditional UPDATE.
+
+    The updated rows are returned by PostgREST, so an empty result means the
+    memory does not exist; no separate existence SELECT is needed.
+    """
+    supabase: AsyncClient = await get_client()
+
+    result = await supabase.table('memories').update(fields).eq('id', memory_id).execute()
+    if not result.data:
+        raise RuntimeError(f"No memory found with ID {memory_id}")
 
-        return result.data
+    return result.data
+
+
+async def update_memory_status(memory_id: str, status: str, fields: Optional[Dict[str, Any]] = None):
+    """Set ``status``, plus any other ``fields`` in the same UPDATE."""
+
+    try:
+        return await update_memory(memory_id, {**(fields or {}), 'status': status})
     except Exception as e:
         logger.error(f"Failed to update memory status for {memory_id}: {e}")
         raise
 
 
-def update_memory_with_stl(memory_id: str, stl_storage_path: str):
+@traced("supabase.update_memories_status")
+async def update_memories_status(
+    memory_ids: List[str], status: str, fields: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """Set ``status`` (and other ``fields``) on many memories, one UPDATE per chunk of ids.
 
+    Returns the updated rows; ids that do not exist are simply absent.
+    """
     try:
-        supabase: Client = get_client()
+        supabase: AsyncClient = await get_client()
+        values = {**(fields or {}), 'status': status}
+        results = await asyncio.gather(*(
+            supabase.table('memories').update(values).in_('id', chunk).execute()
+            for chunk in _chunks(memory_ids, _IN_FILTER_CHUNK_SIZE)
+        ))
+        return [row for result in results for row in result.data]
+    except Exception as e:
+        logger.error(f"Failed to update status of {len(memory_ids)} memories: {e}")
+        raise
+
+
+@traced("supabase.get_memories")
+async def get_memories(memory_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch id, user_id and figurine_url of many memories, keyed by id.
 
-        check_result = supabase.table('memories').select('id, user_id').eq('id', memory_id).execute()
-        if not check_result.data:
-            raise RuntimeError(f"No memory found with ID {memory_id}")
+    One ``in_`` query per chunk of ids; missing memories are absent.
+    """
+    try:
+        supabase: AsyncClient = await get_client()
+        results = await asyncio.gather(*(
+            supabase.table('memories').select('id, user_id, figurine_url').in_('id', chunk).execute()
+            for chunk in _chunks(memory_ids, _IN_FILTER_CHUNK_SIZE)
+        ))
+        return {row['id']: row for result in results for row in result.data}
+    except Exception as e:
+        logger.error(f"Failed to fetch {len(memory_ids)} memories: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch memories from database")
 
-        result = supabase.table('memories').update({
-            'model_3d_url': stl_storage_path
-        }).eq('id', memory_id).execute()
 
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
 
-        return result.data
+
+@traced("supabase.update_memory_with_stl")
+async def update_memory_with_stl(
+    memory_id: str,
+    stl_storage_path: str,
+    *,
+    status: Optional[str] = None,
+    lods: Optional[Dict[str, str]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+):
+    """Record the STL path, optionally with the final status, LODs and metadata.
+
+    ``lods`` maps LOD names (``lod48``, ...) to storage paths and is stored
+    in the ``model_3d_lods`` column; ``metadata`` (bounding box, area,
+    volume, ...) goes to ``model_3d_metadata``.
+    """
+
+    try:
+        fields: Dict[str, Any] = {'model_3d_url': stl_storage_path}
+        if status:
+            fields['status'] = status
+        if lods:
+            fields['model_3d_lods'] = lods
+        if metadata:
+            fields['model_3d_metadata'] = metadata
+        return await update_memory(memory_id, fields)
     except Exception as e:
         logger.error(f"Failed to update memory with STL for {memory_id}: {e}")
         raise
 
 
-def get_figurine_url_from_memory(memory_id: str) -> str:
+@traced("supabase.get_memory_status")
+async def get_memory_status(memory_id: str) -> Optional[Dict[str, Any]]:
+    """Status and STL path of a memory, or None when it does not exist."""
+    supabase: AsyncClient = await get_client()
+    result = await supabase.table('memories').select('id, status, model_3d_url').eq('id', memory_id).execute()
+    return result.data[0] if result.data else None
+
+
+@traced("supabase.record_tencent_job")
+async def record_tencent_job(memory_id: str, job: Dict[str, Any]) -> None:
+    """Save the submitted Tencent job of a memory in ``model_3d_job``."""
+    await update_memory(memory_id, {'model_3d_job': job})
+
+
+@traced("supabase.get_orphaned_generations")
+async def get_orphaned_generations(limit: int = 100) -> List[Dict[str, Any]]:
+    """Memories in processing_3d with a recorded Tencent job, oldest first."""
+    supabase: AsyncClient = await get_client()
+    result = await (
+        supabase
+        .table('memories')
+        .select('id, user_id, figurine_url, model_3d_job')
+        .eq('status', 'processing_3d')
+        .not_.is_('model_3d_job', 'null')
+        .limit(limit)
+        .execute()
+    )
+    return result.data
+
+
+@traced("supabase.claim_tencent_job")
+async def claim_tencent_job(memory_id: str, job: Dict[str, Any], claimed_at: str) -> bool:
+    """Take over a recorded job, unless someone else did since it was read.
+
+    The UPDATE only matches while the memory is still processing and the
+    job's ``claimed_at`` is unchanged, so one instance wins a race.
+    """
+    supabase: AsyncClient = await get_client()
+    result = await (
+        supabase
+        .table('memories')
+        .update({'model_3d_job': job})
+        .eq('id', memory_id)
+        .eq('status', 'processing_3d')
+        .eq('model_3d_job->>claimed_at', claimed_at)
+        .execute()
+    )
+    return bool(result.data)
+
+
+@traced("supabase.renew_tencent_job_claim")
+async def renew_tencent_job_claim(memory_id: str, job: Dict[str, Any], claimed_at: str) -> bool:
+    """Refresh the claim on a job this instance still works on.
+
+    Matches only while ``claimed_at`` is unchanged; False means another
+    instance took the job over.
+    """
+    supabase: AsyncClient = await get_client()
+    result = await (
+        supabase
+        .table('memories')
+        .update({'model_3d_job': job})
+        .eq('id', memory_id)
+        .eq('model_3d_job->>claimed_at', claimed_at)
+        .execute()
+    )
+    return bool(result.data)
+
+
+@traced("supabase.get_figurine_url_from_memory")
+async def get_figurine_url_from_memory(memory_id: str) -> str:
 
     try:
-        supabase: Client = get_client()
+        supabase: AsyncClient = await get_client()
 
-        result = (
+        result = await (
             supabase
             .table('memories')
             .select('id, user_id, figurine_url')
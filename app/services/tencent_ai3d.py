@@ -1,157 +1,207 @@
-import os
-import ssl
+import logging
 import time
-import asyncio
-from typing import Optional
-from urllib.request import urlopen
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
 
-from dotenv import load_dotenv
-from tencentcloud.common import credential
-from tencentcloud.ai3d.v20250513.ai3d_client import Ai3dClient, models
+from ..core import metrics, tracing
+from ..core.config import Config
+from ..core.http import get_http_client
+from ..core.resilience import CircuitOpenError
+from .admission import admission_controller
+from .job_poller import JobFailedError, job_poller
+from .tencent_ai3d_async import (
+    AsyncAi3dClient,
+    TencentApiError,
+    download_file,
+    get_client as get_async_client,
+    is_region_failover_error,
+    is_tencent_outage_error,
+)
+from .region_router import region_router
 
 
-def _create_client(region: str = "ap-guangzhou") -> Ai3dClient:
-    """Create a Tencent AI3D client using env credentials.
+logger = logging.getLogger(__name__)
 
-    Requires env vars: TENCENT_CLOUD_ID, TENCENT_CLOUD_KEY
+RESULT_FORMAT = "STL"
+
+# Called with the job id and region right after a job is submitted
+OnSubmitted = Callable[[str, str], Awaitable[None]]
+# Called with each new job status seen while polling (WAIT, RUN, DONE, FAIL)
+OnStatus = Callable[[str], None]
+
+
+async def ping(region: Optional[str] = None) -> None:
+    """Build the async client for ``region`` and open a connection to the API.
+
+    Any HTTP response will do: it shows the API is reachable, and the TLS
+    connection stays pooled for the next job submission.
     """
-    load_dotenv()
-    secret_id = os.environ.get("TENCENT_SECRET_ID")
-    secret_key = os.environ.get("TENCENT_SECRET_KEY")
-    if not secret_id or not secret_key:
-        raise RuntimeError("Missing TENCENT_CLOUD_ID or TENCENT_CLOUD_KEY environment variables")
-    cred = credential.Credential(secret_id, secret_key)
-    return Ai3dClient(cred, region)
-
-
-def _submit_job(client: Ai3dClient, image_base64: str, enable_pbr: bool = False) -> str:
-    """Submit image->3D job and return JobId."""
-    request = models.SubmitHunyuanTo3DJobRequest()
-    request.ImageBase64 = image_base64
-    request.ResultFormat = "STL"
-    request.EnablePBR = enable_pbr
-    response = client.SubmitHunyuanTo3DJob(request)
-    return response.JobId
-
-
-def _query_job(client: Ai3dClient, job_id: str):
-    """Query job status and result."""
-    request = models.QueryHunyuanTo3DJobRequest()
-    request.JobId = job_id
-    return client.QueryHunyuanTo3DJob(request)
-
-
-def _download_file(url: str, timeout_seconds: int = 60) -> bytes:
-    """Download file bytes from a URL using stdlib to avoid extra deps."""
-    # Create SSL context that doesn't verify certificates
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-    
-    with urlopen(url, timeout=timeout_seconds, context=ssl_context) as resp:
-        return resp.read()
-
-
-def generate_stl_from_image_base64(
-    image_base64: str,
+    client = get_async_client(region)
+    await get_http_client().head(client.url, timeout=Config.TENCENT_REQUEST_TIMEOUT_SECONDS)
+
+
+def _record_submit_failure(region: str, exc: BaseException) -> None:
+    """Count a failed submit against ``region`` unless the failure is the request's own."""
+    if not isinstance(exc, CircuitOpenError) and (is_tencent_outage_error(exc) or is_region_failover_error(exc)):
+        region_router.record_submit(region, failed=True)
+
+
+async def _submit_job_with_failover(
+    regions: List[str],
+    image_base64: Optional[str],
+    image_url: Optional[str],
+    enable_pbr: bool,
+    deadline: float,
+) -> Tuple[AsyncAi3dClient, str]:
+    """Submit to the first of ``regions`` that takes the job; returns its client and the JobId."""
+    for index, region in enumerate(regions):
+        client = get_async_client(region)
+        started = time.perf_counter()
+        try:
+            job_id = await client.submit_job(
+                image_base64,
+                enable_pbr=enable_pbr,
+                result_format=RESULT_FORMAT,
+                image_url=image_url,
+                deadline=deadline,
+            )
+        except Exception as e:
+            _record_submit_failure(region, e)
+            if index + 1 < len(regions) and is_region_failover_error(e):
+                region_router.record_failover(region, regions[index + 1], e)
+                continue
+            raise
+        region_router.record_submit(region, time.perf_counter() - started)
+        return client, job_id
+    raise ValueError("No Tencent region to submit to")
+
+
+async def generate_stl_result_url_async(
     *,
+    image_base64: Optional[str] = None,
+    image_url: Optional[str] = None,
     enable_pbr: bool = False,
-    poll_interval_seconds: int = 5,
     timeout_seconds: int = 300,
-    region: str = "ap-guangzhou",
-) -> bytes:
-    """Submit an image to Tencent AI3D, poll until done, and return STL bytes.
-
-    - image_base64: Base64-encoded image (without data URL prefix)
-    - enable_pbr: Whether to enable PBR materials in generation
-    - poll_interval_seconds: Poll cadence (default 5s)
-    - timeout_seconds: Max time to wait (default 15 minutes)
-    - region: Tencent Cloud region for AI3D service
+    region: Optional[str] = None,
+    on_submitted: Optional[OnSubmitted] = None,
+    on_status: Optional[OnStatus] = None,
+) -> str:
+    """Run a Tencent AI3D job and return the URL of the resulting STL.
+
+    The image is sent either inline (``image_base64``) or by reference
+    (``image_url``, fetched by Tencent). Uses the native asyncio client
+    (TC3-signed requests over a pooled session), so submit never blocks the
+    event loop. Status polling is delegated to the shared adaptive job poller.
+    Without ``region`` the job goes to the region router's best region and
+    fails over to the next ones when a submit creates no job.
+    ``on_submitted`` is awaited with the job id and region before polling,
+    so the job can be recorded for recovery; ``on_status`` sees each new
+    job status.
     """
-    client = _create_client(region)
-    job_id = _submit_job(client, image_base64=image_base64, enable_pbr=enable_pbr)
-
-    deadline = time.monotonic() + timeout_seconds
-    while True:
-        if time.monotonic() > deadline:
-            raise TimeoutError(f"Timed out waiting for job {job_id} to finish")
-
-        query_resp = _query_job(client, job_id)
-        status = query_resp.Status
-
-        if status == "FAIL":
-            error_code = getattr(query_resp, "ErrorCode", None)
-            error_message = getattr(query_resp, "ErrorMessage", None)
-            raise RuntimeError(f"Tencent AI3D job failed ({error_code}): {error_message}")
-
-        if status == "DONE":
-            files = query_resp.ResultFile3Ds or []
-            stl_url: Optional[str] = None
-            for file3d in files:
-                file_type = getattr(file3d, "Type", None)
-                if file_type and str(file_type).upper() == "STL":
-                    stl_url = getattr(file3d, "Url", None)
-                    break
-            if not stl_url:
-                # Fallback: pick the first available URL if STL tag missing
-                for file3d in files:
-                    candidate = getattr(file3d, "Url", None)
-                    if candidate:
-                        stl_url = candidate
-                        break
-            if not stl_url:
-                raise RuntimeError("STL URL not found in job result")
-            return _download_file(stl_url)
-
-        time.sleep(poll_interval_seconds)
-
-
-async def generate_stl_from_image_base64_async(
-    image_base64: str,
+    if not image_base64 and not image_url:
+        raise ValueError("image_base64 or image_url is required")
+    regions = [region] if region else region_router.candidates()
+    # Submit and wait within Tencent's concurrency and QPS limits
+    async with admission_controller.tencent_slot():
+        with metrics.stage("tencent_submit"):
+            client, job_id = await _submit_job_with_failover(
+                regions, image_base64, image_url, enable_pbr, time.monotonic() + timeout_seconds
+            )
+        if on_submitted is not None:
+            await on_submitted(job_id, client.region)
+        return await _wait_for_stl_url(client, job_id, timeout_seconds, on_status=on_status)
+
+
+async def resume_stl_result_url_async(
+    job_id: str,
     *,
-    enable_pbr: bool = False,
-    poll_interval_seconds: int = 5,
+    region: Optional[str] = None,
+    submitted_at: Optional[datetime] = None,
     timeout_seconds: int = 300,
-    region: str = "ap-guangzhou",
-) -> bytes:
+    on_status: Optional[OnStatus] = None,
+) -> str:
+    """Wait for an already submitted job, e.g. one left by a stopped instance.
+
+    ``submitted_at`` lets the poller schedule queries by the job's real age.
+    """
+    client = get_async_client(region)
+    submitted_monotonic = None
+    if submitted_at is not None:
+        age = max(0.0, time.time() - submitted_at.timestamp())
+        submitted_monotonic = time.monotonic() - age
+    async with admission_controller.tencent_slot(paced=False):
+        return await _wait_for_stl_url(client, job_id, timeout_seconds, submitted_monotonic, on_status)
+
+
+async def resume_stl_from_job_async(job_id: str, **kwargs) -> bytes:
+    """``resume_stl_result_url_async`` plus downloading the result into memory."""
+    stl_url = await resume_stl_result_url_async(job_id, **kwargs)
+    with metrics.stage("stl_download"):
+        return await download_file(stl_url)
+
+
+async def _wait_for_stl_url(
+    client: AsyncAi3dClient,
+    job_id: str,
+    timeout_seconds: int,
+    submitted_at: Optional[float] = None,
+    on_status: Optional[OnStatus] = None,
+) -> str:
+    with metrics.stage("tencent_job"):
+        tracing.set_attributes(**{"tencent.job_id": job_id})
+        try:
+            result = await job_poller.wait(client, job_id, timeout_seconds, submitted_at=submitted_at, on_status=on_status)
+        except Exception as e:
+            # Resumed jobs are left out of the region stats; their age includes downtime
+            if submitted_at is None and (isinstance(e, TimeoutError) or is_tencent_outage_error(e)):
+                region_router.record_job(client.region, failed=True)
+            raise
+        if submitted_at is None:
+            region_router.record_job(client.region, result.duration_seconds)
+        tracing.set_attributes(**{"tencent.polls": result.polls})
+    metrics.TENCENT_POLLS.observe(result.polls)
+    files = result.response.get("ResultFile3Ds") or []
+    stl_url = _pick_stl_url([(f.get("Type"), f.get("Url")) for f in files])
+    if not stl_url:
+        raise RuntimeError("STL URL not found in job result")
+    return stl_url
+
+
+async def generate_stl_from_image_async(**kwargs) -> bytes:
     """Async variant of STL generation using Tencent AI3D.
 
-    Offloads blocking SDK calls and download to the default thread pool using
-    asyncio.to_thread, while the polling cadence uses non-blocking sleeps.
+    Takes the arguments of ``generate_stl_result_url_async`` and downloads
+    the result into memory.
+    """
+    stl_url = await generate_stl_result_url_async(**kwargs)
+    with metrics.stage("stl_download"):
+        return await download_file(stl_url)
+
+
+async def generate_stl_from_image_base64_async(image_base64: str, **kwargs) -> bytes:
+    """Base64 form of ``generate_stl_from_image_async``."""
+    return await generate_stl_from_image_async(image_base64=image_base64, **kwargs)
+
+
+def is_image_input_error(exc: BaseException) -> bool:
+    """Whether Tencent rejected the job because it could not use the input image.
+
+    Used to fall back from URL submission to inline base64.
     """
-    # Use synchronous SDK calls, but keep the long wait periods non-blocking
-    client = _create_client(region)
-    job_id = _submit_job(client, image_base64=image_base64, enable_pbr=enable_pbr)
-
-    deadline = time.monotonic() + timeout_seconds
-    while True:
-        if time.monotonic() > deadline:
-            raise TimeoutError(f"Timed out waiting for job {job_id} to finish")
-
-        query_resp = _query_job(client, job_id)
-        status = query_resp.Status
-
-        if status == "FAIL":
-            error_code = getattr(query_resp, "ErrorCode", None)
-            error_message = getattr(query_resp, "ErrorMessage", None)
-            raise RuntimeError(f"Tencent AI3D job failed ({error_code}): {error_message}")
-
-        if status == "DONE":
-            files = query_resp.ResultFile3Ds or []
-            stl_url: Optional[str] = None
-            for file3d in files:
-                file_type = getattr(file3d, "Type", None)
-                if file_type and str(file_type).upper() == "STL":
-                    stl_url = getattr(file3d, "Url", None)
-                    break
-            if not stl_url:
-                for file3d in files:
-                    candidate = getattr(file3d, "Url", None)
-                    if candidate:
-                        stl_url = candidate
-                        break
-            if not stl_url:
-                raise RuntimeError("STL URL not found in job result")
-            return _download_file(stl_url)
-
-        await asyncio.sleep(poll_interval_seconds)
+    code = getattr(exc, "code", None)
+    if not isinstance(exc, (TencentApiError, JobFailedError)) or not code:
+        return False
+    code = code.lower()
+    return any(marker in code for marker in ("image", "url", "download"))
+
+
+def _pick_stl_url(files: List[Tuple[Optional[str], Optional[str]]]) -> Optional[str]:
+    """Pick the STL URL from ``(type, url)`` result pairs, else the first URL."""
+    for file_type, url in files:
+        if file_type and str(file_type).upper() == "STL" and url:
+            return url
+    # Fallback: pick the first available URL if STL tag missing
+    for _, url in files:
+        if url:
+            return url
+    return None
@@ -0,0 +1,241 @@
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from ..core import tracing
+from ..core.config import Config
+from ..core.http import fetch_bytes, get_http_client
+from ..core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    call_with_retry,
+    get_breaker,
+    is_transient_error,
+    is_unsent_error,
+)
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE = "ai3d"
+API_VERSION = "2025-05-13"
+CONTENT_TYPE = "application/json"
+
+
+class TencentApiError(RuntimeError):
+    """Error returned in the ``Response.Error`` block of a Tencent Cloud API call."""
+
+    def __init__(self, code: str, message: str, request_id: Optional[str] = None):
+        super().__init__(f"[TencentCloudSDKException] code:{code} message:{message} requestId:{request_id}")
+        self.code = code
+        self.message = message
+        self.request_id = request_id
+
+
+# Error codes where Tencent itself is failing
+TRANSIENT_CODE_PREFIXES = ("InternalError", "ServiceUnavailable", "ClientNetworkError")
+# Error codes where the request was refused before it was processed
+REJECTED_CODE_PREFIXES = ("RequestLimitExceeded",)
+
+
+def _error_code(exc: BaseException) -> str:
+    return str(getattr(exc, "code", None) or "")
+
+
+def is_tencent_outage_error(exc: BaseException) -> bool:
+    """Network, 5xx and internal errors; these trip the Tencent circuit breaker."""
+    return is_transient_error(exc) or _error_code(exc).startswith(TRANSIENT_CODE_PREFIXES)
+
+
+def is_unprocessed_submit_error(exc: BaseException) -> bool:
+    """Submit failures that provably created no job, so a retry cannot duplicate one."""
+    return is_unsent_error(exc) or _error_code(exc).startswith(REJECTED_CODE_PREFIXES)
+
+
+def is_retryable_query_error(exc: BaseException) -> bool:
+    return is_tencent_outage_error(exc) or _error_code(exc).startswith(REJECTED_CODE_PREFIXES)
+
+
+def is_region_failover_error(exc: BaseException) -> bool:
+    """Submit failures worth retrying in another region.
+
+    Only when no job was created: the region refused the request, was not
+    reached, answered with an internal error, or its breaker is open.
+    """
+    if isinstance(exc, CircuitOpenError) or is_unprocessed_submit_error(exc):
+        return True
+    return isinstance(exc, TencentApiError) and _error_code(exc).startswith(TRANSIENT_CODE_PREFIXES)
+
+
+# Submitting is not idempotent; querying is
+SUBMIT_RETRY = RetryPolicy(retry_on=is_unprocessed_submit_error)
+QUERY_RETRY = RetryPolicy(retry_on=is_retryable_query_error)
+
+tencent_breaker = get_breaker("tencent", is_tencent_outage_error)
+
+
+def region_breaker(region: Optional[str] = None) -> CircuitBreaker:
+    """Breaker of ``region``; TENCENT_REGION keeps the plain "tencent" breaker."""
+    region = region or Config.TENCENT_REGION
+    if region == Config.TENCENT_REGION:
+        return tencent_breaker
+    return get_breaker(f"tencent.{region}", is_tencent_outage_error)
+
+
+def _hmac_sha256(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def sign_tc3(
+    secret_id: str,
+    secret_key: str,
+    host: str,
+    payload: bytes,
+    timestamp: int,
+    service: str = SERVICE,
+) -> str:
+    """Return the TC3-HMAC-SHA256 ``Authorization`` header for a JSON POST to ``/``."""
+    date = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+    canonical_request = "\n".join([
+        "POST",
+        "/",
+        "",
+        f"content-type:{CONTENT_TYPE}\nhost:{host}\n",
+        "content-type;host",
+        hashlib.sha256(payload).hexdigest(),
+    ])
+    credential_scope = f"{date}/{service}/tc3_request"
+    string_to_sign = "\n".join([
+        "TC3-HMAC-SHA256",
+        str(timestamp),
+        credential_scope,
+        hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+    ])
+    secret_date = _hmac_sha256(("TC3" + secret_key).encode("utf-8"), date)
+    secret_service = _hmac_sha256(secret_date, service)
+    secret_signing = _hmac_sha256(secret_service, "tc3_request")
+    signature = hmac.new(secret_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    return (
+        f"TC3-HMAC-SHA256 Credential={secret_id}/{credential_scope}, "
+        f"SignedHeaders=content-type;host, Signature={signature}"
+    )
+
+
+class AsyncAi3dClient:
+    """Native asyncio client for the Hunyuan-to-3D submit/query APIs.
+
+    Requests are signed with TC3-HMAC-SHA256 and sent over the shared HTTP
+    client, so many jobs can be driven concurrently from one event loop.
+    """
+
+    def __init__(
+        self,
+        secret_id: str,
+        secret_key: str,
+        region: str = "ap-guangzhou",
+        endpoint: Optional[str] = None,
+    ):
+        self._secret_id = secret_id
+        self._secret_key = secret_key
+        self.region = region
+        self.breaker = region_breaker(region)
+        self._url = endpoint or Config.TENCENT_AI3D_ENDPOINT
+        if "://" not in self._url:
+            self._url = f"https://{self._url}"
+        self._host = urlparse(self._url).netloc
+
+    @classmethod
+    def from_env(cls, region: Optional[str] = None) -> "AsyncAi3dClient":
+        if not Config.TENCENT_SECRET_ID or not Config.TENCENT_SECRET_KEY:
+            raise RuntimeError("Missing TENCENT_SECRET_ID or TENCENT_SECRET_KEY environment variables")
+        return cls(Config.TENCENT_SECRET_ID, Config.TENCENT_SECRET_KEY, region or Config.TENCENT_REGION)
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    async def call(self, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Invoke an API action and return the ``Response`` object."""
+        payload = json.dumps(params).encode("utf-8")
+        timestamp = int(time.time())
+        headers = {
+            "Authorization": sign_tc3(self._secret_id, self._secret_key, self._host, payload, timestamp),
+            "Content-Type": CONTENT_TYPE,
+            "Host": self._host,
+            "X-TC-Action": action,
+            "X-TC-Timestamp": str(timestamp),
+            "X-TC-Version": API_VERSION,
+            "X-TC-Region": self.region,
+        }
+        with tracing.span(f"tencent.{action}", tracing.SPAN_KIND_CLIENT, **{"cloud.region": self.region}):
+            resp = await get_http_client().post(
+                self._url, content=payload, headers=headers, timeout=Config.TENCENT_REQUEST_TIMEOUT_SECONDS
+            )
+            resp.raise_for_status()
+            body = resp.json().get("Response", {})
+            tracing.set_attributes(**{"tencent.request_id": body.get("RequestId")})
+            error = body.get("Error")
+            if error:
+                raise TencentApiError(error.get("Code", ""), error.get("Message", ""), body.get("RequestId"))
+            return body
+
+    async def submit_job(
+        self,
+        image_base64: Optional[str] = None,
+        enable_pbr: bool = False,
+        result_format: str = "STL",
+        image_url: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """Submit image->3D job from base64 data or an image URL and return JobId.
+
+        Retried only when no job can have been created; ``deadline``
+        (monotonic) bounds the retries.
+        """
+        params: Dict[str, Any] = {"ResultFormat": result_format, "EnablePBR": enable_pbr}
+        if image_url:
+            params["ImageUrl"] = image_url
+        else:
+            params["ImageBase64"] = image_base64
+        body = await call_with_retry(
+            "Tencent SubmitHunyuanTo3DJob",
+            lambda: self.call("SubmitHunyuanTo3DJob", params),
+            SUBMIT_RETRY,
+            self.breaker,
+            deadline,
+        )
+        return body["JobId"]
+
+    async def query_job(self, job_id: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Query job status and result, retrying transient failures."""
+        return await call_with_retry(
+            "Tencent QueryHunyuanTo3DJob",
+            lambda: self.call("QueryHunyuanTo3DJob", {"JobId": job_id}),
+            QUERY_RETRY,
+            self.breaker,
+            deadline,
+        )
+
+
+# Clients are stateless apart from credentials; one per region is shared
+_clients: Dict[str, AsyncAi3dClient] = {}
+
+
+def get_client(region: Optional[str] = None) -> AsyncAi3dClient:
+    """Shared client for ``region`` (default ``TENCENT_REGION``), built on first use."""
+    region = region or Config.TENCENT_REGION
+    client = _clients.get(region)
+    if client is None:
+        client = _clients[region] = AsyncAi3dClient.from_env(region)
+    return client
+
+
+async def download_file(url: str, timeout_seconds: int = 60) -> bytes:
+    """Download a result file over the shared HTTP client, within the STL size limit."""
+    return await fetch_bytes(url, max_bytes=Config.MAX_STL_DOWNLOAD_BYTES, timeout_seconds=timeout_seconds)
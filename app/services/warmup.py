@@ -0,0 +1,31 @@
+import asyncio
+import logging
+import time
+
+from ..core.config import Config
+from . import tencent_ai3d
+from .mesh_processing import load_mesh_modules, postprocessing_enabled
+from .supabase_service import ping as ping_supabase
+
+
+logger = logging.getLogger(__name__)
+
+
+async def prewarm() -> None:
+    """Pay first-request costs in the background right after startup.
+
+    Opens the pooled Supabase and Tencent API connections and, when STL
+    post-processing is on, imports NumPy and the mesh modules. Failures
+    are only logged; requests build whatever is still missing.
+    """
+    started = time.perf_counter()
+    steps = {"supabase": ping_supabase()}
+    if Config.ENVIRONMENT != "development":
+        steps["tencent"] = tencent_ai3d.ping()
+    if postprocessing_enabled():
+        steps["mesh_modules"] = asyncio.to_thread(load_mesh_modules)
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Startup prewarm of {name} failed: {result}")
+    logger.info(f"Startup prewarm finished in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,4 @@
+"""Offline benchmarks for the generation service.
+
+Run from the repository root, e.g. ``python -m benchmarks.event_loop_lag``.
+"""
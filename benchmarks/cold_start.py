@@ -0,0 +1,108 @@
+"""Cold start: import cost of the app and time to the first healthy /health.
+
+First audits imports with ``python -X importtime -c "import app.app"`` and
+lists the heaviest top-level packages, then starts the service several
+times under uvicorn against the local fake Supabase and Tencent AI3D
+servers and measures the time
+from spawning the process to the first healthy ``/health`` response.
+
+    python -m benchmarks.cold_start --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.fakes import BackgroundServer, create_fake_ai3d_app, create_fake_supabase_app, seed_memories
+from benchmarks.load import ServiceProcess
+
+
+SERVICE_PORT, AI3D_PORT, SUPABASE_PORT = 18750, 18751, 18752
+SECRET_ID, SECRET_KEY = "bench-id", "bench-key"
+
+
+def import_audit(module: str = "app.app") -> Tuple[float, List[Tuple[str, float]]]:
+    """Wall time of importing ``module`` and cumulative ms per top-level package."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    packages: Dict[str, Tuple[float, int]] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.rstrip()
+        stripped = name.strip()
+        if not cumulative.strip().isdigit() or "." in stripped:
+            continue
+        # Outermost import of each top-level package (least indented) wins
+        depth = len(name) - len(name.lstrip())
+        current = packages.get(stripped)
+        if current is None or depth <= current[1]:
+            packages[stripped] = (int(cumulative) / 1000, depth)
+    ranked = sorted(((name, ms) for name, (ms, _) in packages.items()), key=lambda item: -item[1])
+    return wall_ms, ranked
+
+
+def _interpreter_ms() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages listed in the import audit")
+    parser.add_argument("--supabase-latency", type=float, default=0.01, help="fake Supabase latency (s)")
+    args = parser.parse_args()
+
+    interpreter_ms = _interpreter_ms()
+    import_ms, packages = import_audit()
+    print(f"import app.app: {import_ms - interpreter_ms:.0f} ms (interpreter start {interpreter_ms:.0f} ms)")
+    print(f"{'package':<28}{'cumulative ms':>14}")
+    for name, ms in packages[:args.top]:
+        print(f"{name:<28}{ms:>14.1f}")
+
+    ai3d = create_fake_ai3d_app(secret_id=SECRET_ID, secret_key=SECRET_KEY)
+    supabase = create_fake_supabase_app(latency_seconds=args.supabase_latency)
+    seed_memories(supabase, 1)
+    startups = []
+    with tempfile.TemporaryDirectory() as tmp, BackgroundServer(ai3d, AI3D_PORT), \
+            BackgroundServer(supabase, SUPABASE_PORT) as supabase_server:
+        env = {
+            **os.environ,
+            "ENVIRONMENT": "production",
+            "SUPABASE_URL": supabase_server.url,
+            "SUPABASE_ANON_KEY": "bench-anon-key",
+            "SUPABASE_SERVICE_KEY": "bench-service-key",
+            "TENCENT_AI3D_ENDPOINT": f"http://127.0.0.1:{AI3D_PORT}",
+            "TENCENT_SECRET_ID": SECRET_ID,
+            "TENCENT_SECRET_KEY": SECRET_KEY,
+            "STL_CACHE_PATH": os.path.join(tmp, "stl_cache.sqlite3"),
+        }
+        for _ in range(args.runs):
+            service = ServiceProcess(
+                SERVICE_PORT,
+                env,
+                ready_path="/health",
+                is_ready=lambda resp: resp.status_code == 200 and resp.json().get("status") == "healthy",
+            )
+            with service:
+                startups.append(service.startup_seconds * 1000)
+
+    print(
+        f"first healthy /health over {args.runs} starts: min {min(startups):.0f} ms, "
+        f"median {statistics.median(startups):.0f} ms, max {max(startups):.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Event-loop lag while driving concurrent AI3D jobs, blocking SDK vs native async.
+
+The "blocking" variant reproduces the previous async path: Tencent SDK
+calls and the blocking download run directly on the event loop. The "native"
+variant uses ``generate_stl_from_image_base64_async``. Both talk to a local
+fake AI3D server, so no credits are spent.
+
+    python -m benchmarks.event_loop_lag --jobs 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+PORT = 18731
+SECRET_ID, SECRET_KEY = "bench-id", "bench-key"
+os.environ.setdefault("TENCENT_AI3D_ENDPOINT", f"http://127.0.0.1:{PORT}")
+os.environ.setdefault("TENCENT_SECRET_ID", SECRET_ID)
+os.environ.setdefault("TENCENT_SECRET_KEY", SECRET_KEY)
+# Match the shared poller to the fake job duration below
+os.environ.setdefault("TENCENT_EXPECTED_JOB_SECONDS", "2")
+os.environ.setdefault("TENCENT_POLL_MIN_INTERVAL_SECONDS", "0.5")
+
+from tencentcloud.common import credential  # noqa: E402
+from tencentcloud.common.profile.client_profile import ClientProfile  # noqa: E402
+from tencentcloud.common.profile.http_profile import HttpProfile  # noqa: E402
+from tencentcloud.ai3d.v20250513 import models  # noqa: E402
+from tencentcloud.ai3d.v20250513.ai3d_client import Ai3dClient  # noqa: E402
+import httpx  # noqa: E402
+
+from app.core.http import close_http_client  # noqa: E402
+from app.services import tencent_ai3d  # noqa: E402
+from benchmarks.fakes import BackgroundServer, create_fake_ai3d_app  # noqa: E402
+
+
+TICK_SECONDS = 0.005
+
+
+async def _blocking_generate(poll_interval_seconds: float) -> bytes:
+    """The pre-native async path: SDK calls and download block the loop."""
+    profile = ClientProfile(httpProfile=HttpProfile(protocol="http", endpoint=f"127.0.0.1:{PORT}"))
+    client = Ai3dClient(credential.Credential(SECRET_ID, SECRET_KEY), "ap-guangzhou", profile)
+    submit = models.SubmitHunyuanTo3DJobRequest()
+    submit.ImageBase64, submit.ResultFormat, submit.EnablePBR = "aW1n", "STL", False
+    job_id = client.SubmitHunyuanTo3DJob(submit).JobId
+    query = models.QueryHunyuanTo3DJobRequest()
+    query.JobId = job_id
+    while True:
+        resp = client.QueryHunyuanTo3DJob(query)
+        if resp.Status == "DONE":
+            return httpx.get(resp.ResultFile3Ds[0].Url).content
+        await asyncio.sleep(poll_interval_seconds)
+
+
+async def _native_generate(_poll_interval_seconds: float) -> bytes:
+    return await tencent_ai3d.generate_stl_from_image_base64_async("aW1n", timeout_seconds=600)
+
+
+async def _measure(generate, jobs: int, poll_interval_seconds: float) -> dict:
+    lags = []
+    stop = asyncio.Event()
+
+    async def monitor():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - start - TICK_SECONDS)
+
+    monitor_task = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(generate(poll_interval_seconds) for _ in range(jobs)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor_task
+
+    lags.sort()
+    return {
+        "wall_s": elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] * 1000,
+        "lag_max_ms": lags[-1] * 1000,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="fake API latency per call (s)")
+    parser.add_argument("--job-duration", type=float, default=2.0, help="fake job duration (s)")
+    parser.add_argument("--stl-mb", type=float, default=5.0, help="result STL size (MB)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="blocking variant poll interval (s)")
+    args = parser.parse_args()
+
+    app = create_fake_ai3d_app(
+        api_latency_seconds=args.api_latency,
+        job_duration_seconds=args.job_duration,
+        stl_size_bytes=int(args.stl_mb * 1024 * 1024),
+        secret_id=SECRET_ID,
+        secret_key=SECRET_KEY,
+    )
+    with BackgroundServer(app, PORT):
+        print(f"{args.jobs} concurrent jobs, {args.api_latency * 1000:.0f} ms API latency, {args.stl_mb} MB STL")
+        print(f"{'variant':<10}{'wall s':>10}{'lag p50 ms':>14}{'lag p99 ms':>14}{'lag max ms':>14}")
+        for name, generate in (("blocking", _blocking_generate), ("native", _native_generate)):
+            result = await _measure(generate, args.jobs, args.poll_interval)
+            print(
+                f"{name:<10}{result['wall_s']:>10.2f}{result['lag_p50_ms']:>14.2f}"
+                f"{result['lag_p99_ms']:>14.2f}{result['lag_max_ms']:>14.2f}"
+            )
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,355 @@
+"""Local stand-ins for external services used by the benchmarks.
+
+Latencies are ``Latency`` distributions (a plain float is a constant) and
+each fake can fail a configurable fraction of calls, so load tests see
+the tail latencies and errors the real services produce.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from app.services.tencent_ai3d_async import sign_tc3
+
+
+@dataclass(frozen=True)
+class Latency:
+    """Log-normal delay with the given median; ``sigma`` 0 makes it constant."""
+
+    median: float
+    sigma: float = 0.0
+
+    def sample(self) -> float:
+        if self.sigma <= 0 or self.median <= 0:
+            return max(0.0, self.median)
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+
+LatencyLike = Union[float, Latency]
+
+
+def _latency(value: LatencyLike) -> Latency:
+    return value if isinstance(value, Latency) else Latency(float(value))
+
+
+def create_fake_ai3d_app(
+    *,
+    api_latency_seconds: LatencyLike = 0.05,
+    job_duration_seconds: LatencyLike = 2.0,
+    stl_size_bytes: int = 1024 * 1024,
+    secret_id: Optional[str] = None,
+    secret_key: Optional[str] = None,
+    download_latency_seconds: LatencyLike = 0.0,
+    failure_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    job_failure_rate: float = 0.0,
+    download_failure_rate: float = 0.0,
+    region_job_duration_seconds: Optional[Dict[str, LatencyLike]] = None,
+    down_regions: Sequence[str] = (),
+) -> FastAPI:
+    """Fake Hunyuan-to-3D API plus a COS-style result download endpoint.
+
+    When ``secret_key`` is given, TC3 signatures are verified the same way
+    the real API does, which keeps the native client's signer honest.
+    ``failure_rate`` of API calls answer InternalError, ``throttle_rate``
+    RequestLimitExceeded; ``job_failure_rate`` of jobs end in FAIL and
+    ``download_failure_rate`` of downloads get a 503. Submitted jobs are
+    kept in ``app.state.jobs``.
+
+    Regions come from the ``X-TC-Region`` header: jobs can only be queried
+    in their own region, ``region_job_duration_seconds`` overrides the job
+    duration per region and ``down_regions`` answer every call with
+    InternalError.
+    """
+    app = FastAPI()
+    # Job id -> (submitted at, duration, fails, region)
+    jobs: Dict[str, tuple] = {}
+    app.state.jobs = jobs
+    stl_body = b"\0" * stl_size_bytes
+    api_latency = _latency(api_latency_seconds)
+    job_duration = _latency(job_duration_seconds)
+    region_job_durations = {
+        region: _latency(duration) for region, duration in (region_job_duration_seconds or {}).items()
+    }
+    download_latency = _latency(download_latency_seconds)
+
+    def _error(code: str, message: str) -> Dict:
+        return {"Response": {"Error": {"Code": code, "Message": message}, "RequestId": uuid.uuid4().hex}}
+
+    @app.post("/")
+    async def api(request: Request):
+        await asyncio.sleep(api_latency.sample())
+        payload = await request.body()
+        if secret_key is not None:
+            timestamp = int(request.headers.get("X-TC-Timestamp", "0"))
+            expected = sign_tc3(secret_id or "", secret_key, request.headers["Host"], payload, timestamp)
+            if request.headers.get("Authorization") != expected:
+                return _error("AuthFailure.SignatureFailure", "The provided credentials could not be validated.")
+
+        region = request.headers.get("X-TC-Region", "")
+        if region in down_regions:
+            return _error("InternalError", f"Simulated outage of {region}.")
+        if random.random() < throttle_rate:
+            return _error("RequestLimitExceeded", "Your request frequency has exceeded the limit.")
+        if random.random() < failure_rate:
+            return _error("InternalError", "Simulated internal error.")
+
+        params = json.loads(payload or b"{}")
+        action = request.headers.get("X-TC-Action")
+        if action == "SubmitHunyuanTo3DJob":
+            job_id = uuid.uuid4().hex
+            duration = region_job_durations.get(region, job_duration).sample()
+            jobs[job_id] = (time.monotonic(), duration, random.random() < job_failure_rate, region)
+            return {"Response": {"JobId": job_id, "RequestId": uuid.uuid4().hex}}
+        if action == "QueryHunyuanTo3DJob":
+            job_id = params.get("JobId")
+            if job_id not in jobs or jobs[job_id][3] != region:
+                return _error("InvalidParameter", f"Unknown job {job_id}")
+            submitted_at, duration, fails, _ = jobs[job_id]
+            elapsed = time.monotonic() - submitted_at
+            error_code = error_message = ""
+            if elapsed < duration * 0.2:
+                status = "WAIT"
+            elif elapsed < duration:
+                status = "RUN"
+            elif fails:
+                status, error_code, error_message = "FAIL", "FailedOperation.InnerError", "Simulated job failure"
+            else:
+                status = "DONE"
+            files = []
+            if status == "DONE":
+                files = [{"Type": "STL", "Url": f"{request.base_url}files/{job_id}.stl"}]
+            return {"Response": {
+                "Status": status,
+                "ErrorCode": error_code,
+                "ErrorMessage": error_message,
+                "ResultFile3Ds": files,
+                "RequestId": uuid.uuid4().hex,
+            }}
+        return _error("InvalidAction", f"Unsupported action {action}")
+
+    @app.get("/files/{name}")
+    async def download(name: str):
+        await asyncio.sleep(download_latency.sample())
+        if random.random() < download_failure_rate:
+            return Response("Simulated COS outage", status_code=503)
+        return Response(stl_body, media_type="application/octet-stream")
+
+    return app
+
+
+def _column_value(row: Dict[str, Any], column: str) -> Any:
+    """Row value of ``column``, or of ``column->>key`` inside a JSON column."""
+    column, _, key = column.partition("->>")
+    value = row.get(column)
+    if key:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def _matches_filter(value: Any, expression: str) -> bool:
+    operator, _, operand = expression.partition(".")
+    if operator == "not":
+        return not _matches_filter(value, operand)
+    if operator == "eq":
+        return str(value) == operand
+    if operator == "in":
+        return str(value) in operand.strip("()").split(",")
+    if operator == "is":
+        return value is None
+    return True
+
+
+def _matches(row: Dict[str, Any], filters: Dict[str, str]) -> bool:
+    """PostgREST ``eq``/``in``/``is`` (optionally ``not.``) filters on one row."""
+    return all(_matches_filter(_column_value(row, column), expression) for column, expression in filters.items())
+
+
+def create_fake_supabase_app(
+    *,
+    latency_seconds: LatencyLike = 0.01,
+    failure_rate: float = 0.0,
+    storage_latency_seconds: Optional[LatencyLike] = None,
+) -> FastAPI:
+    """Fake Supabase PostgREST (any table) and Storage (objects in memory).
+
+    Covers the calls the service makes: row SELECT/UPDATE with ``eq``/``in``
+    /``is`` filters (also on ``json->>key``), bucket lookup, signing (single
+    and bulk), signed and public downloads, object info, upload and copy.
+    ``failure_rate`` of requests get a 503. Rows live in ``app.state.tables``
+    and objects in ``app.state.objects`` (``bucket/path`` -> bytes); see
+    ``seed_memories``.
+    """
+    app = FastAPI()
+    tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    objects: Dict[str, bytes] = {}
+    app.state.tables = tables
+    app.state.objects = objects
+    db_latency = _latency(latency_seconds)
+    storage_latency = _latency(latency_seconds if storage_latency_seconds is None else storage_latency_seconds)
+
+    async def _delay(latency: Latency) -> Optional[Response]:
+        await asyncio.sleep(latency.sample())
+        if random.random() < failure_rate:
+            return JSONResponse({"message": "Simulated outage"}, status_code=503)
+        return None
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "PATCH"])
+    async def rest(table: str, request: Request):
+        failure = await _delay(db_latency)
+        if failure is not None:
+            return failure
+        filters = {
+            column: value for column, value in request.query_params.items()
+            if column not in ("select", "limit", "order", "offset")
+        }
+        rows = [row for row in tables.setdefault(table, {}).values() if _matches(row, filters)]
+        if request.method == "PATCH":
+            fields = await request.json()
+            for row in rows:
+                row.update(fields)
+        limit = request.query_params.get("limit")
+        return rows[:int(limit)] if limit else rows
+
+    @app.get("/storage/v1/bucket/{bucket}")
+    async def bucket_info(bucket: str):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "id": bucket, "name": bucket, "owner": "", "public": False, "created_at": now,
+            "updated_at": now, "file_size_limit": None, "allowed_mime_types": None,
+        }
+
+    @app.post("/storage/v1/object/sign/{bucket}/{path:path}")
+    async def sign(bucket: str, path: str):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        if f"{bucket}/{path}" not in objects:
+            return JSONResponse({"statusCode": "404", "error": "not_found", "message": "Object not found"}, 400)
+        return {"signedURL": f"/object/sign/{bucket}/{path}?token={uuid.uuid4().hex}"}
+
+    @app.post("/storage/v1/object/sign/{bucket}")
+    async def sign_many(bucket: str, request: Request):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        body = await request.json()
+        return [
+            {"path": path, "signedURL": f"/object/sign/{bucket}/{path}?token={uuid.uuid4().hex}", "error": None}
+            if f"{bucket}/{path}" in objects
+            else {"path": path, "signedURL": None, "error": "Either the object does not exist or you do not have access to it"}
+            for path in body.get("paths", [])
+        ]
+
+    @app.get("/storage/v1/object/info/{bucket}/{path:path}")
+    async def info(bucket: str, path: str):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        data = objects.get(f"{bucket}/{path}")
+        if data is None:
+            return JSONResponse({"message": "Object not found"}, status_code=404)
+        return {"name": path, "etag": f'"{hashlib.md5(data).hexdigest()}"', "size": len(data)}
+
+    @app.get("/storage/v1/object/{access}/{bucket}/{path:path}")
+    async def download(access: str, bucket: str, path: str):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        data = objects.get(f"{bucket}/{path}")
+        if data is None:
+            return JSONResponse({"message": "Object not found"}, status_code=404)
+        return Response(data, media_type="application/octet-stream")
+
+    @app.post("/storage/v1/object/copy")
+    async def copy(request: Request):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        body = await request.json()
+        bucket = body["bucketId"]
+        source = objects.get(f"{bucket}/{body['sourceKey']}")
+        if source is None:
+            return JSONResponse({"message": "Object not found"}, status_code=404)
+        objects[f"{bucket}/{body['destinationKey']}"] = source
+        return {"Key": f"{bucket}/{body['destinationKey']}"}
+
+    @app.api_route("/storage/v1/object/{bucket}/{path:path}", methods=["POST", "PUT"])
+    async def upload(bucket: str, path: str, request: Request):
+        failure = await _delay(storage_latency)
+        if failure is not None:
+            return failure
+        key = f"{bucket}/{path}"
+        if request.method == "POST" and key in objects and request.headers.get("x-upsert") != "true":
+            return JSONResponse({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"}, 400)
+        objects[key] = await request.body()
+        return {"Key": key, "Id": uuid.uuid4().hex}
+
+    return app
+
+
+def seed_memories(
+    app: FastAPI,
+    count: int,
+    *,
+    bucket: str = "memory-photos",
+    user_id: str = "bench-user",
+    image_bytes: bytes = b"\x89PNG\r\n\x1a\n" + b"\0" * 64 * 1024,
+) -> List[str]:
+    """Add ``count`` memories with figurine images to a fake Supabase app.
+
+    Each image gets a unique suffix, so the content-addressed STL cache
+    sees every memory as new. Returns the memory ids.
+    """
+    memories = app.state.tables.setdefault("memories", {})
+    memory_ids = []
+    for index in range(count):
+        memory_id = f"bench-{index}"
+        path = f"{user_id}/figurines/{memory_id}.png"
+        app.state.objects[f"{bucket}/{path}"] = image_bytes + memory_id.encode()
+        memories[memory_id] = {
+            "id": memory_id,
+            "user_id": user_id,
+            "figurine_url": path,
+            "status": "new",
+            "model_3d_url": None,
+        }
+        memory_ids.append(memory_id)
+    return memory_ids
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn on a background thread."""
+
+    def __init__(self, app: FastAPI, port: int):
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "BackgroundServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
@@ -0,0 +1,306 @@
+"""Throughput, per-stage latency and memory of POST /generate-3d under load.
+
+The service runs under uvicorn in a child process, pointed at local fake
+Tencent AI3D/COS and Supabase servers (``benchmarks.fakes``) with
+log-normal latencies and optional failure rates, so no credits are spent.
+Every request generates a different memory. Stage times come from each
+response's Server-Timing header; peak RSS is the service process's
+high-water mark.
+
+    python -m benchmarks.load --requests 200 --concurrency 20
+    python -m benchmarks.load --json before.json   # keep for comparison
+
+Service settings are read from the environment as usual, e.g.
+``TENCENT_MAX_IN_FLIGHT_JOBS=50 TENCENT_SUBMIT_RATE_PER_SECOND=0``.
+Region routing is exercised with per-region job durations and outages:
+
+    python -m benchmarks.load --region-durations ap-guangzhou=4,ap-shanghai=1 --down-regions ap-beijing
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import BackgroundServer, Latency, create_fake_ai3d_app, create_fake_supabase_app, seed_memories
+
+
+SERVICE_PORT, AI3D_PORT, SUPABASE_PORT = 18740, 18741, 18742
+SECRET_ID, SECRET_KEY = "bench-id", "bench-key"
+USER_ID = "bench-user"
+
+
+class ServiceProcess:
+    """The API under uvicorn in a child process, started with ``env``.
+
+    Entering waits until ``ready_path`` answers a response ``is_ready``
+    accepts (default: status 200); ``startup_seconds`` is the time from
+    spawning the process until then.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        env: Dict[str, str],
+        startup_timeout: float = 60.0,
+        ready_path: str = "/",
+        is_ready: Optional[Callable[[httpx.Response], bool]] = None,
+    ):
+        self.port = port
+        self._env = env
+        self._startup_timeout = startup_timeout
+        self._ready_path = ready_path
+        self._is_ready = is_ready or (lambda resp: resp.status_code == 200)
+        self._process: Optional[subprocess.Popen] = None
+        self.startup_seconds: Optional[float] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "ServiceProcess":
+        started = time.perf_counter()
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.app:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            env=self._env,
+        )
+        self.startup_seconds = self._wait_until_ready(started)
+        return self
+
+    def _wait_until_ready(self, started: float) -> float:
+        assert self._process is not None
+        deadline = started + self._startup_timeout
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() < deadline:
+                if self._process.poll() is not None:
+                    raise RuntimeError(f"Service exited during startup with code {self._process.returncode}")
+                try:
+                    if self._is_ready(client.get(f"{self.url}{self._ready_path}")):
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"Service was not ready at {self._ready_path} within {self._startup_timeout:.0f}s")
+
+    def memory_kb(self, field: str = "VmHWM") -> Optional[int]:
+        """``VmHWM`` (peak) or ``VmRSS`` of the process, from /proc (Linux only)."""
+        if self._process is None:
+            return None
+        try:
+            with open(f"/proc/{self._process.pid}/status") as f:
+                for line in f:
+                    if line.startswith(f"{field}:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return None
+
+    def __exit__(self, *exc) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """``name;dur=12.3;desc=...`` entries -> {name: milliseconds}."""
+    timings = {}
+    for entry in header.split(","):
+        name, *params = entry.strip().split(";")
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                timings[name] = float(value)
+    return timings
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+async def _drive(base_url: str, memory_ids: List[str], concurrency: int, timeout: float) -> List[dict]:
+    pending = list(reversed(memory_ids))
+    results: List[dict] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while pending:
+            memory_id = pending.pop()
+            started = time.perf_counter()
+            try:
+                resp = await client.post("/generate-3d", data={"memory_id": memory_id, "user_id": USER_ID})
+                body = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+                ok = resp.status_code == 200 and body.get("status") == "success"
+                outcome = "ok" if ok else (str(resp.status_code) if resp.status_code != 200 else "error")
+                timings = parse_server_timing(resp.headers.get("server-timing", ""))
+            except httpx.HTTPError as e:
+                outcome, timings = type(e).__name__, {}
+            results.append({
+                "outcome": outcome,
+                "seconds": time.perf_counter() - started,
+                "timings": timings,
+            })
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return results
+
+
+def _summarize(results: List[dict], wall_seconds: float) -> dict:
+    outcomes: Dict[str, int] = {}
+    for result in results:
+        outcomes[result["outcome"]] = outcomes.get(result["outcome"], 0) + 1
+
+    # Stages in first-seen order, from successful requests only
+    samples: Dict[str, List[float]] = {"request (client)": []}
+    for result in results:
+        if result["outcome"] != "ok":
+            continue
+        samples["request (client)"].append(result["seconds"] * 1000)
+        for name, duration_ms in result["timings"].items():
+            samples.setdefault(name, []).append(duration_ms)
+
+    stages = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        values.sort()
+        stages[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+        }
+    return {
+        "requests": len(results),
+        "wall_seconds": wall_seconds,
+        "requests_per_second": len(results) / wall_seconds if wall_seconds else 0.0,
+        "outcomes": outcomes,
+        "stages": stages,
+    }
+
+
+def _print_report(summary: dict, concurrency: int) -> None:
+    outcomes = ", ".join(f"{name}: {count}" for name, count in sorted(summary["outcomes"].items()))
+    print(
+        f"{summary['requests']} requests, concurrency {concurrency}: "
+        f"{summary['requests_per_second']:.2f} req/s over {summary['wall_seconds']:.1f}s ({outcomes})"
+    )
+    print(f"{'stage':<52}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}")
+    for name, stats in summary["stages"].items():
+        print(
+            f"{name:<52}{stats['count']:>7}{stats['p50_ms']:>11.1f}"
+            f"{stats['p95_ms']:>11.1f}{stats['p99_ms']:>11.1f}"
+        )
+    if summary.get("jobs_per_region"):
+        print("Tencent jobs per region: " + ", ".join(
+            f"{region}: {count}" for region, count in sorted(summary["jobs_per_region"].items())
+        ))
+    peak, idle = summary.get("peak_rss_mb"), summary.get("idle_rss_mb")
+    if peak is not None:
+        print(f"peak RSS {peak:.1f} MB (idle after startup {idle:.1f} MB)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--job-duration", type=float, default=2.0, help="median fake Tencent job duration (s)")
+    parser.add_argument("--job-sigma", type=float, default=0.3, help="log-normal spread of job durations")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="median Tencent API latency (s)")
+    parser.add_argument("--supabase-latency", type=float, default=0.01, help="median Supabase latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of API latencies")
+    parser.add_argument("--stl-mb", type=float, default=1.0, help="result STL size (MB)")
+    parser.add_argument("--image-kb", type=float, default=256, help="figurine image size (KB)")
+    parser.add_argument("--tencent-failure-rate", type=float, default=0.0, help="fraction of AI3D calls failing")
+    parser.add_argument("--job-failure-rate", type=float, default=0.0, help="fraction of jobs ending in FAIL")
+    parser.add_argument("--supabase-failure-rate", type=float, default=0.0, help="fraction of Supabase calls failing")
+    parser.add_argument(
+        "--region-durations", default="", help="median job duration per region, e.g. ap-guangzhou=4,ap-shanghai=1"
+    )
+    parser.add_argument("--down-regions", default="", help="comma-separated regions answering InternalError")
+    parser.add_argument("--timeout", type=float, default=600.0, help="client timeout per request (s)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    region_durations = {
+        region.strip(): float(duration)
+        for region, duration in (item.split("=") for item in args.region_durations.split(",") if item.strip())
+    }
+    down_regions = [region.strip() for region in args.down_regions.split(",") if region.strip()]
+
+    ai3d = create_fake_ai3d_app(
+        api_latency_seconds=Latency(args.api_latency, args.latency_sigma),
+        job_duration_seconds=Latency(args.job_duration, args.job_sigma),
+        stl_size_bytes=int(args.stl_mb * 1024 * 1024),
+        secret_id=SECRET_ID,
+        secret_key=SECRET_KEY,
+        download_latency_seconds=Latency(args.api_latency, args.latency_sigma),
+        failure_rate=args.tencent_failure_rate,
+        job_failure_rate=args.job_failure_rate,
+        region_job_duration_seconds={
+            region: Latency(duration, args.job_sigma) for region, duration in region_durations.items()
+        },
+        down_regions=down_regions,
+    )
+    supabase = create_fake_supabase_app(
+        latency_seconds=Latency(args.supabase_latency, args.latency_sigma),
+        failure_rate=args.supabase_failure_rate,
+    )
+    memory_ids = seed_memories(
+        supabase, args.requests, user_id=USER_ID, image_bytes=os.urandom(int(args.image_kb * 1024))
+    )
+
+    with tempfile.TemporaryDirectory() as tmp, BackgroundServer(ai3d, AI3D_PORT), \
+            BackgroundServer(supabase, SUPABASE_PORT) as supabase_server:
+        env = {
+            **os.environ,
+            "ENVIRONMENT": "production",
+            "SUPABASE_URL": supabase_server.url,
+            "SUPABASE_ANON_KEY": "bench-anon-key",
+            "SUPABASE_SERVICE_KEY": "bench-service-key",
+            "TENCENT_AI3D_ENDPOINT": f"http://127.0.0.1:{AI3D_PORT}",
+            "TENCENT_SECRET_ID": SECRET_ID,
+            "TENCENT_SECRET_KEY": SECRET_KEY,
+            "STL_CACHE_PATH": os.path.join(tmp, "stl_cache.sqlite3"),
+            "SERVER_TIMING_ENABLED": "true",
+        }
+        # Match the shared poller to the fake job duration unless overridden
+        env.setdefault("TENCENT_EXPECTED_JOB_SECONDS", str(args.job_duration))
+        env.setdefault("TENCENT_POLL_MIN_INTERVAL_SECONDS", str(max(0.05, args.job_duration / 10)))
+        if region_durations or down_regions:
+            env.setdefault("TENCENT_REGIONS", ",".join(dict.fromkeys([*down_regions, *region_durations])))
+
+        with ServiceProcess(SERVICE_PORT, env) as service:
+            idle_kb = service.memory_kb("VmRSS")
+            started = time.perf_counter()
+            results = await _drive(service.url, memory_ids, args.concurrency, args.timeout)
+            summary = _summarize(results, time.perf_counter() - started)
+            peak_kb = service.memory_kb("VmHWM")
+
+    if region_durations or down_regions:
+        jobs_per_region: Dict[str, int] = {}
+        for *_, region in ai3d.state.jobs.values():
+            jobs_per_region[region] = jobs_per_region.get(region, 0) + 1
+        summary["jobs_per_region"] = jobs_per_region
+    summary["peak_rss_mb"] = peak_kb / 1024 if peak_kb is not None else None
+    summary["idle_rss_mb"] = idle_kb / 1024 if idle_kb is not None else None
+    _print_report(summary, args.concurrency)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), **summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
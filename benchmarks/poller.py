@@ -0,0 +1,97 @@
+"""Query calls and detection delay: fixed-interval polling vs the shared poller.
+
+Jobs with log-normally distributed durations are simulated in scaled time
+against an in-memory stand-in for ``AsyncAi3dClient``; ``--scale`` shrinks
+seconds so a run takes a few seconds of wall time.
+
+    python -m benchmarks.poller --jobs 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.core.config import Config
+from app.services.job_poller import JobPoller
+
+
+class _SimulatedClient:
+    def __init__(self, durations):
+        self._durations = durations
+        self._submitted = {}
+        self.queries = 0
+
+    def submit(self, job_id: str) -> None:
+        self._submitted[job_id] = time.monotonic()
+
+    def done_at(self, job_id: str) -> float:
+        return self._submitted[job_id] + self._durations[job_id]
+
+    async def query_job(self, job_id: str):
+        self.queries += 1
+        status = "DONE" if time.monotonic() >= self.done_at(job_id) else "RUN"
+        return {"Status": status, "ResultFile3Ds": []}
+
+
+async def _fixed(client: _SimulatedClient, job_id: str, interval: float) -> float:
+    client.submit(job_id)
+    while True:
+        if (await client.query_job(job_id))["Status"] == "DONE":
+            return time.monotonic() - client.done_at(job_id)
+        await asyncio.sleep(interval)
+
+
+async def _adaptive(client: _SimulatedClient, poller: JobPoller, job_id: str) -> float:
+    client.submit(job_id)
+    await poller.wait(client, job_id, timeout_seconds=3600)
+    return time.monotonic() - client.done_at(job_id)
+
+
+def _summary(name: str, delays, queries: int, jobs: int, scale: float) -> str:
+    delays = sorted(d / scale for d in delays)
+    return (
+        f"{name:<10}{queries / jobs:>14.1f}{statistics.median(delays):>14.1f}"
+        f"{delays[int(len(delays) * 0.95) - 1]:>14.1f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--median-duration", type=float, default=90.0, help="median job duration (s)")
+    parser.add_argument("--fixed-interval", type=float, default=5.0, help="legacy poll interval (s)")
+    parser.add_argument("--scale", type=float, default=0.02, help="wall seconds per simulated second")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    durations = {
+        f"job-{i}": rng.lognormvariate(0, 0.3) * args.median_duration * args.scale
+        for i in range(args.jobs)
+    }
+    # Warm the duration history as a long-running process would have it
+    warmup = [rng.lognormvariate(0, 0.3) * args.median_duration * args.scale for _ in range(50)]
+
+    print(f"{args.jobs} jobs, median duration {args.median_duration:.0f}s (simulated)")
+    print(f"{'variant':<10}{'queries/job':>14}{'delay p50 s':>14}{'delay p95 s':>14}")
+
+    fixed_client = _SimulatedClient(durations)
+    delays = await asyncio.gather(*(
+        _fixed(fixed_client, job_id, args.fixed_interval * args.scale) for job_id in durations
+    ))
+    print(_summary("fixed", delays, fixed_client.queries, args.jobs, args.scale))
+
+    poller = JobPoller(
+        min_interval=Config.TENCENT_POLL_MIN_INTERVAL_SECONDS * args.scale,
+        max_interval=Config.TENCENT_POLL_MAX_INTERVAL_SECONDS * args.scale,
+        max_concurrency=50,
+    )
+    poller._history.samples.extend(warmup)
+    adaptive_client = _SimulatedClient(durations)
+    delays = await asyncio.gather(*(_adaptive(adaptive_client, poller, job_id) for job_id in durations))
+    await poller.stop()
+    print(_summary("adaptive", delays, adaptive_client.queries, args.jobs, args.scale))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
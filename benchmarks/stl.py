@@ -0,0 +1,112 @@
+"""STL parse/convert throughput: vectorized NumPy vs a per-line Python parser.
+
+A random mesh is written as ASCII and binary STL, then parsed with
+``app.core.stl`` and, for reference, with a straightforward line-by-line
+parser on a slice of the ASCII file. Also times mesh analysis and LOD
+decimation (``app.core.mesh``) and reports the size of the binary rewrite
+and of its gzip variant.
+
+    python -m benchmarks.stl --triangles 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.compression import compress
+from app.core.mesh import analyze_mesh, simplify_vertex_clustering
+from app.core.stl import face_normals, parse_stl, write_binary_stl
+
+
+FACET = (
+    "facet normal {:e} {:e} {:e}\n outer loop\n"
+    "  vertex {:e} {:e} {:e}\n  vertex {:e} {:e} {:e}\n  vertex {:e} {:e} {:e}\n"
+    " endloop\nendfacet\n"
+)
+
+
+def _mesh(triangles: int) -> np.ndarray:
+    """Grid-like surface: shared vertices and small coordinates, as in real meshes."""
+    rng = np.random.default_rng(7)
+    side = int(np.ceil(np.sqrt(triangles / 2))) + 1
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side), indexing="ij"), axis=-1).reshape(-1, 2)
+    heights = rng.normal(0, 0.2, len(grid))
+    vertices = np.column_stack([grid * 0.5, heights]).astype(np.float32)
+    idx = np.arange(side * side).reshape(side, side)[:-1, :-1].ravel()
+    quads = np.stack([idx, idx + side, idx + side + 1, idx + 1], axis=1)
+    faces = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])[:triangles]
+    return vertices[faces]
+
+
+def _ascii_stl(triangles: np.ndarray) -> bytes:
+    rows = np.concatenate([face_normals(triangles)[:, None, :], triangles], axis=1).reshape(-1, 12)
+    fmt = FACET.replace("{:e}", "%e")
+    # Written in blocks to keep the formatter's temporary strings small
+    body = b"".join(
+        "".join(fmt % tuple(row) for row in rows[start:start + 100_000].tolist()).encode("ascii")
+        for start in range(0, len(rows), 100_000)
+    )
+    return b"solid bench\n" + body + b"endsolid bench\n"
+
+
+def _parse_ascii_loop(data: bytes) -> list:
+    """The per-triangle Python approach, for reference."""
+    triangles, current = [], []
+    for line in data.decode("ascii").splitlines():
+        parts = line.split()
+        if parts and parts[0] == "vertex":
+            current.append([float(value) for value in parts[1:4]])
+            if len(current) == 3:
+                triangles.append(current)
+                current = []
+    return triangles
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triangles", type=int, default=2_000_000)
+    parser.add_argument("--loop-triangles", type=int, default=200_000, help="triangles for the Python-loop reference")
+    args = parser.parse_args()
+
+    mesh = _mesh(args.triangles)
+    ascii_data = _ascii_stl(mesh)
+    binary_data = write_binary_stl(mesh)
+    print(f"{len(mesh):,} triangles: ASCII {len(ascii_data) / 1e6:.1f} MB, binary {len(binary_data) / 1e6:.1f} MB")
+    print(f"{'step':<28}{'seconds':>10}{'M tri/s':>10}")
+
+    def report(name: str, seconds: float, triangles: int) -> None:
+        print(f"{name:<28}{seconds:>10.2f}{triangles / seconds / 1e6:>10.2f}")
+
+    parsed, seconds = _timed(parse_stl, ascii_data)
+    assert np.allclose(parsed, mesh, rtol=1e-5, atol=1e-6)
+    report("parse ASCII (numpy)", seconds, len(mesh))
+
+    _, seconds = _timed(parse_stl, binary_data)
+    report("parse binary (numpy)", seconds, len(mesh))
+
+    _, seconds = _timed(write_binary_stl, parsed)
+    report("write binary (numpy)", seconds, len(mesh))
+
+    _, seconds = _timed(analyze_mesh, parsed)
+    report("analyze (bbox/area/volume)", seconds, len(mesh))
+
+    _, seconds = _timed(simplify_vertex_clustering, parsed, 128)
+    report("LOD (128 grid cells)", seconds, len(mesh))
+
+    sample = _ascii_stl(mesh[:args.loop_triangles])
+    _, seconds = _timed(_parse_ascii_loop, sample)
+    report("parse ASCII (python loop)", seconds, args.loop_triangles)
+
+    gzipped, seconds = _timed(compress, binary_data, "gzip")
+    report("gzip binary", seconds, len(mesh))
+    print(f"gzip variant {len(gzipped) / 1e6:.1f} MB ({len(gzipped) / len(ascii_data):.1%} of ASCII)")
+
+
+if __name__ == "__main__":
+    main()
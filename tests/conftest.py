@@ -0,0 +1,45 @@
+import types
+
+import numpy as np
+import pytest
+
+from app.core import dedup, resilience
+from app.services import admission, region_router
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    """Monotonic clock of the rate limiter, breakers, region router and idempotency store, advanced by hand."""
+    fake = FakeClock()
+    for module in (admission, dedup, resilience, region_router):
+        monkeypatch.setattr(module, "time", types.SimpleNamespace(monotonic=fake.monotonic))
+    return fake
+
+
+@pytest.fixture
+def cube() -> np.ndarray:
+    """Closed 2x2x2 cube at the origin, 12 outward-facing triangles."""
+    v = np.array([
+        [0, 0, 0], [2, 0, 0], [2, 2, 0], [0, 2, 0],
+        [0, 0, 2], [2, 0, 2], [2, 2, 2], [0, 2, 2],
+    ], dtype=np.float32)
+    faces = [
+        (0, 2, 1), (0, 3, 2),  # bottom
+        (4, 5, 6), (4, 6, 7),  # top
+        (0, 1, 5), (0, 5, 4),  # front
+        (2, 3, 7), (2, 7, 6),  # back
+        (1, 2, 6), (1, 6, 5),  # right
+        (3, 0, 4), (3, 4, 7),  # left
+    ]
+    return v[np.array(faces)]
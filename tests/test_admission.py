@@ -0,0 +1,85 @@
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejectedError, TokenBucket
+
+
+def test_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Reservations past the burst queue up at 1 / rate apart
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_bucket_refills_up_to_burst(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.reserve()
+    clock.advance(1.0)
+    assert bucket.tokens() == pytest.approx(2.0)
+    clock.advance(60.0)
+    assert bucket.tokens() == pytest.approx(3.0)
+
+
+def test_bucket_delay_for(clock):
+    bucket = TokenBucket(rate=4.0, burst=2)
+    assert bucket.delay_for(2) == 0.0
+    assert bucket.delay_for(4) == pytest.approx(0.5)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.reserve()
+    assert bucket.delay_for(1) == pytest.approx(0.5)
+
+
+def test_bucket_disabled(clock):
+    bucket = TokenBucket(rate=0.0, burst=1)
+    assert not bucket.enabled
+    assert [bucket.reserve() for _ in range(5)] == [0.0] * 5
+    assert bucket.delay_for(100) == 0.0
+
+
+def controller(max_in_flight: int = 1, max_queue: int = 1) -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=max_in_flight,
+        submit_rate=0.0,
+        submit_burst=1,
+        max_queue=max_queue,
+        expected_duration=lambda: 10.0,
+    )
+
+
+def test_admit_rejects_beyond_capacity(clock):
+    admission = controller()
+    tickets = [admission.admit(), admission.admit()]
+    with pytest.raises(AdmissionRejectedError) as rejected:
+        admission.admit()
+    assert rejected.value.retry_after >= 1
+    assert admission.rejected == 1
+    tickets[0].release()
+    tickets[0].release()
+    admission.admit()
+
+
+def test_forced_admission_counts_without_rejecting(clock):
+    admission = controller()
+    forced = [admission.admit(force=True) for _ in range(3)]
+    assert admission.stats()["admitted"] == 3
+    with pytest.raises(AdmissionRejectedError):
+        admission.admit()
+    for ticket in forced:
+        ticket.release()
+    assert admission.stats()["admitted"] == 0
+    admission.admit()
+
+
+def test_admit_many_is_all_or_nothing(clock):
+    admission = controller(max_in_flight=2, max_queue=2)
+    held = admission.admit()
+    with pytest.raises(AdmissionRejectedError):
+        admission.admit_many(4)
+    assert admission.stats()["admitted"] == 1
+    tickets = admission.admit_many(3)
+    assert admission.stats()["admitted"] == 4
+    for ticket in [held, *tickets]:
+        ticket.release()
+    assert admission.stats()["admitted"] == 0
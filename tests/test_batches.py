@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.services import batches
+from app.services.admission import AdmissionController, AdmissionRejectedError
+from app.services.batches import BatchManager
+from app.services.generation import STAGE_COMPLETED, STAGE_PROGRESS
+
+
+class FakeBackend:
+    """Supabase reads and writes plus the pipeline, as seen by the batch manager."""
+
+    def __init__(self, memories):
+        self.memories = memories
+        self.marked = []
+        self.generated = []
+
+    async def get_memories(self, memory_ids):
+        return {memory_id: self.memories[memory_id] for memory_id in memory_ids if memory_id in self.memories}
+
+    async def update_memories_status(self, memory_ids, status, fields=None):
+        self.marked.append((status, sorted(memory_ids)))
+
+    async def create_signed_urls_for_storage_objects(self, paths, expires_in_seconds):
+        return {path: f"http://storage/{path}?token=t" for path in paths}
+
+    async def run_generation_deduplicated(self, user_id, memory_id, enable_pbr, request_id, **kwargs):
+        self.generated.append(memory_id)
+        kwargs["on_progress"](STAGE_COMPLETED, STAGE_PROGRESS[STAGE_COMPLETED])
+        return {"stl_url": "u", "stl_storage_path": f"{user_id}/{memory_id}.stl", "cache_hit": False}, False
+
+
+@pytest.fixture
+def backend(monkeypatch) -> FakeBackend:
+    fake = FakeBackend({
+        f"m{i}": {"id": f"m{i}", "user_id": "u1", "figurine_url": f"u1/m{i}.png"} for i in range(5)
+    })
+    for name in ("get_memories", "update_memories_status", "create_signed_urls_for_storage_objects", "run_generation_deduplicated"):
+        monkeypatch.setattr(batches, name, getattr(fake, name))
+    return fake
+
+
+@pytest.fixture
+def admission(monkeypatch) -> AdmissionController:
+    controller = AdmissionController(
+        max_in_flight=2, submit_rate=0.0, submit_burst=1, max_queue=2, expected_duration=lambda: 10.0
+    )
+    monkeypatch.setattr(batches, "admission_controller", controller)
+    return controller
+
+
+def run(coroutine):
+    async def main():
+        manager = BatchManager(concurrency=2, sign_chunk_size=10, retention_seconds=60)
+        await manager.start()
+        try:
+            return await asyncio.wait_for(coroutine(manager), timeout=5)
+        finally:
+            await manager.stop()
+
+    return asyncio.run(main())
+
+
+def test_batch_beyond_capacity_is_rejected_before_marking(backend, admission):
+    held = admission.admit()
+
+    async def main(manager):
+        with pytest.raises(AdmissionRejectedError):
+            await manager.submit(["m0", "m1", "m2", "m3"], "u1", enable_pbr=False)
+
+    run(main)
+    assert backend.marked == []
+    assert backend.generated == []
+    assert admission.stats()["admitted"] == 1
+    held.release()
+
+
+def test_batch_holds_admission_until_items_finish(backend, admission):
+    async def main(manager):
+        # Unknown memories fail immediately and take no admission
+        batch = await manager.submit(["m0", "m1", "m2", "nope"], "u1", enable_pbr=False)
+        assert admission.stats()["admitted"] == 3
+        with pytest.raises(AdmissionRejectedError):
+            admission.admit_many(2)
+        while batch.finished_at is None:
+            await asyncio.sleep(0.01)
+        return batch
+
+    batch = run(main)
+    assert batch.to_dict(include_items=False)["completed"] == 3
+    assert sorted(backend.generated) == ["m0", "m1", "m2"]
+    assert admission.stats()["admitted"] == 0
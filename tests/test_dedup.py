@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.core.dedup import IdempotencyConflictError, IdempotencyStore, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "stl"
+
+        waiters = [asyncio.create_task(flights.do("m1", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flights.in_flight("m1")
+        release.set()
+        results = await asyncio.gather(*waiters)
+        assert calls == 1
+        assert results == [("stl", False), ("stl", True), ("stl", True)]
+        assert not flights.in_flight("m1")
+        assert len(flights) == 0
+
+    asyncio.run(run())
+
+
+def test_finished_key_runs_again():
+    async def run():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        assert await flights.do("m1", work) == (1, False)
+        assert await flights.do("m1", work) == (2, False)
+
+    asyncio.run(run())
+
+
+def test_error_reaches_every_caller():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise RuntimeError("Tencent job failed")
+
+        waiters = [asyncio.create_task(flights.do("m1", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert [str(result) for result in results] == ["Tencent job failed"] * 2
+        assert not flights.in_flight("m1")
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def run():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "stl"
+
+        leader = asyncio.create_task(flights.do("m1", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("m1", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        assert flights.in_flight("m1")
+        release.set()
+        assert await follower == ("stl", True)
+        assert leader.cancelled()
+
+    asyncio.run(run())
+
+
+def test_replays_stored_response(clock):
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    assert store.get("k1", "m1:sync") is None
+    store.put("k1", "m1:sync", 200, {"stl_url": "u"})
+    assert store.get("k1", "m1:sync") == (200, {"stl_url": "u"})
+
+
+def test_key_reused_with_other_parameters(clock):
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    store.put("k1", "m1:sync", 200, {})
+    with pytest.raises(IdempotencyConflictError):
+        store.get("k1", "m2:sync")
+
+
+def test_entries_expire(clock):
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    store.put("k1", "m1:sync", 200, {})
+    clock.advance(60.0)
+    assert store.get("k1", "m1:sync") is not None
+    clock.advance(1.0)
+    assert store.get("k1", "m1:sync") is None
+    assert len(store) == 0
+
+
+def test_put_prunes_expired_entries(clock):
+    store = IdempotencyStore(ttl_seconds=60, max_entries=10)
+    store.put("k1", "f", 200, {})
+    store.put("k2", "f", 200, {})
+    clock.advance(30.0)
+    store.put("k3", "f", 200, {})
+    clock.advance(31.0)
+    store.put("k4", "f", 200, {})
+    assert len(store) == 2
+    assert store.get("k3", "f") is not None
+
+
+def test_oldest_entries_are_evicted(clock):
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2)
+    store.put("k1", "f", 200, {})
+    store.put("k2", "f", 200, {})
+    # Storing k1 again moves it to the tail, so k2 is now the oldest
+    store.put("k1", "f", 200, {"again": True})
+    store.put("k3", "f", 200, {})
+    assert len(store) == 2
+    assert store.get("k2", "f") is None
+    assert store.get("k1", "f") == (200, {"again": True})
+
+
+def test_zero_ttl_stores_nothing(clock):
+    store = IdempotencyStore(ttl_seconds=0, max_entries=10)
+    store.put("k1", "f", 200, {})
+    assert store.get("k1", "f") is None
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.core.config import Config
+from app.services import generation
+from app.services.generation import JobTakenOverError, _JobClaim
+
+HEARTBEAT_SECONDS = 0.01
+
+
+class FakeMemory:
+    """The memory's ``model_3d_job`` column with the conditional claim renewal."""
+
+    def __init__(self):
+        self.job = None
+        self.renewals = []
+        # Set to hold the next renewal until the test releases it
+        self.gate = None
+
+    async def record(self, memory_id, job):
+        self.job = job
+
+    async def renew(self, memory_id, job, claimed_at):
+        self.renewals.append(job["job_id"])
+        if self.gate is not None:
+            gate, self.gate = self.gate, None
+            await gate.wait()
+        if self.job is None or self.job["claimed_at"] != claimed_at:
+            return False
+        self.job = job
+        return True
+
+
+@pytest.fixture
+def memory(monkeypatch) -> FakeMemory:
+    fake = FakeMemory()
+    monkeypatch.setattr(generation, "record_tencent_job", fake.record)
+    monkeypatch.setattr(generation, "renew_tencent_job_claim", fake.renew)
+    monkeypatch.setattr(Config, "TENCENT_JOB_HEARTBEAT_SECONDS", HEARTBEAT_SECONDS)
+    return fake
+
+
+def claim() -> _JobClaim:
+    return _JobClaim("m1", "key", enable_pbr=False, preprocess=False, request_id="test")
+
+
+def test_resubmitted_job_keeps_one_heartbeat(memory):
+    async def run():
+        job_claim = claim()
+        await job_claim.record("first", "ap-guangzhou")
+        await asyncio.sleep(HEARTBEAT_SECONDS * 3)
+        await job_claim.record("second", "ap-guangzhou")
+        await asyncio.sleep(HEARTBEAT_SECONDS * 3)
+        await job_claim.stop()
+        renewals = len(memory.renewals)
+        await asyncio.sleep(HEARTBEAT_SECONDS * 5)
+        assert len(memory.renewals) == renewals
+        assert not [task for task in asyncio.all_tasks() if task.get_name().startswith("tencent-job-claim")]
+        job_claim.check()
+        assert memory.renewals[-1] == "second"
+
+    asyncio.run(run())
+
+
+def test_record_during_renewal_is_not_a_takeover(memory):
+    async def run():
+        job_claim = claim()
+        await job_claim.record("first", "ap-guangzhou")
+        gate = memory.gate = asyncio.Event()
+        while not memory.renewals:
+            await asyncio.sleep(HEARTBEAT_SECONDS / 2)
+        # The renewal of "first" is in flight when "second" is recorded
+        await job_claim.record("second", "ap-guangzhou")
+        gate.set()
+        await asyncio.sleep(HEARTBEAT_SECONDS * 3)
+        await job_claim.stop()
+        job_claim.check()
+        assert memory.job["job_id"] == "second"
+
+    asyncio.run(run())
+
+
+def test_lost_claim_stops_the_run(memory):
+    async def run():
+        job_claim = claim()
+        await job_claim.record("first", "ap-guangzhou")
+        memory.job = {**memory.job, "claimed_at": "taken over"}
+        await asyncio.sleep(HEARTBEAT_SECONDS * 3)
+        with pytest.raises(JobTakenOverError):
+            job_claim.check()
+        await job_claim.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import Config
+from app.services.job_poller import MIN_HISTORY_SAMPLES, JobFailedError, JobPoller
+
+
+class FakeClient:
+    """Tencent client whose jobs report the given statuses, one per query."""
+
+    def __init__(self, statuses, query_seconds: float = 0.0):
+        self.statuses = list(statuses)
+        self.query_seconds = query_seconds
+        self.queries = 0
+
+    async def query_job(self, job_id, deadline=None):
+        self.queries += 1
+        await asyncio.sleep(self.query_seconds)
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return {"Status": status, "ErrorCode": "InvalidImage", "ErrorMessage": "no figurine"}
+
+
+def poller(min_interval: float = 0.01, max_interval: float = 0.05) -> JobPoller:
+    return JobPoller(min_interval=min_interval, max_interval=max_interval, max_concurrency=4)
+
+
+def run(poll, coroutine):
+    async def main():
+        try:
+            return await asyncio.wait_for(coroutine(), timeout=5)
+        finally:
+            await poll.stop()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def expected_seconds(monkeypatch) -> float:
+    monkeypatch.setattr(Config, "TENCENT_EXPECTED_JOB_SECONDS", 60.0)
+    return 60.0
+
+
+def test_interval_halves_distance_to_expected_time(expected_seconds):
+    poll = poller(min_interval=1.0, max_interval=100.0)
+    assert poll._next_interval(0.0) == pytest.approx(30.0)
+    assert poll._next_interval(50.0) == pytest.approx(5.0)
+    # Close to the expected time the minimum interval applies
+    assert poll._next_interval(59.5) == pytest.approx(1.0)
+
+
+def test_interval_backs_off_when_overdue(expected_seconds):
+    poll = poller(min_interval=1.0, max_interval=10.0)
+    intervals = [poll._next_interval(elapsed) for elapsed in (60.0, 120.0, 180.0, 600.0)]
+    assert intervals == sorted(intervals)
+    assert intervals[0] == pytest.approx(1.0)
+    assert intervals[1] == pytest.approx(2.0)
+    assert intervals[-1] == pytest.approx(10.0)
+
+
+def test_interval_follows_observed_durations(expected_seconds):
+    poll = poller(min_interval=1.0, max_interval=100.0)
+    poll._history.samples.extend([20.0] * MIN_HISTORY_SAMPLES + [40.0] * MIN_HISTORY_SAMPLES)
+    assert poll.expected_duration() == pytest.approx(30.0)
+    assert poll._next_interval(0.0) == pytest.approx(20.0)
+    assert poll._next_interval(25.0) == pytest.approx(15.0)
+
+
+def test_done_job_reports_statuses():
+    poll = poller()
+    client = FakeClient(["WAIT", "RUN", "DONE"])
+    statuses = []
+
+    async def main():
+        return await poll.wait(client, "job-1", timeout_seconds=5, submitted_at=time.monotonic(), on_status=statuses.append)
+
+    result = run(poll, main)
+    assert result.polls == 3
+    assert result.response["Status"] == "DONE"
+    assert statuses == ["WAIT", "RUN", "DONE"]
+    assert poll.tracked == 0
+
+
+def test_failed_job():
+    poll = poller()
+
+    async def main():
+        with pytest.raises(JobFailedError) as failed:
+            await poll.wait(FakeClient(["FAIL"]), "job-1", timeout_seconds=5, submitted_at=time.monotonic())
+        assert failed.value.code == "InvalidImage"
+
+    run(poll, main)
+
+
+def test_times_out_at_the_deadline_between_polls():
+    # The next poll is 10 s away; the deadline passes long before it
+    poll = poller(min_interval=10.0, max_interval=10.0)
+    client = FakeClient(["RUN"])
+
+    async def main():
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await poll.wait(client, "job-1", timeout_seconds=0.1)
+        return time.monotonic() - started
+
+    assert run(poll, main) < 1.0
+    assert client.queries == 0
+
+
+def test_times_out_during_a_slow_query():
+    poll = poller()
+    client = FakeClient(["RUN"], query_seconds=30.0)
+
+    async def main():
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            await poll.wait(client, "job-1", timeout_seconds=0.1, submitted_at=time.monotonic())
+        return time.monotonic() - started
+
+    assert run(poll, main) < 1.0
+    assert client.queries == 1
+
+
+def test_slow_query_does_not_hold_up_other_jobs():
+    poll = poller()
+
+    async def main():
+        slow = asyncio.create_task(
+            poll.wait(FakeClient(["DONE"], query_seconds=30.0), "slow", timeout_seconds=10, submitted_at=time.monotonic())
+        )
+        result = await poll.wait(FakeClient(["RUN", "DONE"]), "fast", timeout_seconds=10, submitted_at=time.monotonic())
+        assert not slow.done()
+        slow.cancel()
+        return result
+
+    assert run(poll, main).polls == 2
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from app.core.config import Config
+from app.core.mesh import analyze_mesh, simplify_vertex_clustering, weld_vertices
+from app.services.mesh_processing import _lod_variants, lod_name
+
+
+def grid(n: int) -> np.ndarray:
+    """Flat n x n grid of unit squares in the z=0 plane, two triangles each."""
+    x, y = np.meshgrid(np.arange(n, dtype=np.float32), np.arange(n, dtype=np.float32), indexing="ij")
+    corner = np.stack([x.ravel(), y.ravel(), np.zeros(n * n, dtype=np.float32)], axis=1)
+    dx, dy = np.float32([1, 0, 0]), np.float32([0, 1, 0])
+    first = np.stack([corner, corner + dx, corner + dx + dy], axis=1)
+    second = np.stack([corner, corner + dx + dy, corner + dy], axis=1)
+    return np.concatenate([first, second])
+
+
+def test_cube(cube):
+    info = analyze_mesh(cube)
+    assert info["triangles"] == 12
+    assert info["vertices"] == 8
+    assert info["bounding_box"] == {"min": [0, 0, 0], "max": [2, 2, 2], "size": [2, 2, 2]}
+    assert info["surface_area"] == pytest.approx(24.0)
+    assert info["volume"] == pytest.approx(8.0)
+    assert info["watertight"] is True
+
+
+def test_volume_does_not_depend_on_position(cube):
+    info = analyze_mesh(cube + np.float32(100))
+    assert info["volume"] == pytest.approx(8.0)
+
+
+def test_inward_facing_cube_is_watertight(cube):
+    info = analyze_mesh(cube[:, ::-1])
+    assert info["watertight"] is True
+    assert info["volume"] == pytest.approx(8.0)
+
+
+def test_open_mesh(cube):
+    info = analyze_mesh(cube[:-1])
+    assert info["watertight"] is False
+    assert info["volume"] is None
+    assert info["surface_area"] == pytest.approx(22.0)
+
+
+def test_inconsistent_orientation(cube):
+    flipped = cube.copy()
+    flipped[0] = flipped[0, ::-1]
+    info = analyze_mesh(flipped)
+    assert info["watertight"] is False
+    assert info["volume"] is None
+
+
+def test_empty_mesh():
+    info = analyze_mesh(np.zeros((0, 3, 3), dtype=np.float32))
+    assert info["triangles"] == 0
+    assert info["bounding_box"] is None
+    assert info["watertight"] is False
+
+
+def test_weld_vertices(cube):
+    vertices, faces = weld_vertices(cube)
+    assert len(vertices) == 8
+    np.testing.assert_array_equal(vertices[faces], cube)
+
+
+def test_simplify_reduces_triangles():
+    triangles = grid(32)
+    simplified = simplify_vertex_clustering(triangles, 4)
+    assert simplified.dtype == np.float32
+    assert 0 < len(simplified) < len(triangles) / 10
+    # Vertices merge into cluster means, so they stay inside the original bounds
+    assert simplified.min() >= 0 and simplified.max() <= 32
+    assert analyze_mesh(simplified)["surface_area"] == pytest.approx(analyze_mesh(triangles)["surface_area"], rel=0.3)
+
+
+def test_simplify_drops_collapsed_and_duplicate_triangles():
+    triangles = np.array([
+        [[0, 0, 0], [8, 0, 0], [0, 8, 0]],
+        # Same three cells in another order: a duplicate once snapped
+        [[8, 0, 0], [0, 8, 0], [0.1, 0, 0]],
+        # Two corners in one cell: collapses to a line
+        [[0, 0, 0], [0.1, 0.1, 0], [8, 8, 0]],
+    ], dtype=np.float32)
+    simplified = simplify_vertex_clustering(triangles, 2)
+    assert len(simplified) == 1
+    assert analyze_mesh(simplified)["surface_area"] > 0
+
+
+def test_simplify_at_fine_resolution_is_a_no_op(cube):
+    np.testing.assert_array_equal(simplify_vertex_clustering(cube, 1000), cube)
+
+
+def test_simplify_empty():
+    assert simplify_vertex_clustering(np.zeros((0, 3, 3), dtype=np.float32), 8).shape == (0, 3, 3)
+
+
+def test_lod_variants_skip_levels_that_do_not_reduce(monkeypatch):
+    monkeypatch.setattr(Config, "STL_LOD_RESOLUTIONS", (1000, 4, 64))
+    triangles = grid(16)
+    variants = _lod_variants(triangles)
+    assert [variant.name for variant in variants] == [lod_name(4)]
+    assert variants[0].triangles < len(triangles)
@@ -0,0 +1,66 @@
+import pytest
+
+from app.core import resilience
+from app.services.region_router import MIN_OUTCOME_SAMPLES, RegionRouter
+from app.services.tencent_ai3d_async import region_breaker
+
+REGIONS = ["test-a", "test-b", "test-c"]
+
+
+@pytest.fixture
+def router(clock, monkeypatch) -> RegionRouter:
+    # Fresh breakers for the test regions
+    monkeypatch.setattr(resilience, "_breakers", {})
+    return RegionRouter(REGIONS, window=20, max_age_seconds=300.0, max_error_rate=0.5, cooldown_seconds=60.0)
+
+
+def test_configured_order_without_samples(router):
+    assert router.candidates() == REGIONS
+
+
+def test_faster_region_first(router):
+    router.record_submit("test-c", latency_seconds=0.1)
+    router.record_job("test-c", duration_seconds=5.0)
+    router.record_submit("test-a", latency_seconds=0.1)
+    router.record_job("test-a", duration_seconds=20.0)
+    # test-b has no samples and is expected to take TENCENT_EXPECTED_JOB_SECONDS
+    assert router.candidates() == ["test-c", "test-a", "test-b"]
+
+
+def test_error_rate_penalizes_expected_time(router):
+    for region in ("test-a", "test-b"):
+        router.record_job(region, duration_seconds=10.0)
+    router.record_job("test-a", failed=True)
+    assert router.candidates()[:2] == ["test-b", "test-a"]
+
+
+def test_open_breaker_goes_last(router):
+    router.record_job("test-a", duration_seconds=1.0)
+    breaker = region_breaker("test-a")
+    for _ in range(10):
+        breaker.record_failure()
+    assert router.candidates() == ["test-b", "test-c", "test-a"]
+    assert router.snapshot()["regions"]["test-a"]["healthy"] is False
+
+
+def test_failing_region_recovers_after_cooldown(router, clock):
+    for _ in range(MIN_OUTCOME_SAMPLES):
+        router.record_submit("test-a", failed=True)
+    assert router.candidates()[-1] == "test-a"
+    clock.advance(60.0)
+    # Healthy again, but still ranked behind regions without failures
+    assert router.snapshot()["regions"]["test-a"]["healthy"] is True
+    assert router.candidates()[-1] == "test-a"
+
+
+def test_too_few_outcomes_keep_region_healthy(router):
+    for _ in range(MIN_OUTCOME_SAMPLES - 1):
+        router.record_submit("test-a", failed=True)
+    assert router.snapshot()["regions"]["test-a"]["healthy"] is True
+
+
+def test_samples_expire(router, clock):
+    router.record_job("test-c", duration_seconds=1.0)
+    assert router.candidates()[0] == "test-c"
+    clock.advance(301.0)
+    assert router.candidates() == REGIONS
@@ -0,0 +1,84 @@
+import pytest
+
+from app.core.resilience import CircuitBreaker, CircuitOpenError
+
+
+def breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=3, reset_seconds=30.0)
+
+
+def fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    circuit = breaker()
+    fail(circuit, 2)
+    assert circuit.state == CircuitBreaker.CLOSED
+    fail(circuit, 1)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.opened_count == 1
+    with pytest.raises(CircuitOpenError) as rejected:
+        circuit.before_call()
+    assert rejected.value.retry_after == pytest.approx(30.0)
+    assert circuit.rejected_count == 1
+
+
+def test_success_resets_failure_count(clock):
+    circuit = breaker()
+    fail(circuit, 2)
+    circuit.record_success()
+    fail(circuit, 2)
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through(clock):
+    circuit = breaker()
+    fail(circuit, 3)
+    clock.advance(30.0)
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    circuit.before_call()
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+
+
+def test_successful_probe_closes(clock):
+    circuit = breaker()
+    fail(circuit, 3)
+    clock.advance(30.0)
+    circuit.before_call()
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.before_call()
+
+
+def test_failed_probe_reopens(clock):
+    circuit = breaker()
+    fail(circuit, 3)
+    clock.advance(30.0)
+    fail(circuit, 1)
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.opened_count == 2
+    clock.advance(29.0)
+    with pytest.raises(CircuitOpenError):
+        circuit.before_call()
+
+
+def test_released_probe_lets_another_call_probe(clock):
+    circuit = breaker()
+    fail(circuit, 3)
+    clock.advance(30.0)
+    circuit.before_call()
+    circuit.release_probe()
+    circuit.before_call()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+
+
+def test_record_classifies_errors(clock):
+    circuit = CircuitBreaker("test", failure_threshold=1, reset_seconds=30.0, is_failure=lambda e: isinstance(e, OSError))
+    circuit.record(ValueError("rejected request"))
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record(OSError("connection reset"))
+    assert circuit.state == CircuitBreaker.OPEN
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from app.core.stl import (
+    BINARY_DTYPE,
+    BINARY_HEADER_SIZE,
+    StlFormatError,
+    face_normals,
+    is_binary_stl,
+    parse_stl,
+    write_binary_stl,
+)
+
+
+def to_ascii(triangles: np.ndarray, number: str = "{:e}", newline: str = "\n", name: str = "cube") -> bytes:
+    lines = [f"solid {name}"]
+    for triangle, normal in zip(triangles, face_normals(triangles)):
+        lines.append("  facet normal " + " ".join(number.format(c) for c in normal))
+        lines.append("    outer loop")
+        for vertex in triangle:
+            lines.append("      vertex " + " ".join(number.format(c) for c in vertex))
+        lines.append("    endloop")
+        lines.append("  endfacet")
+    lines.append(f"endsolid {name}")
+    return (newline.join(lines) + newline).encode("ascii")
+
+
+@pytest.mark.parametrize("number", ["{:e}", "{:.6f}", "{:E}", "{}"])
+def test_parse_ascii(cube, number):
+    parsed = parse_stl(to_ascii(cube, number=number))
+    assert parsed.dtype == np.float32
+    assert parsed.shape == (12, 3, 3)
+    np.testing.assert_array_equal(parsed, cube)
+
+
+def test_parse_ascii_crlf(cube):
+    np.testing.assert_array_equal(parse_stl(to_ascii(cube, newline="\r\n")), cube)
+
+
+def test_parse_ascii_name_with_digits_and_upper_case_keywords(cube):
+    data = to_ascii(cube, name="part 42 v1.5e3").upper()
+    np.testing.assert_array_equal(parse_stl(data), cube)
+
+
+def test_parse_ascii_exponents():
+    data = (
+        b"solid t\n"
+        b"facet normal 0 0 1\nouter loop\n"
+        b"vertex 1.5e+01 -2E-3 0\nvertex 1e0 2.5E1 -3e-01\nvertex -0.0 4E+2 1.25e-2\n"
+        b"endloop\nendfacet\nendsolid t\n"
+    )
+    expected = np.array([[[15, -0.002, 0], [1, 25, -0.3], [0, 400, 0.0125]]], dtype=np.float32)
+    np.testing.assert_array_equal(parse_stl(data), expected)
+
+
+def test_parse_ascii_without_normals(cube):
+    # Non-standard layout: bare "facet" lines, so only the vertex lines carry numbers
+    lines = [b"facet" if line.strip().startswith(b"facet") else line for line in to_ascii(cube).split(b"\n")]
+    np.testing.assert_array_equal(parse_stl(b"\n".join(lines)), cube)
+
+
+def test_parse_ascii_with_stray_tokens(cube):
+    lines = to_ascii(cube).split(b"\n")
+    lines.insert(1, b"; exported-by: tool/1.0")
+    lines[3] += b" # first/facet"
+    np.testing.assert_array_equal(parse_stl(b"\n".join(lines)), cube)
+
+
+def test_parse_ascii_junk_in_vertex_line():
+    data = b"solid t\nfacet normal 0 0 1\nouter loop\nvertex 0 0 0\nvertex 1 0 #0\nvertex 0 1 0\nendloop\nendfacet\nendsolid t\n"
+    with pytest.raises(StlFormatError):
+        parse_stl(data)
+
+
+def test_parse_ascii_empty():
+    assert parse_stl(b"solid empty\nendsolid empty\n").shape == (0, 3, 3)
+
+
+def test_parse_ascii_incomplete_facet():
+    data = b"solid t\nfacet normal 0 0 1\nouter loop\nvertex 0 0 0\nvertex 1 0 0\nendloop\nendfacet\nendsolid t\n"
+    with pytest.raises(StlFormatError):
+        parse_stl(data)
+
+
+@pytest.mark.parametrize("data", [b"", b"not an stl", b"\0" * 100])
+def test_parse_rejects_other_data(data):
+    with pytest.raises(StlFormatError):
+        parse_stl(data)
+
+
+def test_binary_round_trip(cube):
+    data = write_binary_stl(cube)
+    assert len(data) == BINARY_HEADER_SIZE + 4 + len(cube) * BINARY_DTYPE.itemsize
+    assert is_binary_stl(data)
+    np.testing.assert_array_equal(parse_stl(data), cube)
+
+
+def test_binary_normals_point_outward(cube):
+    data = write_binary_stl(cube)
+    records = np.frombuffer(data, dtype=BINARY_DTYPE, offset=BINARY_HEADER_SIZE + 4)
+    centroids = records["vertices"].mean(axis=1)
+    np.testing.assert_allclose(np.linalg.norm(records["normal"], axis=1), 1.0)
+    assert np.all(np.einsum("ij,ij->i", records["normal"], centroids - 1.0) > 0)
+
+
+def test_binary_with_solid_header(cube):
+    # Some exporters start binary headers with "solid"; the size decides
+    data = write_binary_stl(cube, header=b"solid exported by a binary writer")
+    assert is_binary_stl(data)
+    np.testing.assert_array_equal(parse_stl(data), cube)
+
+
+def test_binary_empty():
+    data = write_binary_stl(np.zeros((0, 3, 3), dtype=np.float32))
+    assert is_binary_stl(data)
+    assert parse_stl(data).shape == (0, 3, 3)
+
+
+def test_truncated_binary_is_not_binary(cube):
+    assert not is_binary_stl(write_binary_stl(cube)[:-1])
+
+
+def test_ascii_to_binary_round_trip(cube):
+    ascii_triangles = parse_stl(to_ascii(cube))
+    np.testing.assert_array_equal(parse_stl(write_binary_stl(ascii_triangles)), cube)
+
+
+def test_degenerate_triangle_has_zero_normal():
+    triangle = np.array([[[0, 0, 0], [1, 1, 1], [2, 2, 2]]], dtype=np.float32)
+    np.testing.assert_array_equal(face_normals(triangle), [[0, 0, 0]])
@@ -0,0 +1,50 @@
+import asyncio
+import types
+
+import httpx
+
+from app.core.resilience import RetryPolicy, is_transient_error
+from app.services import supabase_service
+
+
+class FakeBucket:
+    """Storage bucket that fails the first upload with a 503 and consumes file_options like storage3."""
+
+    def __init__(self):
+        self.uploads = []
+
+    async def upload(self, path, file, file_options):
+        headers = {
+            "cache-control": f"max-age={file_options.pop('cache-control', None)}",
+            "metadata": file_options.pop("metadata", None),
+            **file_options,
+        }
+        self.uploads.append(headers)
+        if len(self.uploads) == 1:
+            request = httpx.Request("POST", "http://storage/object")
+            raise httpx.HTTPStatusError("unavailable", request=request, response=httpx.Response(503, request=request))
+        return {"Key": path}
+
+    async def create_signed_url(self, path, expires_in):
+        return {"signedURL": f"http://storage/{path}?token=t"}
+
+
+def test_upload_retry_sends_the_same_options(monkeypatch):
+    bucket = FakeBucket()
+    client = types.SimpleNamespace(storage=types.SimpleNamespace(from_=lambda bucket_id: bucket))
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(supabase_service, "get_client", get_client)
+    monkeypatch.setattr(supabase_service, "STORAGE_RETRY", RetryPolicy(retry_on=is_transient_error, base_delay=0.0))
+
+    result = asyncio.run(supabase_service.upload_to_supabase(
+        b"stl", "m1.stl.gz", "application/gzip", user_id="u1", metadata={"contentEncoding": "gzip"}
+    ))
+
+    assert result["storage_path"] == "u1/3d-models/m1.stl.gz"
+    assert len(bucket.uploads) == 2
+    assert bucket.uploads[1] == bucket.uploads[0]
+    assert bucket.uploads[1]["metadata"] == {"contentEncoding": "gzip"}
+    assert bucket.uploads[1]["cache-control"] == "max-age=3600"
@@ -0,0 +1,38 @@
+import pytest
+from tencentcloud.ai3d.v20250513.ai3d_client import Ai3dClient
+from tencentcloud.common import abstract_client, credential
+from tencentcloud.common.http.request import RequestInternal
+
+from app.services.tencent_ai3d_async import sign_tc3
+
+SECRET_ID = "AKIDexample"
+SECRET_KEY = "example-secret-key"
+
+
+def sdk_request(monkeypatch, action, params, timestamp):
+    """Headers and body the Tencent SDK would send for ``action`` at ``timestamp``."""
+    monkeypatch.setattr(abstract_client.time, "time", lambda: timestamp)
+    client = Ai3dClient(credential.Credential(SECRET_ID, SECRET_KEY), "ap-guangzhou")
+    request = RequestInternal(client._get_endpoint(), "POST", "/")
+    client._build_req_with_tc3_signature(action, params, request)
+    return request
+
+
+@pytest.mark.parametrize("timestamp", [1760000000, 1704067199])
+@pytest.mark.parametrize(
+    "action, params",
+    [
+        ("SubmitHunyuanTo3DJob", {"ImageBase64": "aGVsbG8=", "EnablePBR": False, "ResultFormat": "STL"}),
+        ("QueryHunyuanTo3DJob", {"JobId": "1357924680"}),
+    ],
+)
+def test_authorization_matches_sdk(monkeypatch, timestamp, action, params):
+    request = sdk_request(monkeypatch, action, params, timestamp)
+    authorization = sign_tc3(SECRET_ID, SECRET_KEY, request.header["Host"], request.data.encode("utf-8"), timestamp)
+    assert authorization == request.header["Authorization"]
+
+
+def test_signature_covers_the_payload(monkeypatch):
+    request = sdk_request(monkeypatch, "QueryHunyuanTo3DJob", {"JobId": "1"}, 1760000000)
+    authorization = sign_tc3(SECRET_ID, SECRET_KEY, request.header["Host"], b'{"JobId": "2"}', 1760000000)
+    assert authorization != request.header["Authorization"]